@@ -0,0 +1,242 @@
+"""Admission control and priority-based load shedding
+
+Requests are classified as critical (health checks and metrics scrapes),
+interactive or bulk. Critical requests always go straight through. Others
+first spend a token from their client's bucket, then need one of a fixed
+number of concurrency slots. When all slots are busy they wait in a short
+queue ordered by priority, and are shed with 429 or 503 and a Retry-After
+header instead of piling up in the event loop.
+"""
+
+import asyncio
+import heapq
+import itertools
+import json
+import math
+import os
+import time
+from collections import OrderedDict
+
+from prometheus_client import Counter, Gauge, Histogram
+
+CRITICAL = 0
+INTERACTIVE = 1
+BULK = 2
+PRIORITY_NAMES = {CRITICAL: "critical", INTERACTIVE: "interactive", BULK: "bulk"}
+
+CRITICAL_PATHS = {"/", "/livez", "/readyz", "/metrics", "/latency"}
+BULK_PREFIXES = ("/predict/stream", "/retrain", "/feedback/export", "/rollups")
+
+# Bounds the number of token buckets kept for distinct clients
+MAX_CLIENTS = 10000
+
+shed_counter = Counter(
+    "admission_shed_total",
+    "Requests rejected by admission control",
+    ["priority", "reason"],
+)
+queue_time_histogram = Histogram(
+    "admission_queue_seconds",
+    "Time requests waited for a concurrency slot",
+    ["priority"],
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0),
+)
+in_flight_gauge = Gauge("admission_in_flight", "Requests holding a concurrency slot")
+queue_depth_gauge = Gauge("admission_queue_depth", "Requests waiting for a slot")
+
+
+def classify(scope):
+    """Priority class of a request from its path and X-Priority header"""
+    path = scope["path"]
+    if path in CRITICAL_PATHS:
+        return CRITICAL
+    priority = BULK if path.startswith(BULK_PREFIXES) else INTERACTIVE
+    # Clients may lower, but never raise, their priority
+    for name, value in scope.get("headers", []):
+        if name == b"x-priority" and value == b"bulk":
+            return BULK
+    return priority
+
+
+def client_key(scope):
+    for name, value in scope.get("headers", []):
+        if name == b"x-client-id":
+            return value.decode(errors="replace")
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+
+class TokenBuckets:
+    """Per-client token buckets refilled at rate tokens/s up to burst"""
+
+    def __init__(self, rate, burst, max_clients=MAX_CLIENTS):
+        self.rate = rate
+        self.burst = burst
+        self.max_clients = max_clients
+        self._buckets = OrderedDict()
+
+    def take(self, key, now=None):
+        """Spend a token; returns 0 or the seconds until one is available"""
+        now = time.monotonic() if now is None else now
+        tokens, updated = self._buckets.pop(key, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - updated) * self.rate)
+        if tokens >= 1:
+            tokens -= 1
+            wait = 0.0
+        else:
+            wait = (1 - tokens) / self.rate
+        self._buckets[key] = (tokens, now)
+        if len(self._buckets) > self.max_clients:
+            self._buckets.popitem(last=False)
+        return wait
+
+
+class ConcurrencyLimiter:
+    """Concurrency slots with a bounded priority queue of waiters
+
+    When the queue is full, a new request displaces the lowest priority
+    waiter if it has a higher priority, otherwise it is rejected.
+    """
+
+    def __init__(self, limit, queue_size, queue_timeout):
+        self.limit = limit
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self._waiters = []
+        self._order = itertools.count()
+
+    def _waiting(self):
+        return sum(1 for *_, future in self._waiters if not future.done())
+
+    async def acquire(self, priority):
+        """Returns None once a slot is held, otherwise the shed reason"""
+        if self.in_flight < self.limit:
+            self.in_flight += 1
+            in_flight_gauge.set(self.in_flight)
+            return None
+
+        self._waiters = [w for w in self._waiters if not w[2].done()]
+        heapq.heapify(self._waiters)
+        if len(self._waiters) >= self.queue_size:
+            if not self._waiters:
+                return "queue_full"
+            worst = max(self._waiters)
+            if worst[0] <= priority:
+                return "queue_full"
+            # The displaced request is counted when its acquire returns
+            worst[2].set_result(False)
+            self._waiters.remove(worst)
+            heapq.heapify(self._waiters)
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._order), future))
+        queue_depth_gauge.set(self._waiting())
+        start = time.perf_counter()
+        try:
+            await asyncio.wait({future}, timeout=self.queue_timeout)
+        except asyncio.CancelledError:
+            # A slot handed over just before cancellation must not leak
+            if future.done() and future.result():
+                self.release()
+            future.cancel()
+            raise
+        finally:
+            queue_time_histogram.labels(priority=PRIORITY_NAMES[priority]).observe(
+                time.perf_counter() - start
+            )
+        if not future.done():
+            future.cancel()
+            queue_depth_gauge.set(self._waiting())
+            return "queue_timeout"
+        if not future.result():
+            return "displaced"
+        return None
+
+    def release(self):
+        """Hand the slot to the highest priority waiter, or free it"""
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                future.set_result(True)
+                queue_depth_gauge.set(self._waiting())
+                return
+        self.in_flight -= 1
+        in_flight_gauge.set(self.in_flight)
+
+
+async def _reject(send, status, retry_after, detail):
+    body = json.dumps({"detail": detail}).encode()
+    await send(
+        {
+            "type": "http.response.start",
+            "status": status,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"retry-after", str(max(1, math.ceil(retry_after))).encode()),
+            ],
+        }
+    )
+    await send({"type": "http.response.body", "body": body})
+
+
+class AdmissionMiddleware:
+    """ASGI middleware applying client quotas and the concurrency limit
+
+    rate is in requests per second per client; 0 disables quotas.
+    """
+
+    def __init__(
+        self,
+        app,
+        rate=0.0,
+        burst=None,
+        max_concurrency=64,
+        queue_size=128,
+        queue_timeout=0.5,
+    ):
+        self.app = app
+        self.buckets = TokenBuckets(rate, burst or max(rate, 1)) if rate else None
+        self.limiter = ConcurrencyLimiter(max_concurrency, queue_size, queue_timeout)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] not in ("http", "websocket"):
+            return await self.app(scope, receive, send)
+
+        priority = classify(scope)
+        if priority == CRITICAL:
+            return await self.app(scope, receive, send)
+        name = PRIORITY_NAMES[priority]
+
+        if self.buckets is not None:
+            wait = self.buckets.take(client_key(scope))
+            if wait:
+                shed_counter.labels(priority=name, reason="rate_limited").inc()
+                if scope["type"] == "websocket":
+                    return await send({"type": "websocket.close", "code": 1013})
+                return await _reject(send, 429, wait, "Rate limit exceeded")
+
+        # Long-lived WebSocket streams would pin slots, so they are only
+        # subject to the client quota
+        if scope["type"] == "websocket":
+            return await self.app(scope, receive, send)
+
+        reason = await self.limiter.acquire(priority)
+        if reason is not None:
+            shed_counter.labels(priority=name, reason=reason).inc()
+            return await _reject(send, 503, 1, "Server overloaded")
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.limiter.release()
+
+
+def admission_from_env():
+    """Keyword arguments for AdmissionMiddleware from ADMISSION_* variables"""
+    return {
+        "rate": float(os.getenv("ADMISSION_CLIENT_RATE", "0")),
+        "burst": float(os.getenv("ADMISSION_CLIENT_BURST", "0")) or None,
+        "max_concurrency": int(os.getenv("ADMISSION_MAX_CONCURRENCY", "64")),
+        "queue_size": int(os.getenv("ADMISSION_QUEUE_SIZE", "128")),
+        "queue_timeout": float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "0.5")),
+    }
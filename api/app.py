@@ -1,19 +1,52 @@
-from fastapi import FastAPI, HTTPException, BackgroundTasks
+from fastapi import (
+    FastAPI,
+    HTTPException,
+    Query,
+    Request,
+    WebSocket,
+    WebSocketDisconnect,
+)
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-import joblib
-import numpy as np
-import pandas as pd
-from datetime import datetime
-import json
+from contextlib import asynccontextmanager
+import asyncio
 import os
 import logging
+import threading
+import uuid
 from pythonjsonlogger import jsonlogger
-from prometheus_client import Counter, Histogram, generate_latest
-from fastapi.responses import PlainTextResponse
+from prometheus_client import REGISTRY, Counter, Histogram, generate_latest
+from prometheus_client.openmetrics.exposition import (
+    CONTENT_TYPE_LATEST as OPENMETRICS_CONTENT_TYPE,
+    generate_latest as generate_openmetrics,
+)
+from fastapi.responses import JSONResponse, PlainTextResponse, Response
 import time
-import subprocess
 
-from api.schemas import IrisFeatures, PredictionResponse, HealthResponse
+from api.schemas import (
+    IrisFeatures,
+    PredictionResponse,
+    HealthResponse,
+    FeedbackRequest,
+    FeedbackResponse,
+)
+from api.admission import AdmissionMiddleware, admission_from_env
+from api.drift_monitor import drift_monitor_from_env
+from api.feedback_store import FeedbackStore, PredictionNotFound, AlreadyLabeled
+from api.latency import SlidingWindowRecorder, latency_buckets
+from api.prediction_log import prediction_logger_from_env
+from api.profiling import (
+    CONTAMINATION_NOTE,
+    StageTimer,
+    ProfilingMiddleware,
+    profiler,
+)
+from api.retrain_jobs import RetrainJobManager
+from api.rollout import ModelRollout, ServedModel, file_version, rollout_from_env
+from api.reference import load_reference
+from api.rollups import RollupWriter, read_rollups, summarize_rollups
+from api.streaming import FEATURE_NAMES, NDJSONStreamEndpoint, StreamScorer
+from src.artifact_store import ArtifactStore
 
 # Configure JSON logging
 logHandler = logging.StreamHandler()
@@ -25,13 +58,204 @@ logger.setLevel(logging.INFO)
 
 # Prometheus metrics
 prediction_counter = Counter("predictions_total", "Total number of predictions")
-prediction_histogram = Histogram("prediction_duration_seconds", "Prediction duration")
+prediction_histogram = Histogram(
+    "prediction_duration_seconds", "Prediction duration", buckets=latency_buckets()
+)
+# Slow requests carry their trace ID as an exemplar (OpenMetrics only)
+EXEMPLAR_THRESHOLD = float(os.getenv("LATENCY_EXEMPLAR_THRESHOLD", "0.005"))
 prediction_class_counter = Counter(
     "predictions_by_class", "Predictions by class", ["class_name"]
 )
 
+# Sampled, rate-limited prediction records (stdout and logs/predictions.jsonl)
+prediction_log = prediction_logger_from_env(logger)
+
+# Reservoir sample of /predict features, tested against the training data
+drift_monitor = drift_monitor_from_env()
+LIVE_DRIFT_INTERVAL = float(os.getenv("LIVE_DRIFT_INTERVAL", "60"))
+
+# Dummy predictions run after loading so first requests don't pay for
+# cold caches and lazily initialised code paths
+WARMUP_ITERATIONS = int(os.getenv("WARMUP_ITERATIONS", "3"))
+WARMUP_ROW = [5.1, 3.5, 1.4, 0.2]
+
+# Models, the reference index and the stores are loaded by load_resources(),
+# in the background from the lifespan hook or on first use, so importing
+# this module does not pull in pandas or sklearn
+model = None
+scaler = None
+primary = None
+reference = None
+rollout = ModelRollout()
+feedback_store = None
+rollups = None
+latency_recorder = None
+MODEL_LOADED = False
+RESOURCES_LOADED = False
+WARMED_UP = False
+_load_lock = threading.Lock()
+
+# Published model versions; the pointer is polled to pick up new versions
+artifacts = ArtifactStore()
+ARTIFACT_VERSION = None
+MODEL_RELOAD_INTERVAL = float(os.getenv("MODEL_RELOAD_INTERVAL", "10"))
+# Serve forests from their compact float32/uint8 arrays when published
+COMPACT_FOREST = os.getenv("COMPACT_FOREST", "1") == "1"
+
+
+def _load_models():
+    """Version, model, scaler, served model and reference index
+
+    All come from the current artifact version (or the flat legacy files
+    when nothing has been published), so the model and scaler always match.
+    """
+    import joblib
+
+    version = artifacts.current_version()
+    paths = artifacts.paths(version)
+    if COMPACT_FOREST and "compact_model" in paths:
+        from src.compact_forest import CompactForest
+
+        # Memory-mapped, so all workers share one copy of the arrays
+        loaded_model = CompactForest.from_dict(
+            joblib.load(paths["compact_model"], mmap_mode="r")
+        )
+    else:
+        loaded_model = joblib.load(paths["model"])
+    loaded_scaler = joblib.load(paths["scaler"])
+    served = ServedModel(loaded_model, loaded_scaler, file_version(paths["model"]))
+    # Training-set index for neighbours and out-of-distribution scores
+    index = load_reference(paths["reference_index"])
+    # Live traffic is compared with this version's training features
+    drift_monitor.set_reference(index.features if index is not None else None)
+    return version, loaded_model, loaded_scaler, served, index
+
+
+def load_resources():
+    """Load models, the reference index and the stores (runs once)"""
+    global model, scaler, primary, reference, rollout, ARTIFACT_VERSION
+    global feedback_store, rollups, latency_recorder, MODEL_LOADED, RESOURCES_LOADED
+    if RESOURCES_LOADED:
+        return
+    with _load_lock:
+        if RESOURCES_LOADED:
+            return
+        start = time.perf_counter()
+
+        # Load model and scaler
+        try:
+            ARTIFACT_VERSION, model, scaler, primary, reference = _load_models()
+            MODEL_LOADED = True
+        except Exception as e:
+            logger.error(f"Failed to load model: {str(e)}")
+
+        # Optional shadow/canary candidate model
+        rollout = rollout_from_env(scaler)
+
+        # Predictions and ground-truth labels
+        os.makedirs("logs", exist_ok=True)
+        feedback_store = FeedbackStore()
+
+        # Minute/hour aggregates read by monitoring reports
+        rollups = RollupWriter()
+
+        latency_recorder = SlidingWindowRecorder()
+        RESOURCES_LOADED = True
+        logger.info(f"Resources loaded in {time.perf_counter() - start:.2f}s")
+
+
+def warm_up(iterations=WARMUP_ITERATIONS):
+    """Run dummy predictions through every stage of /predict"""
+    global WARMED_UP
+    if MODEL_LOADED and iterations:
+        import pandas as pd
+
+        start = time.perf_counter()
+        rows = pd.DataFrame([WARMUP_ROW] * 8, columns=FEATURE_NAMES)
+        for _ in range(iterations):
+            primary.score_batch(rows.iloc[:1])
+            primary.score_batch(rows)
+            if reference is not None:
+                scaled = primary.scaler.transform(rows.iloc[:1])
+                reference.ood_score(scaled)
+                reference.neighbors(scaled, 3, CLASS_NAMES)
+        logger.info(f"Warm-up took {time.perf_counter() - start:.2f}s")
+    WARMED_UP = True
+
+
+def reload_models():
+    """Swap in a newly published artifact version; returns True if swapped
+
+    Reading the pointer is cheap, so this can be polled. Requests in flight
+    keep the objects they started with.
+    """
+    global model, scaler, primary, reference, ARTIFACT_VERSION, MODEL_LOADED
+    if not RESOURCES_LOADED:
+        return False
+    version = artifacts.current_version()
+    if version is None or version == ARTIFACT_VERSION:
+        return False
+    with _load_lock:
+        loaded = _load_models()
+        ARTIFACT_VERSION, model, scaler, primary, reference = loaded
+        MODEL_LOADED = True
+    logger.info(f"Reloaded model artifacts {ARTIFACT_VERSION}")
+    return True
+
+
+async def _watch_artifacts():
+    while True:
+        await asyncio.sleep(MODEL_RELOAD_INTERVAL)
+        try:
+            await asyncio.to_thread(reload_models)
+        except Exception as e:
+            logger.error(f"Model reload failed: {str(e)}")
+
+
+async def _check_live_drift():
+    while True:
+        await asyncio.sleep(LIVE_DRIFT_INTERVAL)
+        try:
+            await asyncio.to_thread(drift_monitor.check)
+        except Exception as e:
+            logger.error(f"Live drift check failed: {str(e)}")
+
+
+async def ensure_loaded():
+    """Load resources off the event loop if the lifespan hook has not yet"""
+    if not RESOURCES_LOADED:
+        await run_in_threadpool(load_resources)
+
+
+def _start_up():
+    load_resources()
+    warm_up()
+
+
+@asynccontextmanager
+async def lifespan(app):
+    # Loading runs in the background so /livez answers straight away and
+    # /readyz reports when the API can serve predictions
+    loader = asyncio.get_running_loop().run_in_executor(None, _start_up)
+    watcher = (
+        asyncio.create_task(_watch_artifacts()) if MODEL_RELOAD_INTERVAL > 0 else None
+    )
+    drift_checker = (
+        asyncio.create_task(_check_live_drift()) if LIVE_DRIFT_INTERVAL > 0 else None
+    )
+    yield
+    for task in (watcher, drift_checker):
+        if task is not None:
+            task.cancel()
+    await loader
+    prediction_log.close()
+    if RESOURCES_LOADED:
+        feedback_store.close()
+        rollups.close()
+
+
 # Initialize FastAPI
-app = FastAPI(title="Iris Classification API", version="1.0.0")
+app = FastAPI(title="Iris Classification API", version="1.0.0", lifespan=lifespan)
 
 # Add CORS middleware
 app.add_middleware(
@@ -41,25 +265,20 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(ProfilingMiddleware, profiler=profiler)
+# Outermost, so overload is shed before any other work is done
+app.add_middleware(AdmissionMiddleware, **admission_from_env())
 
-# Load model and scaler
-try:
-    model = joblib.load("models/best_model.pkl")
-    scaler = joblib.load("models/scaler.pkl")
-    MODEL_LOADED = True
-except Exception as e:
-    logger.error(f"Failed to load model: {str(e)}")
-    MODEL_LOADED = False
-    model = None
-    scaler = None
+retrain_manager = RetrainJobManager()
 
 # Class mapping
 CLASS_NAMES = {0: "setosa", 1: "versicolor", 2: "virginica"}
 
 
 @app.get("/", response_model=HealthResponse)
-async def health_check():
+def health_check():
     """Health check endpoint"""
+    load_resources()
     return HealthResponse(
         status="healthy" if MODEL_LOADED else "unhealthy",
         model_loaded=model is not None,
@@ -67,15 +286,57 @@ async def health_check():
     )
 
 
+@app.get("/livez")
+async def liveness():
+    """Liveness probe: the process is up and the event loop responds"""
+    return {"status": "alive"}
+
+
+@app.get("/readyz")
+async def readiness():
+    """Readiness probe: models are loaded and warmed up"""
+    ready = MODEL_LOADED and WARMED_UP
+    return JSONResponse(
+        {
+            "status": "ready" if ready else "not_ready",
+            "model_loaded": MODEL_LOADED,
+            "warmed_up": WARMED_UP,
+        },
+        status_code=200 if ready else 503,
+    )
+
+
 @app.post("/predict", response_model=PredictionResponse)
-async def predict(features: IrisFeatures):
+async def predict(
+    features: IrisFeatures,
+    request: Request,
+    response: Response,
+    neighbors: int = Query(0, ge=0, le=50, description="Nearest training samples"),
+):
     """Make prediction on iris features"""
+    await ensure_loaded()
     if not MODEL_LOADED:
         raise HTTPException(status_code=503, detail="Model not loaded")
 
     start_time = time.time()
+    # Request parsing and validation happen before the handler runs
+    timer = StageTimer(getattr(request.state, "received_at", None))
+    timer.mark("validation")
+
+    # Links log records, exemplars and the client's own request ID
+    prediction_id = uuid.uuid4().hex
+    trace_id = request.headers.get("x-request-id", prediction_id)[:64]
+    response.headers["X-Request-ID"] = trace_id
+    feature_values = [
+        features.sepal_length,
+        features.sepal_width,
+        features.petal_length,
+        features.petal_width,
+    ]
 
     try:
+        import pandas as pd
+
         # Create DataFrame with proper feature names
         feature_names = [
             "sepal length (cm)",
@@ -83,90 +344,290 @@ async def predict(features: IrisFeatures):
             "petal length (cm)",
             "petal width (cm)",
         ]
-        feature_df = pd.DataFrame(
-            [
-                [
-                    features.sepal_length,
-                    features.sepal_width,
-                    features.petal_length,
-                    features.petal_width,
-                ]
-            ],
-            columns=feature_names,
-        )
-
-        # Scale features
-        feature_scaled = scaler.transform(feature_df)
-
-        # Make prediction
-        prediction = model.predict(feature_scaled)[0]
-        prediction_proba = model.predict_proba(feature_scaled)[0]
-        confidence = float(np.max(prediction_proba))
+        feature_df = pd.DataFrame([feature_values], columns=feature_names)
+        timer.mark("dataframe")
+
+        # Scale features and make prediction with the model serving this
+        # request (the candidate for the canary share of traffic)
+        role = rollout.choose()
+        served = rollout.candidate if role == "candidate" else primary
+        prediction, confidence, feature_scaled = served.score(feature_df, role, timer)
+
+        # Distance to the training data (in the primary model's feature space)
+        ood_score = is_ood = nearest = None
+        if reference is not None:
+            if served is not primary:
+                feature_scaled = primary.scaler.transform(feature_df)
+            ood_score, is_ood = reference.ood_score(feature_scaled)
+            if neighbors:
+                nearest = reference.neighbors(feature_scaled, neighbors, CLASS_NAMES)
+        timer.mark("reference")
 
         # Update metrics
         prediction_counter.inc()
         prediction_class_counter.labels(class_name=CLASS_NAMES[prediction]).inc()
+        timer.mark("metrics")
+
+        # Log prediction (sampled; errors and low confidence always)
+        elapsed = time.time() - start_time
+        prediction_log.log(
+            feature_values,
+            prediction,
+            confidence,
+            id=prediction_id,
+            trace_id=trace_id,
+            ood_score=ood_score,
+            duration=round(elapsed, 6),
+        )
+        timer.mark("logging")
+
+        # Store for joining with feedback labels
+        feedback_store.record_prediction(
+            prediction_id,
+            features.model_dump(),
+            prediction,
+            confidence,
+            served.version,
+        )
+        rollups.record(prediction, confidence, elapsed)
+        timer.mark("file_io")
 
-        # Log prediction
-        log_entry = {
-            "timestamp": datetime.utcnow().isoformat(),
-            "features": features.model_dump(),  # UPDATED: was .dict()
-            "prediction": int(prediction),
-            "prediction_label": CLASS_NAMES[prediction],
-            "confidence": confidence,
-            "duration": time.time() - start_time,
-        }
-        logger.info("prediction_made", extra=log_entry)
-
-        # Save to file (simple logging)
-        os.makedirs("logs", exist_ok=True)
-        with open("logs/predictions.jsonl", "a") as f:
-            f.write(json.dumps(log_entry) + "\n")
+        drift_monitor.add(feature_values)
 
         # Record duration
-        prediction_histogram.observe(time.time() - start_time)
+        duration = time.time() - start_time
+        prediction_histogram.observe(
+            duration,
+            {"trace_id": trace_id} if duration >= EXEMPLAR_THRESHOLD else None,
+        )
+        latency_recorder.record(duration)
+
+        # Score the other model off the response path
+        rollout.mirror(primary, role, feature_df, prediction)
 
         return PredictionResponse(
-            prediction=int(prediction),
+            prediction=prediction,
             prediction_label=CLASS_NAMES[prediction],
             confidence=confidence,
             features=features.model_dump(),  # UPDATED: was .dict()
+            model_version=served.version,
+            prediction_id=prediction_id,
+            ood_score=ood_score,
+            is_ood=is_ood,
+            neighbors=nearest,
         )
 
     except Exception as e:
         logger.error(f"Prediction error: {str(e)}", exc_info=True)
+        prediction_log.log(feature_values, error=str(e), id=prediction_id)
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.get("/metrics", response_class=PlainTextResponse)
-async def metrics():
-    """Prometheus metrics endpoint"""
-    return generate_latest()
+def _stream_ready():
+    load_resources()
+    return MODEL_LOADED
 
 
-@app.post("/retrain")
-async def trigger_retrain(background_tasks: BackgroundTasks):
-    """Trigger model retraining in background (Bonus feature)"""
+def _record_stream_batch(predictions, confidences, latencies):
+    prediction_counter.inc(len(predictions))
+    for prediction, confidence, latency in zip(predictions, confidences, latencies):
+        prediction_class_counter.labels(class_name=CLASS_NAMES[prediction]).inc()
+        rollups.record(int(prediction), float(confidence), latency)
 
-    def retrain_model():
-        try:
-            # Run retraining script
-            result = subprocess.run(
-                ["python", "src/retrain.py"], capture_output=True, text=True
-            )
 
-            if result.returncode == 0:
-                logger.info("Model retraining completed successfully")
-            else:
-                logger.error(f"Model retraining failed: {result.stderr}")
+stream_scorer = StreamScorer(
+    lambda: primary, CLASS_NAMES, on_batch=_record_stream_batch
+)
+
+
+# Scores a chunked NDJSON body, streaming NDJSON results back
+app.router.add_route(
+    "/predict/stream",
+    NDJSONStreamEndpoint(stream_scorer, _stream_ready),
+    methods=["POST"],
+)
+
+
+@app.websocket("/predict/stream")
+async def predict_stream_ws(websocket: WebSocket):
+    """Score feature rows sent as JSON messages over a WebSocket
+
+    Each message is a feature object or an array of them. Each reply is an
+    array with the results of one scored batch.
+    """
+    await websocket.accept()
+    await ensure_loaded()
+    if not MODEL_LOADED:
+        await websocket.close(code=1013, reason="Model not loaded")
+        return
+    try:
+        async for results in stream_scorer.stream(websocket.iter_text()):
+            await websocket.send_json(results)
+    except WebSocketDisconnect:
+        # The client went away with results still pending
+        pass
+
+
+@app.post("/feedback", response_model=FeedbackResponse)
+def feedback(request: FeedbackRequest):
+    """Attach the true label to an earlier prediction"""
+    load_resources()
+    try:
+        prediction = feedback_store.add_label(request.prediction_id, request.label)
+    except PredictionNotFound:
+        raise HTTPException(status_code=404, detail="Prediction not found")
+    except AlreadyLabeled:
+        raise HTTPException(status_code=409, detail="Prediction already labeled")
+
+    return FeedbackResponse(
+        prediction_id=request.prediction_id,
+        label=request.label,
+        prediction=prediction,
+        correct=prediction == request.label,
+    )
 
-        except Exception as e:
-            logger.error(f"Retraining error: {e}")
 
-    # Add task to background
-    background_tasks.add_task(retrain_model)
+@app.get("/feedback/metrics")
+def feedback_metrics(window_hours: float = 24):
+    """Real accuracy, per-class precision/recall and confusion matrix"""
+    load_resources()
+    return feedback_store.metrics(CLASS_NAMES, window_seconds=window_hours * 3600)
 
-    return {"message": "Retraining triggered in background"}
+
+@app.get("/feedback/export", response_class=PlainTextResponse)
+def feedback_export():
+    """Labeled predictions as CSV in the training data layout"""
+    load_resources()
+    return feedback_store.labeled_training_data().to_csv(index=False)
+
+
+@app.get("/rollups")
+def rollup_report(
+    hours: float = Query(24, gt=0),
+    granularity: str = Query("hour", pattern="^(minute|hour)$"),
+):
+    """Prediction counts, confidence and latency aggregated per time bucket"""
+    load_resources()
+    rollups.flush()
+    df = read_rollups(rollups.path, granularity, since=time.time() - hours * 3600)
+    return {
+        "granularity": granularity,
+        "summary": summarize_rollups(df),
+        "buckets": df.to_dict(orient="records"),
+    }
+
+
+@app.get("/models")
+async def model_status():
+    """Primary model version and shadow/canary candidate configuration"""
+    await ensure_loaded()
+    return {
+        "primary_version": primary.version if primary else None,
+        "artifact_version": ARTIFACT_VERSION,
+        **rollout.status(),
+    }
+
+
+@app.get("/drift")
+async def live_drift():
+    """Current live traffic window and the last drift test result"""
+    return drift_monitor.status()
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics(request: Request):
+    """Prometheus metrics endpoint
+
+    Exemplars are only part of the OpenMetrics format, which is served to
+    scrapers that ask for it.
+    """
+    if "application/openmetrics-text" in request.headers.get("accept", ""):
+        return Response(
+            generate_openmetrics(REGISTRY), media_type=OPENMETRICS_CONTENT_TYPE
+        )
+    return generate_latest()
+
+
+@app.get("/latency")
+async def latency(windows: str = "10,60,300"):
+    """/predict latency quantiles over sliding windows (seconds)"""
+    await ensure_loaded()
+    try:
+        sizes = [float(w) for w in windows.split(",")]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="windows must be numbers")
+    if any(not 0 < w <= 300 for w in sizes):
+        raise HTTPException(status_code=400, detail="windows must be in (0, 300]")
+    return {"windows": [latency_recorder.snapshot(w) for w in sizes]}
+
+
+@app.post("/debug/profile")
+async def start_profile(requests: int = 10, paths: str = ""):
+    """Profile the next N requests to paths (requires PROFILING_ENABLED=1)
+
+    paths is comma-separated and defaults to PROFILE_PATHS (/predict).
+    """
+    if not profiler.enabled:
+        raise HTTPException(status_code=404, detail="Profiling is disabled")
+    if requests < 1:
+        raise HTTPException(status_code=400, detail="requests must be positive")
+
+    if not profiler.arm(requests, paths.split(",") if paths else None):
+        raise HTTPException(status_code=409, detail="A profile is being captured")
+    return profiler.status()
+
+
+@app.get("/debug/profile")
+async def get_profile(format: str = "pstats"):
+    """Download the captured profile as pstats data or a text report"""
+    if not profiler.enabled:
+        raise HTTPException(status_code=404, detail="Profiling is disabled")
+
+    # Requests that ran alongside the profiled ones are in the profile too
+    headers = {"X-Profile-Overlapping-Requests": str(profiler.overlapping)}
+    if format == "text":
+        report = profiler.report()
+        if report is None:
+            raise HTTPException(status_code=404, detail="No profile captured")
+        if profiler.overlapping:
+            report = (
+                f"WARNING: {profiler.overlapping} requests overlapped the "
+                f"profiled ones; {CONTAMINATION_NOTE}\n\n{report}"
+            )
+        return PlainTextResponse(report, headers=headers)
+
+    data = profiler.dump()
+    if data is None:
+        raise HTTPException(status_code=404, detail="No profile captured")
+    return Response(
+        content=data,
+        media_type="application/octet-stream",
+        headers={"Content-Disposition": "attachment; filename=profile.prof", **headers},
+    )
+
+
+@app.post("/retrain")
+async def trigger_retrain():
+    """Trigger model retraining in background (Bonus feature)
+
+    Concurrent triggers are coalesced into the running job or a single
+    queued follow-up job.
+    """
+    job = retrain_manager.trigger()
+    return {
+        "message": f"Retraining {job.status}",
+        "job_id": job.job_id,
+        "status": job.status,
+    }
+
+
+@app.get("/retrain/{job_id}")
+async def retrain_status(job_id: str):
+    """Status, progress and stage timings of a retrain job"""
+    job = retrain_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Retrain job not found")
+    return job.to_dict()
 
 
 if __name__ == "__main__":
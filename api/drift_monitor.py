@@ -0,0 +1,270 @@
+"""Drift tests of live /predict traffic against the training data
+
+Incoming feature vectors are kept in a fixed-size reservoir sample
+(Algorithm R), so memory is constant however much traffic arrives and
+every request of the current window is equally likely to be kept. On a
+background schedule the window's sample is compared with the training
+features from the reference index and a new window starts:
+
+- a two-sample Kolmogorov-Smirnov test per feature, all features in one
+  vectorized pass over the pooled, column-offset samples
+- an MMD test on random Fourier features of a Gaussian kernel: each
+  sample is reduced to a mean embedding in O(n) instead of the O(n^2)
+  kernel matrix, and the permutation null is a single matrix product
+
+Results are exported as Prometheus gauges and written to
+models/live_drift.json, which the LiveDriftTrigger retrain check reads.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+
+from prometheus_client import Gauge
+
+logger = logging.getLogger(__name__)
+
+FIELDS = ("sepal_length", "sepal_width", "petal_length", "petal_width")
+DRIFT_FILE = "models/live_drift.json"
+
+ks_statistic_gauge = Gauge(
+    "live_drift_ks_statistic", "KS statistic of live traffic", ["feature"]
+)
+ks_p_value_gauge = Gauge(
+    "live_drift_ks_p_value", "KS test p-value of live traffic", ["feature"]
+)
+mmd_statistic_gauge = Gauge("live_drift_mmd_statistic", "RFF MMD^2 of live traffic")
+mmd_p_value_gauge = Gauge("live_drift_mmd_p_value", "MMD permutation test p-value")
+drift_detected_gauge = Gauge(
+    "live_drift_detected", "1 if the last live drift check detected drift"
+)
+window_size_gauge = Gauge(
+    "live_drift_window_samples", "Requests sampled in the last checked window"
+)
+
+
+def ks_test(reference, sample):
+    """Two-sample KS statistic and asymptotic p-value of every column
+
+    Each column is shifted into its own disjoint value range, so a single
+    sort and searchsorted evaluates all columns' empirical CDFs at once.
+    """
+    import numpy as np
+    from scipy.special import kolmogorov
+
+    reference = np.asarray(reference, dtype=np.float64)
+    sample = np.asarray(sample, dtype=np.float64)
+    n, m = len(reference), len(sample)
+    columns = reference.shape[1]
+
+    low = min(reference.min(), sample.min())
+    span = max(reference.max(), sample.max()) - low + 1.0
+    offsets = np.arange(columns) * span
+    ref_sorted = np.sort(reference - low + offsets, axis=0).T.ravel()
+    sample_sorted = np.sort(sample - low + offsets, axis=0).T.ravel()
+
+    # The ECDF difference only changes at observed points
+    points = np.concatenate([ref_sorted, sample_sorted])
+    column = np.concatenate(
+        [np.repeat(np.arange(columns), n), np.repeat(np.arange(columns), m)]
+    )
+    ref_cdf = (np.searchsorted(ref_sorted, points, side="right") - column * n) / n
+    sample_cdf = (np.searchsorted(sample_sorted, points, side="right") - column * m) / m
+    statistics = np.zeros(columns)
+    np.maximum.at(statistics, column, np.abs(ref_cdf - sample_cdf))
+
+    effective = np.sqrt(n * m / (n + m))
+    p_values = np.clip(kolmogorov(effective * statistics), 0.0, 1.0)
+    return statistics, p_values
+
+
+class RFFMMD:
+    """MMD^2 with a Gaussian kernel approximated by random Fourier features
+
+    Features are standardized with the reference statistics and the
+    bandwidth is the median pairwise distance of the reference sample.
+    """
+
+    def __init__(self, reference, n_features=256, seed=0):
+        import numpy as np
+
+        reference = np.asarray(reference, dtype=np.float64)
+        self.mean = reference.mean(axis=0)
+        self.std = np.where(reference.std(axis=0) > 0, reference.std(axis=0), 1.0)
+        rng = np.random.default_rng(seed)
+        self._rng = rng
+
+        scaled = self._standardize(reference)
+        subset = scaled[rng.choice(len(scaled), min(len(scaled), 500), replace=False)]
+        distances = np.sqrt(((subset[:, None, :] - subset[None, :, :]) ** 2).sum(-1))
+        bandwidth = np.median(distances[distances > 0]) if len(subset) > 1 else 1.0
+
+        self.weights = rng.normal(
+            scale=1.0 / bandwidth, size=(reference.shape[1], n_features)
+        )
+        self.phases = rng.uniform(0, 2 * np.pi, size=n_features)
+        self.scale = np.sqrt(2.0 / n_features)
+        self.reference_features = self.transform(reference)
+
+    def _standardize(self, X):
+        return (X - self.mean) / self.std
+
+    def transform(self, X):
+        import numpy as np
+
+        projected = self._standardize(np.asarray(X, dtype=np.float64)) @ self.weights
+        return self.scale * np.cos(projected + self.phases)
+
+    def test(self, sample, permutations=200):
+        """MMD^2 between the reference and sample, and a permutation p-value
+
+        Each permutation reassigns the pooled rows to two groups of the
+        original sizes; all permuted mean embeddings come from one product
+        of a (permutations x rows) weight matrix with the pooled features.
+        """
+        import numpy as np
+
+        sample_features = self.transform(sample)
+        statistic = float(
+            np.sum(
+                (self.reference_features.mean(axis=0) - sample_features.mean(axis=0))
+                ** 2
+            )
+        )
+
+        pooled = np.vstack([self.reference_features, sample_features])
+        n, m = len(self.reference_features), len(sample_features)
+        in_sample = np.argsort(self._rng.random((permutations, n + m)), axis=1) < m
+        # +1/m for rows assigned to the sample group, -1/n for the rest
+        weights = np.where(in_sample, 1.0 / m, -1.0 / n)
+        null = ((weights @ pooled) ** 2).sum(axis=1)
+        p_value = float((1 + np.sum(null >= statistic)) / (1 + permutations))
+        return statistic, p_value
+
+
+class LiveDriftMonitor:
+    """Reservoir sample of live features, tested against the training data"""
+
+    def __init__(
+        self,
+        reservoir_size=1000,
+        min_samples=200,
+        alpha=0.01,
+        path=DRIFT_FILE,
+        seed=None,
+    ):
+        import random
+
+        self.reservoir_size = reservoir_size
+        self.min_samples = min_samples
+        self.alpha = alpha
+        self.path = path
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._reference = None
+        self._mmd = None
+        self._reservoir = []
+        self._seen = 0
+        self.last_result = None
+
+    def set_reference(self, features):
+        """Use new training features (e.g. after a model reload)
+
+        The current window is discarded: it was collected for the old model.
+        """
+        mmd = RFFMMD(features) if features is not None else None
+        with self._lock:
+            self._reference = features
+            self._mmd = mmd
+            self._reservoir = []
+            self._seen = 0
+
+    def add(self, features):
+        """Offer one feature vector to the reservoir; O(1)"""
+        if self._reference is None:
+            return
+        with self._lock:
+            self._seen += 1
+            if len(self._reservoir) < self.reservoir_size:
+                self._reservoir.append(features)
+            else:
+                slot = self._random.randrange(self._seen)
+                if slot < self.reservoir_size:
+                    self._reservoir[slot] = features
+
+    def check(self, now=None):
+        """Test the window's sample if it is large enough, then start a new window
+
+        Returns the result, or None while fewer than min_samples requests
+        were sampled (the window then keeps growing).
+        """
+        with self._lock:
+            if self._reference is None or len(self._reservoir) < self.min_samples:
+                return None
+            reference, mmd = self._reference, self._mmd
+            sample, seen = self._reservoir, self._seen
+            self._reservoir = []
+            self._seen = 0
+
+        statistics, p_values = ks_test(reference, sample)
+        mmd_statistic, mmd_p_value = mmd.test(sample)
+        # Bonferroni correction over the per-feature KS tests
+        drifted = [
+            field
+            for field, p_value in zip(FIELDS, p_values)
+            if p_value < self.alpha / len(FIELDS)
+        ]
+        result = {
+            "checked_at": time.time() if now is None else now,
+            "window_requests": seen,
+            "window_samples": len(sample),
+            "alpha": self.alpha,
+            "ks": {
+                field: {"statistic": float(s), "p_value": float(p)}
+                for field, s, p in zip(FIELDS, statistics, p_values)
+            },
+            "mmd": {"statistic": mmd_statistic, "p_value": mmd_p_value},
+            "drifted_features": drifted,
+            "drift": bool(drifted) or mmd_p_value < self.alpha,
+        }
+        self._export(result)
+        self.last_result = result
+        if result["drift"]:
+            logger.warning(
+                f"Live traffic drift: features {drifted}, MMD p={mmd_p_value:.4f}"
+            )
+        return result
+
+    def _export(self, result):
+        for field, test in result["ks"].items():
+            ks_statistic_gauge.labels(feature=field).set(test["statistic"])
+            ks_p_value_gauge.labels(feature=field).set(test["p_value"])
+        mmd_statistic_gauge.set(result["mmd"]["statistic"])
+        mmd_p_value_gauge.set(result["mmd"]["p_value"])
+        drift_detected_gauge.set(1 if result["drift"] else 0)
+        window_size_gauge.set(result["window_samples"])
+
+        if self.path is not None:
+            # Replaced atomically: the retrain monitor may be reading it
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp_path = f"{self.path}.tmp-{os.getpid()}"
+            with open(tmp_path, "w") as f:
+                json.dump(result, f, indent=2)
+            os.replace(tmp_path, self.path)
+
+    def status(self):
+        with self._lock:
+            window = {"requests": self._seen, "samples": len(self._reservoir)}
+        return {"window": window, "last_result": self.last_result}
+
+
+def drift_monitor_from_env():
+    """LiveDriftMonitor configured by LIVE_DRIFT_* environment variables"""
+    return LiveDriftMonitor(
+        reservoir_size=int(os.getenv("LIVE_DRIFT_RESERVOIR", "1000")),
+        min_samples=int(os.getenv("LIVE_DRIFT_MIN_SAMPLES", "200")),
+        alpha=float(os.getenv("LIVE_DRIFT_ALPHA", "0.01")),
+        path=os.getenv("LIVE_DRIFT_FILE", DRIFT_FILE) or None,
+    )
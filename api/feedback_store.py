@@ -0,0 +1,233 @@
+"""Append-only store of predictions and ground-truth feedback
+
+Predictions and labels live in SQLite tables keyed by prediction ID and
+indexed by time. Each label also stores the prediction it refers to, and a
+running confusion matrix is updated in the same transaction, so accuracy
+and per-class metrics never need a join over the full history.
+"""
+
+import logging
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+DB_PATH = "logs/feedback.db"
+FEATURE_COLUMNS = ["sepal_length", "sepal_width", "petal_length", "petal_width"]
+TRAINING_COLUMNS = {
+    "sepal_length": "sepal length (cm)",
+    "sepal_width": "sepal width (cm)",
+    "petal_length": "petal length (cm)",
+    "petal_width": "petal width (cm)",
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS predictions (
+    id TEXT PRIMARY KEY,
+    ts REAL NOT NULL,
+    sepal_length REAL,
+    sepal_width REAL,
+    petal_length REAL,
+    petal_width REAL,
+    prediction INTEGER NOT NULL,
+    confidence REAL,
+    model_version TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_predictions_ts ON predictions (ts);
+CREATE TABLE IF NOT EXISTS labels (
+    id TEXT PRIMARY KEY REFERENCES predictions (id),
+    ts REAL NOT NULL,
+    label INTEGER NOT NULL,
+    prediction INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_labels_ts ON labels (ts);
+CREATE TABLE IF NOT EXISTS confusion (
+    actual INTEGER NOT NULL,
+    predicted INTEGER NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (actual, predicted)
+);
+"""
+
+
+class PredictionNotFound(KeyError):
+    pass
+
+
+class AlreadyLabeled(ValueError):
+    pass
+
+
+class FeedbackStore:
+    """Buffered writer and query interface for predictions and labels
+
+    Predictions are buffered in memory and written in batches by a
+    background thread, either when flush_size rows are pending or every
+    flush_interval seconds. _lock only guards the buffer, so recording a
+    prediction never waits for a commit; _db_lock serializes use of the
+    shared connection.
+    """
+
+    def __init__(self, path=DB_PATH, flush_size=256, flush_interval=1.0):
+        self.path = path
+        self.flush_size = flush_size
+        self._buffer = []
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+
+        self._stop = threading.Event()
+        self._background = bool(flush_interval)
+        if self._background:
+            thread = threading.Thread(
+                target=self._flush_periodically,
+                args=(flush_interval,),
+                name="feedback-flush",
+                daemon=True,
+            )
+            thread.start()
+
+    def _flush_periodically(self, interval):
+        while not self._stop.is_set():
+            # Woken early when flush_size rows are pending
+            self._wake.wait(interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except sqlite3.Error as e:
+                logger.error(f"Feedback store flush failed: {e}")
+
+    def record_prediction(
+        self, prediction_id, features, prediction, confidence, model_version=None
+    ):
+        """Queue a prediction for writing"""
+        row = (
+            prediction_id,
+            time.time(),
+            *(features[name] for name in FEATURE_COLUMNS),
+            prediction,
+            confidence,
+            model_version,
+        )
+        with self._lock:
+            self._buffer.append(row)
+            pending = len(self._buffer)
+        if pending >= self.flush_size:
+            if self._background:
+                self._wake.set()
+            else:
+                self.flush()
+
+    def flush(self):
+        """Write buffered predictions"""
+        # Swapping under _db_lock means that once flush() returns, rows taken
+        # by a concurrent flush are written too
+        with self._db_lock:
+            with self._lock:
+                rows, self._buffer = self._buffer, []
+            if not rows:
+                return
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO predictions "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    rows,
+                )
+
+    def add_label(self, prediction_id, label):
+        """Attach the true label to a prediction, returning the prediction"""
+        self.flush()
+        with self._db_lock, self._conn:
+            row = self._conn.execute(
+                "SELECT prediction FROM predictions WHERE id = ?", (prediction_id,)
+            ).fetchone()
+            if row is None:
+                raise PredictionNotFound(prediction_id)
+            prediction = row[0]
+            try:
+                self._conn.execute(
+                    "INSERT INTO labels VALUES (?, ?, ?, ?)",
+                    (prediction_id, time.time(), label, prediction),
+                )
+            except sqlite3.IntegrityError:
+                raise AlreadyLabeled(prediction_id)
+            self._conn.execute(
+                "INSERT INTO confusion VALUES (?, ?, 1) "
+                "ON CONFLICT (actual, predicted) DO UPDATE SET count = count + 1",
+                (label, prediction),
+            )
+        return prediction
+
+    def confusion_matrix(self, num_classes=3):
+        """Confusion matrix of all labeled predictions (rows are actual)"""
+        matrix = [[0] * num_classes for _ in range(num_classes)]
+        with self._db_lock:
+            rows = self._conn.execute(
+                "SELECT actual, predicted, count FROM confusion"
+            ).fetchall()
+        for actual, predicted, count in rows:
+            if actual < num_classes and predicted < num_classes:
+                matrix[actual][predicted] = count
+        return matrix
+
+    def rolling_accuracy(self, window_seconds):
+        """Accuracy of labels received in the last window_seconds"""
+        since = time.time() - window_seconds
+        with self._db_lock:
+            total, correct = self._conn.execute(
+                "SELECT COUNT(*), SUM(label = prediction) FROM labels WHERE ts >= ?",
+                (since,),
+            ).fetchone()
+        return (correct / total if total else None), total
+
+    def metrics(self, class_names, window_seconds=24 * 3600):
+        """Accuracy, rolling accuracy and per-class precision/recall"""
+        matrix = self.confusion_matrix(len(class_names))
+        total = sum(map(sum, matrix))
+        correct = sum(matrix[i][i] for i in range(len(class_names)))
+        rolling, rolling_count = self.rolling_accuracy(window_seconds)
+
+        per_class = {}
+        for i, name in class_names.items():
+            predicted = sum(matrix[a][i] for a in range(len(class_names)))
+            actual = sum(matrix[i])
+            per_class[name] = {
+                "precision": matrix[i][i] / predicted if predicted else None,
+                "recall": matrix[i][i] / actual if actual else None,
+                "support": actual,
+            }
+
+        return {
+            "labeled": total,
+            "accuracy": correct / total if total else None,
+            "rolling_accuracy": rolling,
+            "rolling_labeled": rolling_count,
+            "window_seconds": window_seconds,
+            "per_class": per_class,
+            "confusion_matrix": matrix,
+        }
+
+    def labeled_training_data(self):
+        """Labeled predictions as a DataFrame in the training data layout"""
+        import pandas as pd
+
+        self.flush()
+        with self._db_lock:
+            df = pd.read_sql_query(
+                "SELECT p.sepal_length, p.sepal_width, p.petal_length, "
+                "p.petal_width, l.label AS target "
+                "FROM labels l JOIN predictions p ON p.id = l.id ORDER BY l.ts",
+                self._conn,
+            )
+        return df.rename(columns=TRAINING_COLUMNS)
+
+    def close(self):
+        self._stop.set()
+        self._wake.set()
+        self.flush()
+        self._conn.close()
@@ -0,0 +1,115 @@
+"""High-resolution latency buckets and sliding-window quantiles
+
+Prometheus histograms only resolve latency to their bucket edges, and the
+client library's defaults start at 5 ms. LATENCY_BUCKETS configures the
+edges explicitly; otherwise they grow exponentially from 50 µs. For exact
+quantiles the API also keeps an HDR-style recorder: log-spaced bins with a
+bounded relative error, kept per time slot so quantiles can be read over
+sliding windows.
+"""
+
+import math
+import os
+import threading
+import time
+
+
+def latency_buckets():
+    """Histogram bucket edges from LATENCY_BUCKETS or an exponential series
+
+    LATENCY_BUCKETS is a comma separated list of seconds. Otherwise
+    LATENCY_BUCKET_COUNT edges start at LATENCY_BUCKET_START and grow by
+    LATENCY_BUCKET_FACTOR.
+    """
+    configured = os.getenv("LATENCY_BUCKETS")
+    if configured:
+        edges = sorted(float(edge) for edge in configured.split(",") if edge.strip())
+    else:
+        start = float(os.getenv("LATENCY_BUCKET_START", "0.00005"))
+        factor = float(os.getenv("LATENCY_BUCKET_FACTOR", "1.5"))
+        count = int(os.getenv("LATENCY_BUCKET_COUNT", "28"))
+        edges = [round(start * factor**i, 9) for i in range(count)]
+    return tuple(edges) + (float("inf"),)
+
+
+class SlidingWindowRecorder:
+    """Latency recorder reporting quantiles over recent windows
+
+    Values between lowest and highest are counted in log-spaced bins, so a
+    reported quantile is within `precision` (relative) of the true value.
+    Counts are kept per slot_seconds slot in a ring of slots covering
+    max_window seconds, so memory is fixed and old slots are simply reset.
+    """
+
+    def __init__(
+        self,
+        max_window=300,
+        slot_seconds=1.0,
+        lowest=1e-6,
+        highest=100.0,
+        precision=0.01,
+    ):
+        import numpy as np
+
+        self.slot_seconds = slot_seconds
+        self.num_slots = int(math.ceil(max_window / slot_seconds))
+        self.lowest = lowest
+        self._log_base = math.log1p(precision)
+        self.num_bins = int(math.ceil(math.log(highest / lowest) / self._log_base)) + 1
+        self._counts = np.zeros((self.num_slots, self.num_bins), dtype=np.int64)
+        self._maxima = np.zeros(self.num_slots)
+        # Absolute slot number held by each ring position
+        self._slot_ids = np.full(self.num_slots, -1, dtype=np.int64)
+        self._lock = threading.Lock()
+
+    def _bin(self, value):
+        if value <= self.lowest:
+            return 0
+        index = int(math.log(value / self.lowest) / self._log_base) + 1
+        return min(index, self.num_bins - 1)
+
+    def _bin_value(self, index):
+        # Upper edge of the bin, so quantiles are never under-reported
+        return self.lowest * math.exp(index * self._log_base)
+
+    def record(self, value, now=None):
+        now = time.time() if now is None else now
+        slot = int(now // self.slot_seconds)
+        position = slot % self.num_slots
+        index = self._bin(value)
+        with self._lock:
+            if self._slot_ids[position] != slot:
+                self._counts[position] = 0
+                self._maxima[position] = 0.0
+                self._slot_ids[position] = slot
+            self._counts[position, index] += 1
+            if value > self._maxima[position]:
+                self._maxima[position] = value
+
+    def snapshot(self, window, quantiles=(0.5, 0.9, 0.99, 0.999), now=None):
+        """Count, max and quantiles of values recorded in the last window s"""
+        import numpy as np
+
+        now = time.time() if now is None else now
+        current = int(now // self.slot_seconds)
+        oldest = current - int(math.ceil(window / self.slot_seconds)) + 1
+        with self._lock:
+            live = (self._slot_ids >= oldest) & (self._slot_ids <= current)
+            counts = self._counts[live].sum(axis=0)
+            maximum = float(self._maxima[live].max()) if live.any() else None
+
+        total = int(counts.sum())
+        result = {"window_seconds": window, "count": total, "max": maximum}
+        if total == 0:
+            result.update({f"p{_label(q)}": None for q in quantiles})
+            return result
+        cumulative = np.cumsum(counts)
+        for q in quantiles:
+            index = int(np.searchsorted(cumulative, math.ceil(q * total)))
+            result[f"p{_label(q)}"] = min(self._bin_value(index), maximum)
+        return result
+
+
+def _label(q):
+    """0.5 -> '50', 0.999 -> '999'"""
+    return f"{q * 100:g}".replace(".", "")
@@ -0,0 +1,179 @@
+"""Sampled, rate-limited prediction logging
+
+Writing every prediction to stdout and to logs/predictions.jsonl costs more
+than inference at high request rates. A policy decides which predictions
+are logged: errors and low-confidence predictions always are (unless the
+rate limit is hit), and the rest are sampled. Records use a compact
+schema: features as a list in FIELDS order, an epoch timestamp, and no
+derived fields such as the class label. Each record carries its sampling
+weight `w` (1 / probability of being logged), so consumers can compute
+unbiased averages from a sampled log. When the rate limit drops records,
+the weights of the next second's records are scaled up by the share of
+predictions the previous second dropped, so logged records keep standing
+in for the dropped ones.
+"""
+
+import json
+import logging
+import os
+import random
+import threading
+import time
+
+from prometheus_client import Counter
+
+FIELDS = ("sepal_length", "sepal_width", "petal_length", "petal_width")
+
+log_records_counter = Counter(
+    "prediction_log_records_total",
+    "Prediction log decisions",
+    ["outcome", "reason"],
+)
+
+
+class PredictionLogPolicy:
+    """Decide which predictions are logged
+
+    sample_rate is the share of ordinary predictions logged. Predictions
+    with confidence below low_confidence, and errors, are always logged.
+    max_per_second caps all records per one-second window; 0 disables it.
+
+    The probability of surviving the rate limit is only known once a
+    window is over, so it is estimated from the previous window: weights
+    are multiplied by the weight offered in that window over the weight
+    logged. Under steady load this keeps weighted averages unbiased; the
+    first second of a burst is logged with unscaled weights.
+    """
+
+    def __init__(self, sample_rate=1.0, low_confidence=0.6, max_per_second=0):
+        if not 0 <= sample_rate <= 1:
+            raise ValueError("sample_rate must be between 0 and 1")
+        self.sample_rate = sample_rate
+        self.low_confidence = low_confidence
+        self.max_per_second = max_per_second
+        self._window = None
+        self._count = 0
+        # Weights offered to and logged in the current window
+        self._offered = 0.0
+        self._logged = 0.0
+        self._scale = 1.0
+        self._lock = threading.Lock()
+
+    def _start_window(self, window):
+        """Estimate the new window's drop rate from the one before"""
+        if window == self._window + 1 and self._logged:
+            self._scale = self._offered / self._logged
+        else:
+            self._scale = 1.0
+        self._window = window
+        self._count = 0
+        self._offered = 0.0
+        self._logged = 0.0
+
+    def decide(self, confidence=None, error=False, now=None):
+        """Returns (reason, weight) for a record to log, or (None, None)"""
+        if error:
+            reason, weight = "error", 1.0
+        elif confidence is not None and confidence < self.low_confidence:
+            reason, weight = "low_confidence", 1.0
+        elif self.sample_rate >= 1 or random.random() < self.sample_rate:
+            reason, weight = "sampled", 1.0 / self.sample_rate
+        else:
+            log_records_counter.labels(outcome="sampled_out", reason="sampled").inc()
+            return None, None
+
+        if self.max_per_second:
+            window = int(time.time() if now is None else now)
+            with self._lock:
+                if self._window is None:
+                    self._window = window
+                elif window != self._window:
+                    self._start_window(window)
+                self._offered += weight
+                if self._count >= self.max_per_second:
+                    log_records_counter.labels(
+                        outcome="rate_limited", reason=reason
+                    ).inc()
+                    return None, None
+                self._count += 1
+                self._logged += weight
+                weight *= self._scale
+        log_records_counter.labels(outcome="logged", reason=reason).inc()
+        return reason, weight
+
+
+class PredictionLogger:
+    """Write compact prediction records to a JSONL file and a logger
+
+    path may be None to skip the file; the logger only formats records when
+    it would emit them at INFO level.
+    """
+
+    def __init__(self, policy, path="logs/predictions.jsonl", logger=None):
+        self.policy = policy
+        self.path = path
+        self.logger = logger
+        self._file = None
+        self._lock = threading.Lock()
+
+    def log(
+        self,
+        features,
+        prediction=None,
+        confidence=None,
+        error=None,
+        now=None,
+        **fields,
+    ):
+        """Log one prediction if the policy selects it
+
+        features is a sequence in FIELDS order; extra fields (such as the
+        trace ID, OOD score and duration) are added to the record as is.
+        """
+        reason, weight = self.policy.decide(confidence, error is not None, now)
+        if reason is None:
+            return False
+        to_logger = self.logger is not None and self.logger.isEnabledFor(logging.INFO)
+        if not to_logger and self.path is None:
+            return True
+
+        record = {
+            "ts": round(time.time() if now is None else now, 3),
+            "features": list(features),
+            "prediction": prediction,
+            "confidence": confidence,
+            "reason": reason,
+            "w": weight,
+            **fields,
+        }
+        if error is not None:
+            record["error"] = error
+        if to_logger:
+            self.logger.info("prediction_made", extra=record)
+        if self.path is not None:
+            line = json.dumps(record, separators=(",", ":")) + "\n"
+            with self._lock:
+                if self._file is None:
+                    os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                    # Line buffered: one write per record, no reopen per request
+                    self._file = open(self.path, "a", buffering=1)
+                self._file.write(line)
+        return True
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+def prediction_logger_from_env(logger=None):
+    """PredictionLogger configured by PREDICTION_LOG_* environment variables"""
+    policy = PredictionLogPolicy(
+        sample_rate=float(os.getenv("PREDICTION_LOG_SAMPLE_RATE", "1.0")),
+        low_confidence=float(os.getenv("PREDICTION_LOG_LOW_CONFIDENCE", "0.6")),
+        max_per_second=int(os.getenv("PREDICTION_LOG_MAX_PER_SECOND", "0")),
+    )
+    path = os.getenv("PREDICTION_LOG_FILE", "logs/predictions.jsonl") or None
+    to_stdout = os.getenv("PREDICTION_LOG_STDOUT", "1") == "1"
+    return PredictionLogger(policy, path, logger if to_stdout else None)
@@ -0,0 +1,202 @@
+"""Per-stage latency breakdown and opt-in request profiling"""
+
+import cProfile
+import io
+import os
+import pstats
+import tempfile
+import threading
+import time
+
+from prometheus_client import Histogram
+
+PREDICTION_STAGES = (
+    "validation",
+    "dataframe",
+    "scaling",
+    "inference",
+    "reference",
+    "metrics",
+    "logging",
+    "file_io",
+)
+
+# Inference on a single row takes well under the default 5 ms first bucket
+STAGE_BUCKETS = (
+    0.00001,
+    0.000025,
+    0.00005,
+    0.0001,
+    0.00025,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    float("inf"),
+)
+
+stage_histogram = Histogram(
+    "prediction_stage_duration_seconds",
+    "Prediction duration by stage",
+    ["stage"],
+    buckets=STAGE_BUCKETS,
+)
+
+# Resolve label children once so observing a stage is a dict lookup
+_stage_observers = {
+    stage: stage_histogram.labels(stage=stage).observe for stage in PREDICTION_STAGES
+}
+
+
+class StageTimer:
+    """Record consecutive stage durations into the stage histogram"""
+
+    __slots__ = ("_last",)
+
+    def __init__(self, start=None):
+        self._last = start if start is not None else time.perf_counter()
+
+    def mark(self, stage):
+        """Close the current stage and start the next one"""
+        now = time.perf_counter()
+        _stage_observers[stage](now - self._last)
+        self._last = now
+
+
+# Routes profiled unless others are requested when arming
+DEFAULT_PROFILE_PATHS = ("/predict",)
+
+CONTAMINATION_NOTE = (
+    "cProfile records the whole event loop thread, so requests that run "
+    "while a profiled request awaits are included in its profile"
+)
+
+
+class RequestProfiler:
+    """Capture a cProfile profile of the next N requests to some routes
+
+    Disabled unless PROFILING_ENABLED is set. When not armed the only cost
+    per request is one integer check in the middleware.
+
+    Only one request is profiled at a time, but the event loop keeps
+    serving other requests while it awaits, and their work lands in the
+    profile too. Requests arriving during a profiled request are counted
+    in overlapping_requests, so a capture taken under load can be told
+    apart from a clean one.
+    """
+
+    def __init__(self, enabled=False, paths=DEFAULT_PROFILE_PATHS):
+        self.enabled = enabled
+        self.default_paths = frozenset(paths)
+        self.paths = self.default_paths
+        self.remaining = 0
+        self.captured = 0
+        self.overlapping = 0
+        self._profile = None
+        self._active = False
+        self._lock = threading.Lock()
+
+    def arm(self, num_requests, paths=None):
+        """Start a new capture of the next num_requests requests to paths
+
+        Returns False while a request is being profiled, since replacing
+        the profile would leave that request's _stop() with a profile it
+        never enabled.
+        """
+        with self._lock:
+            if self._active:
+                return False
+            self._profile = cProfile.Profile()
+            self.paths = frozenset(paths) if paths else self.default_paths
+            self.captured = 0
+            self.overlapping = 0
+            self.remaining = num_requests
+            return True
+
+    def _start(self, path):
+        with self._lock:
+            if self.remaining <= 0:
+                return False
+            # Overlapping requests would share the profiler, so only one
+            # request is profiled at a time
+            if self._active:
+                self.overlapping += 1
+                return False
+            if path not in self.paths:
+                return False
+            self._active = True
+            self._profile.enable()
+            return True
+
+    def _stop(self):
+        with self._lock:
+            self._profile.disable()
+            self._active = False
+            self.remaining -= 1
+            self.captured += 1
+
+    def status(self):
+        return {
+            "enabled": self.enabled,
+            "paths": sorted(self.paths),
+            "remaining": self.remaining,
+            "captured": self.captured,
+            "overlapping_requests": self.overlapping,
+            "contaminated": self.overlapping > 0,
+            "note": CONTAMINATION_NOTE,
+        }
+
+    def dump(self):
+        """Return the captured profile in pstats binary format"""
+        if self._profile is None or self.captured == 0:
+            return None
+        with tempfile.NamedTemporaryFile(suffix=".prof", delete=False) as f:
+            path = f.name
+        try:
+            pstats.Stats(self._profile).dump_stats(path)
+            with open(path, "rb") as f:
+                return f.read()
+        finally:
+            os.remove(path)
+
+    def report(self, sort_by="cumulative", limit=50):
+        """Return the captured profile as a text report"""
+        if self._profile is None or self.captured == 0:
+            return None
+        stream = io.StringIO()
+        stats = pstats.Stats(self._profile, stream=stream)
+        stats.sort_stats(sort_by).print_stats(limit)
+        return stream.getvalue()
+
+
+class ProfilingMiddleware:
+    """ASGI middleware that stamps request start and runs the profiler"""
+
+    def __init__(self, app, profiler):
+        self.app = app
+        self.profiler = profiler
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        # Stored in request.state so handlers can time request parsing
+        scope.setdefault("state", {})["received_at"] = time.perf_counter()
+
+        if not self.profiler.remaining or not self.profiler._start(scope["path"]):
+            return await self.app(scope, receive, send)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.profiler._stop()
+
+
+profiler = RequestProfiler(
+    enabled=os.getenv("PROFILING_ENABLED", "0") == "1",
+    paths=os.getenv("PROFILE_PATHS", ",".join(DEFAULT_PROFILE_PATHS)).split(","),
+)
@@ -0,0 +1,64 @@
+"""Per-prediction training-set context and out-of-distribution scoring"""
+
+import logging
+
+from prometheus_client import Counter
+
+logger = logging.getLogger(__name__)
+
+INDEX_PATH = "models/reference_index.pkl"
+
+ood_counter = Counter(
+    "ood_requests_total", "Predictions flagged as out of distribution"
+)
+
+
+class ReferenceScorer:
+    """Score scaled feature rows against the saved training index"""
+
+    def __init__(self, index):
+        import numpy as np
+
+        self._einsum = np.einsum
+        self.tree = index["tree"]
+        self.labels = index["labels"]
+        self.features = index["features"]
+        self.class_means = index["class_means"]
+        self.class_inv_covariances = index["class_inv_covariances"]
+        self.ood_threshold = index["ood_threshold"]
+
+    def ood_score(self, x_scaled):
+        """Squared Mahalanobis distance to the nearest class and OOD flag"""
+        diff = x_scaled[0] - self.class_means
+        distances = self._einsum("ki,kij,kj->k", diff, self.class_inv_covariances, diff)
+        score = float(distances.min())
+        is_ood = score > self.ood_threshold
+        if is_ood:
+            ood_counter.inc()
+        return score, is_ood
+
+    def neighbors(self, x_scaled, k, class_names):
+        """The k nearest training samples in original feature units"""
+        distances, indices = self.tree.query(x_scaled, k=min(k, len(self.labels)))
+        return [
+            {
+                "distance": float(distance),
+                "label": class_names.get(int(self.labels[i]), str(self.labels[i])),
+                "features": self.features[i].tolist(),
+            }
+            for distance, i in zip(distances[0], indices[0])
+        ]
+
+
+def load_reference(path=INDEX_PATH):
+    """Load the reference index if training produced one"""
+    # Imported here so that importing the API does not pull in sklearn
+    import joblib
+
+    try:
+        return ReferenceScorer(joblib.load(path))
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.error(f"Failed to load reference index: {str(e)}")
+        return None
@@ -0,0 +1,224 @@
+"""Single-flight retrain job management for the API
+
+Concurrent /retrain triggers are coalesced: at most one job runs at a time
+and at most one follow-up job is queued behind it. Training runs in a
+separate low-priority process pinned to a subset of CPUs so it does not
+compete with request handling.
+"""
+
+import json
+import logging
+import os
+import shutil
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_COMMAND = [sys.executable, "src/retrain.py"]
+# src/retrain.py exits with this code when no trigger fired
+SKIPPED_EXIT_CODE = 3
+PROGRESS_DIR = "logs/retrain_jobs"
+MAX_HISTORY = 50
+
+# Environment variables that size native thread pools in the worker
+THREAD_LIMIT_VARS = (
+    "OMP_NUM_THREADS",
+    "OPENBLAS_NUM_THREADS",
+    "MKL_NUM_THREADS",
+    "LOKY_MAX_CPU_COUNT",
+)
+
+
+def _default_max_cpus():
+    cpus = os.cpu_count() or 1
+    return max(1, cpus // 2)
+
+
+class RetrainJob:
+    """State of one retrain job"""
+
+    def __init__(self, job_id, progress_path):
+        self.job_id = job_id
+        self.status = "queued"
+        self.created_at = datetime.now().isoformat()
+        self.started_at = None
+        self.finished_at = None
+        self.returncode = None
+        self.error = None
+        self.triggers = 1
+        self.progress_path = progress_path
+
+    def read_stages(self):
+        """Read stage events written by the training process"""
+        if not self.progress_path or not os.path.exists(self.progress_path):
+            return [], None
+        stages = []
+        current = None
+        with open(self.progress_path, "r") as f:
+            for line in f:
+                try:
+                    event = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if event.get("event") == "start":
+                    current = event["stage"]
+                elif event.get("event") == "end":
+                    stages.append(
+                        {
+                            "stage": event["stage"],
+                            "wall_seconds": event["wall_seconds"],
+                            "cpu_seconds": event["cpu_seconds"],
+                            "peak_rss_mb": event.get("peak_rss_mb"),
+                        }
+                    )
+                    if current == event["stage"]:
+                        current = None
+        return stages, current
+
+    def to_dict(self):
+        stages, current = self.read_stages()
+        return {
+            "job_id": self.job_id,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "returncode": self.returncode,
+            "error": self.error,
+            "triggers": self.triggers,
+            "progress": {
+                "stages_completed": len(stages),
+                "current_stage": current if self.status == "running" else None,
+            },
+            "stages": stages,
+        }
+
+
+class RetrainJobManager:
+    """Run retrain jobs one at a time, coalescing concurrent triggers"""
+
+    def __init__(
+        self,
+        command=None,
+        niceness=None,
+        max_cpus=None,
+        progress_dir=PROGRESS_DIR,
+    ):
+        self.command = command or DEFAULT_COMMAND
+        self.niceness = (
+            niceness if niceness is not None else int(os.getenv("RETRAIN_NICE", "10"))
+        )
+        self.max_cpus = max_cpus or int(
+            os.getenv("RETRAIN_MAX_CPUS", str(_default_max_cpus()))
+        )
+        self.progress_dir = progress_dir
+        self.jobs = OrderedDict()
+        self.running = None
+        self.queued = None
+        self._lock = threading.Lock()
+
+    def trigger(self):
+        """Request a retrain, returning the job that will serve it
+
+        Starts a job if none is running. Otherwise the request is folded
+        into the single queued follow-up job.
+        """
+        with self._lock:
+            if self.running is None:
+                job = self._new_job()
+                self._start(job)
+                return job
+            if self.queued is None:
+                self.queued = self._new_job()
+                return self.queued
+            self.queued.triggers += 1
+            return self.queued
+
+    def get(self, job_id):
+        return self.jobs.get(job_id)
+
+    def _new_job(self):
+        job_id = uuid.uuid4().hex
+        os.makedirs(self.progress_dir, exist_ok=True)
+        job = RetrainJob(job_id, os.path.join(self.progress_dir, f"{job_id}.jsonl"))
+        self.jobs[job_id] = job
+        while len(self.jobs) > MAX_HISTORY:
+            oldest_id, oldest = next(iter(self.jobs.items()))
+            if oldest in (self.running, self.queued):
+                break
+            self.jobs.pop(oldest_id)
+            if oldest.progress_path and os.path.exists(oldest.progress_path):
+                os.remove(oldest.progress_path)
+        return job
+
+    def _start(self, job):
+        # Called with the lock held
+        self.running = job
+        job.status = "running"
+        job.started_at = datetime.now().isoformat()
+        thread = threading.Thread(
+            target=self._run, args=(job,), name=f"retrain-{job.job_id}", daemon=True
+        )
+        thread.start()
+
+    def _limited_command(self):
+        """Prefix the command with nice and taskset where available
+
+        preexec_fn is not safe in a process with other threads running, so
+        the limits are applied by wrapper commands that exec the worker.
+        """
+        prefix = []
+        if self.niceness and shutil.which("nice"):
+            prefix += ["nice", "-n", str(self.niceness)]
+        if hasattr(os, "sched_getaffinity") and shutil.which("taskset"):
+            # Leave the first CPUs to the API process
+            cpus = sorted(os.sched_getaffinity(0))[-self.max_cpus :]
+            prefix += ["taskset", "-c", ",".join(map(str, cpus))]
+        return prefix + list(self.command)
+
+    def _run(self, job):
+        env = dict(os.environ, RETRAIN_PROGRESS_FILE=job.progress_path)
+        for var in THREAD_LIMIT_VARS:
+            env[var] = str(self.max_cpus)
+
+        start = time.perf_counter()
+        try:
+            result = subprocess.run(
+                self._limited_command(),
+                capture_output=True,
+                text=True,
+                env=env,
+            )
+            job.returncode = result.returncode
+            if result.returncode == 0:
+                job.status = "succeeded"
+                logger.info("Model retraining completed successfully")
+            elif result.returncode == SKIPPED_EXIT_CODE:
+                job.status = "skipped"
+                logger.info("No retraining needed")
+            else:
+                job.status = "failed"
+                job.error = result.stderr[-2000:]
+                logger.error(f"Model retraining failed: {result.stderr}")
+        except Exception as e:
+            job.status = "failed"
+            job.error = str(e)
+            logger.error(f"Retraining error: {e}")
+
+        job.finished_at = datetime.now().isoformat()
+        logger.info(
+            f"Retrain job {job.job_id} {job.status} "
+            f"in {time.perf_counter() - start:.1f}s"
+        )
+
+        with self._lock:
+            self.running = None
+            if self.queued is not None:
+                follow_up, self.queued = self.queued, None
+                self._start(follow_up)
@@ -0,0 +1,214 @@
+"""Shadow and canary serving of a candidate model next to the primary one
+
+In shadow mode every request is served by the primary model and the
+candidate scores a mirrored copy on a background thread. In canary mode a
+configurable percentage of requests is served by the candidate, and the
+other model is mirrored so agreement is measured in both directions.
+"""
+
+import hashlib
+import logging
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from prometheus_client import Counter, Histogram
+
+from api.profiling import STAGE_BUCKETS
+
+logger = logging.getLogger(__name__)
+
+MODES = ("off", "shadow", "canary")
+
+model_inference_histogram = Histogram(
+    "model_inference_duration_seconds",
+    "Scaling and inference duration by model version",
+    ["version", "role"],
+    buckets=STAGE_BUCKETS,
+)
+model_confidence_histogram = Histogram(
+    "model_confidence",
+    "Prediction confidence by model version",
+    ["version", "role"],
+    buckets=(0.4, 0.5, 0.6, 0.7, 0.8, 0.85, 0.9, 0.95, 0.99, 1.0),
+)
+model_agreement_counter = Counter(
+    "model_agreement_total",
+    "Primary and candidate predictions on the same request",
+    ["candidate_version", "result"],
+)
+shadow_dropped_counter = Counter(
+    "shadow_requests_dropped_total",
+    "Mirrored requests dropped because the shadow queue was full",
+)
+
+
+def file_version(path):
+    """Short content hash identifying a model file"""
+    with open(path, "rb") as f:
+        return hashlib.md5(f.read()).hexdigest()[:12]
+
+
+class ServedModel:
+    """A model, its scaler and a version label"""
+
+    def __init__(self, model, scaler, version):
+        self.model = model
+        self.scaler = scaler
+        self.version = version
+
+    def score(self, feature_df, role, timer=None):
+        """Scale and predict one DataFrame row, recording metrics
+
+        Returns the prediction, its confidence and the scaled features.
+        """
+        start = time.perf_counter()
+        features_scaled = self.scaler.transform(feature_df)
+        if timer is not None:
+            timer.mark("scaling")
+        probabilities = self.model.predict_proba(features_scaled)[0]
+        index = int(probabilities.argmax())
+        prediction = int(self.model.classes_[index])
+        confidence = float(probabilities[index])
+        if timer is not None:
+            timer.mark("inference")
+        model_inference_histogram.labels(version=self.version, role=role).observe(
+            time.perf_counter() - start
+        )
+        model_confidence_histogram.labels(version=self.version, role=role).observe(
+            confidence
+        )
+        return prediction, confidence, features_scaled
+
+    def score_batch(self, feature_df):
+        """Scale and predict many rows in one vectorized call
+
+        Returns arrays of predictions and confidences.
+        """
+        probabilities = self.model.predict_proba(self.scaler.transform(feature_df))
+        indices = probabilities.argmax(axis=1)
+        predictions = self.model.classes_[indices]
+        confidences = probabilities.max(axis=1)
+        return predictions, confidences
+
+
+def load_candidate(source, scaler):
+    """Load a candidate from a file path or an MLflow models:/ URI"""
+    if source.startswith("models:/") or source.startswith("runs:/"):
+        import mlflow.sklearn
+
+        mlflow_uri = os.getenv("MLFLOW_TRACKING_URI", "sqlite:///mlflow.db")
+        mlflow.set_tracking_uri(mlflow_uri)
+        model = mlflow.sklearn.load_model(source)
+        version = source.rstrip("/").split("/")[-1]
+    else:
+        import joblib
+
+        model = joblib.load(source)
+        version = file_version(source)
+    return ServedModel(model, scaler, version)
+
+
+class ModelRollout:
+    """Route requests between the primary and an optional candidate"""
+
+    def __init__(self, mode="off", traffic_percent=0.0, max_pending=100):
+        if mode not in MODES:
+            raise ValueError(f"Unknown rollout mode: {mode}")
+        self.mode = mode
+        self.traffic_percent = traffic_percent
+        self.max_pending = max_pending
+        self.candidate = None
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="shadow-scoring"
+        )
+
+    @property
+    def active(self):
+        return self.mode != "off" and self.candidate is not None
+
+    def choose(self):
+        """Pick the role that serves this request"""
+        if (
+            self.mode == "canary"
+            and self.candidate is not None
+            and random.random() * 100 < self.traffic_percent
+        ):
+            return "candidate"
+        return "primary"
+
+    def mirror(self, primary, served_role, feature_df, served_prediction):
+        """Score the other model in the background and record agreement"""
+        if not self.active:
+            return
+        with self._lock:
+            # Bounded backlog so a slow candidate cannot grow memory
+            if self._pending >= self.max_pending:
+                shadow_dropped_counter.inc()
+                return
+            self._pending += 1
+
+        other, other_role = (
+            (primary, "primary")
+            if served_role == "candidate"
+            else (self.candidate, "shadow" if self.mode == "shadow" else "candidate")
+        )
+        candidate_version = self.candidate.version
+        self._executor.submit(
+            self._score_mirror,
+            other,
+            other_role,
+            feature_df,
+            served_prediction,
+            candidate_version,
+        )
+
+    def _score_mirror(
+        self, other, role, feature_df, served_prediction, candidate_version
+    ):
+        try:
+            prediction, _, _ = other.score(feature_df, role)
+            result = "agree" if prediction == served_prediction else "disagree"
+            model_agreement_counter.labels(
+                candidate_version=candidate_version, result=result
+            ).inc()
+        except Exception as e:
+            logger.error(f"Mirrored scoring failed: {e}")
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def status(self):
+        return {
+            "mode": self.mode,
+            "traffic_percent": self.traffic_percent,
+            "candidate_version": self.candidate.version if self.candidate else None,
+        }
+
+
+def rollout_from_env(scaler):
+    """Build the rollout configured by CANDIDATE_* environment variables"""
+    rollout = ModelRollout(
+        mode=os.getenv("CANDIDATE_MODE", "off"),
+        traffic_percent=float(os.getenv("CANDIDATE_TRAFFIC_PERCENT", "0")),
+    )
+    source = os.getenv("CANDIDATE_MODEL")
+    if source and rollout.mode != "off":
+        try:
+            candidate_scaler = scaler
+            if os.getenv("CANDIDATE_SCALER"):
+                import joblib
+
+                candidate_scaler = joblib.load(os.getenv("CANDIDATE_SCALER"))
+            rollout.candidate = load_candidate(source, candidate_scaler)
+            logger.info(
+                f"Candidate model {rollout.candidate.version} loaded "
+                f"in {rollout.mode} mode"
+            )
+        except Exception as e:
+            logger.error(f"Failed to load candidate model: {str(e)}")
+    return rollout
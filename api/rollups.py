@@ -0,0 +1,205 @@
+"""Minute and hour rollups of prediction traffic
+
+Each prediction updates an in-memory accumulator for its minute. A
+background thread merges the accumulated deltas into the rollup_minute and
+rollup_hour tables with SQLite upserts, so reports read a few rows per
+time bucket instead of every raw prediction.
+"""
+
+import bisect
+import logging
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+DB_PATH = "logs/rollups.db"
+NUM_CLASSES = 3
+
+# Upper edges of the histogram bins; the last bin is open ended
+CONFIDENCE_EDGES = [0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9]
+DURATION_EDGES = [0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05]
+
+GRANULARITIES = {"minute": 60, "hour": 3600}
+
+CLASS_COLUMNS = [f"class_{i}" for i in range(NUM_CLASSES)]
+CONFIDENCE_COLUMNS = [f"conf_h{i}" for i in range(len(CONFIDENCE_EDGES) + 1)]
+DURATION_COLUMNS = [f"dur_h{i}" for i in range(len(DURATION_EDGES) + 1)]
+SUM_COLUMNS = (
+    ["count"]
+    + CLASS_COLUMNS
+    + ["conf_sum", "dur_sum"]
+    + CONFIDENCE_COLUMNS
+    + DURATION_COLUMNS
+)
+COLUMNS = ["bucket"] + SUM_COLUMNS + ["conf_min", "conf_max", "dur_max"]
+
+
+def _create_table(conn, table):
+    columns = ", ".join(f"{c} REAL NOT NULL DEFAULT 0" for c in COLUMNS[1:])
+    conn.execute(
+        f"CREATE TABLE IF NOT EXISTS {table} "
+        f"(bucket INTEGER PRIMARY KEY, {columns})"
+    )
+
+
+def _upsert_sql(table):
+    placeholders = ", ".join("?" for _ in COLUMNS)
+    updates = [f"{c} = {c} + excluded.{c}" for c in SUM_COLUMNS]
+    updates += [
+        "conf_min = MIN(conf_min, excluded.conf_min)",
+        "conf_max = MAX(conf_max, excluded.conf_max)",
+        "dur_max = MAX(dur_max, excluded.dur_max)",
+    ]
+    return (
+        f"INSERT INTO {table} ({', '.join(COLUMNS)}) VALUES ({placeholders}) "
+        f"ON CONFLICT (bucket) DO UPDATE SET {', '.join(updates)}"
+    )
+
+
+class _Bucket:
+    __slots__ = ("sums", "conf_min", "conf_max", "dur_max")
+
+    def __init__(self):
+        self.sums = [0.0] * len(SUM_COLUMNS)
+        self.conf_min = 1.0
+        self.conf_max = 0.0
+        self.dur_max = 0.0
+
+    def merge_into(self, other):
+        other.sums = [a + b for a, b in zip(other.sums, self.sums)]
+        other.conf_min = min(other.conf_min, self.conf_min)
+        other.conf_max = max(other.conf_max, self.conf_max)
+        other.dur_max = max(other.dur_max, self.dur_max)
+
+    def row(self, bucket):
+        return [bucket, *self.sums, self.conf_min, self.conf_max, self.dur_max]
+
+
+# Offsets into _Bucket.sums
+_COUNT = 0
+_CLASS = 1
+_CONF_SUM = _CLASS + NUM_CLASSES
+_DUR_SUM = _CONF_SUM + 1
+_CONF_HIST = _DUR_SUM + 1
+_DUR_HIST = _CONF_HIST + len(CONFIDENCE_COLUMNS)
+
+
+class RollupWriter:
+    """Accumulate predictions per minute and flush them as rollup deltas"""
+
+    def __init__(self, path=DB_PATH, flush_interval=5.0):
+        self.path = path
+        self._pending = {}
+        self._lock = threading.Lock()
+        # Serializes flushes on the shared connection; _lock only guards
+        # the pending buckets so record() never waits for a commit
+        self._db_lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        for granularity in GRANULARITIES:
+            _create_table(self._conn, f"rollup_{granularity}")
+
+        self._stop = threading.Event()
+        if flush_interval:
+            thread = threading.Thread(
+                target=self._flush_periodically,
+                args=(flush_interval,),
+                name="rollup-flush",
+                daemon=True,
+            )
+            thread.start()
+
+    def _flush_periodically(self, interval):
+        while not self._stop.wait(interval):
+            try:
+                self.flush()
+            except sqlite3.Error as e:
+                logger.error(f"Rollup flush failed: {e}")
+
+    def record(self, prediction, confidence, duration, timestamp=None):
+        """Add one prediction to its minute bucket"""
+        minute = int(timestamp if timestamp is not None else time.time()) // 60 * 60
+        with self._lock:
+            bucket = self._pending.get(minute)
+            if bucket is None:
+                bucket = self._pending[minute] = _Bucket()
+            sums = bucket.sums
+            sums[_COUNT] += 1
+            if 0 <= prediction < NUM_CLASSES:
+                sums[_CLASS + prediction] += 1
+            sums[_CONF_SUM] += confidence
+            sums[_DUR_SUM] += duration
+            sums[_CONF_HIST + bisect.bisect_left(CONFIDENCE_EDGES, confidence)] += 1
+            sums[_DUR_HIST + bisect.bisect_left(DURATION_EDGES, duration)] += 1
+            if confidence < bucket.conf_min:
+                bucket.conf_min = confidence
+            if confidence > bucket.conf_max:
+                bucket.conf_max = confidence
+            if duration > bucket.dur_max:
+                bucket.dur_max = duration
+
+    def flush(self):
+        """Merge pending minute deltas into the minute and hour tables"""
+        with self._db_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+            if not pending:
+                return
+
+            hours = {}
+            for minute, bucket in pending.items():
+                hour = minute // 3600 * 3600
+                bucket.merge_into(hours.setdefault(hour, _Bucket()))
+
+            with self._conn:
+                self._conn.executemany(
+                    _upsert_sql("rollup_minute"),
+                    [bucket.row(minute) for minute, bucket in pending.items()],
+                )
+                self._conn.executemany(
+                    _upsert_sql("rollup_hour"),
+                    [bucket.row(hour) for hour, bucket in hours.items()],
+                )
+
+    def close(self):
+        self._stop.set()
+        self.flush()
+        self._conn.close()
+
+
+def read_rollups(path=DB_PATH, granularity="hour", since=None):
+    """Read rollup rows from the bucket containing since (a Unix timestamp)"""
+    import pandas as pd
+
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"Unknown granularity: {granularity}")
+    seconds = GRANULARITIES[granularity]
+    since = int(since or 0) // seconds * seconds
+    conn = sqlite3.connect(path)
+    try:
+        return pd.read_sql_query(
+            f"SELECT * FROM rollup_{granularity} WHERE bucket >= ? ORDER BY bucket",
+            conn,
+            params=(since,),
+        )
+    finally:
+        conn.close()
+
+
+def summarize_rollups(df):
+    """Combine rollup rows into totals and histograms"""
+    count = int(df["count"].sum())
+    return {
+        "count": count,
+        "by_class": {i: int(df[c].sum()) for i, c in enumerate(CLASS_COLUMNS)},
+        "confidence_mean": float(df["conf_sum"].sum()) / count if count else None,
+        "confidence_min": float(df["conf_min"].min()) if count else None,
+        "confidence_max": float(df["conf_max"].max()) if count else None,
+        "confidence_histogram": [int(df[c].sum()) for c in CONFIDENCE_COLUMNS],
+        "duration_mean": float(df["dur_sum"].sum()) / count if count else None,
+        "duration_max": float(df["dur_max"].max()) if count else None,
+        "duration_histogram": [int(df[c].sum()) for c in DURATION_COLUMNS],
+    }
@@ -1,3 +1,5 @@
+from typing import List, Optional
+
 from pydantic import BaseModel, Field, field_validator
 
 
@@ -15,11 +17,36 @@ class IrisFeatures(BaseModel):
         return v
 
 
+class Neighbor(BaseModel):
+    distance: float
+    label: str
+    features: List[float]
+
+
 class PredictionResponse(BaseModel):
     prediction: int
     prediction_label: str
     confidence: float
     features: dict
+    model_version: Optional[str] = None
+    prediction_id: Optional[str] = None
+    ood_score: Optional[float] = None
+    is_ood: Optional[bool] = None
+    neighbors: Optional[List[Neighbor]] = None
+
+    model_config = {"protected_namespaces": ()}
+
+
+class FeedbackRequest(BaseModel):
+    prediction_id: str = Field(..., min_length=1, description="ID from /predict")
+    label: int = Field(..., ge=0, le=2, description="True class of the sample")
+
+
+class FeedbackResponse(BaseModel):
+    prediction_id: str
+    label: int
+    prediction: int
+    correct: bool
 
 
 class HealthResponse(BaseModel):
@@ -0,0 +1,300 @@
+"""Streaming scoring for long-lived clients
+
+Rows pushed over a WebSocket or a chunked NDJSON request body are parsed
+into a bounded queue. The scorer drains whatever is queued, up to
+max_batch rows, into one vectorized model call, so batches stay small
+when traffic is light and grow automatically under load.
+
+Flow control comes from the bounded queue and from producing results
+only as fast as the client reads them: a slow consumer stops the scorer,
+the full queue stops the reader, and the reader stops pulling from the
+socket, so memory per stream stays bounded.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+
+from prometheus_client import Counter, Histogram
+from pydantic import ValidationError
+
+from api.schemas import IrisFeatures
+
+logger = logging.getLogger(__name__)
+
+FEATURE_NAMES = [
+    "sepal length (cm)",
+    "sepal width (cm)",
+    "petal length (cm)",
+    "petal width (cm)",
+]
+
+STREAM_MAX_BATCH = int(os.getenv("STREAM_MAX_BATCH", "256"))
+STREAM_QUEUE_SIZE = int(os.getenv("STREAM_QUEUE_SIZE", "1024"))
+# Longest NDJSON line buffered while waiting for its newline
+STREAM_MAX_LINE_BYTES = int(os.getenv("STREAM_MAX_LINE_BYTES", "65536"))
+# Extra time to wait for more rows when the queue holds less than a batch
+STREAM_MAX_WAIT = float(os.getenv("STREAM_MAX_WAIT_MS", "0")) / 1000
+
+stream_rows_counter = Counter(
+    "stream_rows_total", "Rows received on scoring streams", ["result"]
+)
+stream_batch_histogram = Histogram(
+    "stream_batch_size",
+    "Rows per vectorized model call on scoring streams",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024),
+)
+stream_backpressure_counter = Counter(
+    "stream_backpressure_total",
+    "Times a stream reader waited because its queue was full",
+)
+
+_END = object()
+
+
+class OversizedLine:
+    """Stands in for a line dropped for exceeding the length limit"""
+
+    def __init__(self, limit):
+        self.limit = limit
+
+
+async def iter_lines(chunks, max_line_bytes=STREAM_MAX_LINE_BYTES):
+    """Split an async iterator of byte chunks into text lines
+
+    A line longer than max_line_bytes is dropped as soon as the buffer
+    exceeds the limit, without waiting for its newline, and an
+    OversizedLine is yielded in its place.
+    """
+    buffer = b""
+    # Dropping the rest of an oversized line until its newline
+    skipping = False
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if skipping:
+                skipping = False
+            elif len(line) > max_line_bytes:
+                yield OversizedLine(max_line_bytes)
+            elif line.strip():
+                yield line.decode()
+        if len(buffer) > max_line_bytes:
+            if not skipping:
+                yield OversizedLine(max_line_bytes)
+            skipping = True
+            buffer = b""
+    if buffer.strip() and not skipping:
+        yield buffer.decode()
+
+
+def _parse(message):
+    """Feature rows in a message: one JSON object or a JSON array of them"""
+    if isinstance(message, OversizedLine):
+        return [(None, f"Line exceeds {message.limit} bytes")]
+    try:
+        payload = json.loads(message)
+    except json.JSONDecodeError as e:
+        return [(None, f"Invalid JSON: {e.msg}")]
+    items = payload if isinstance(payload, list) else [payload]
+    rows = []
+    for item in items:
+        try:
+            features = IrisFeatures.model_validate(item)
+        except ValidationError as e:
+            rows.append((None, e.errors(include_url=False)[0]["msg"]))
+            continue
+        rows.append(
+            (
+                (
+                    features.sepal_length,
+                    features.sepal_width,
+                    features.petal_length,
+                    features.petal_width,
+                ),
+                None,
+            )
+        )
+    return rows
+
+
+class StreamScorer:
+    """Score rows from one stream in adaptive micro-batches
+
+    get_model returns the ServedModel to use, so every batch picks up the
+    currently loaded model. on_batch, if given, is called with the
+    predictions, confidences and per-row latencies of each batch.
+    """
+
+    def __init__(
+        self,
+        get_model,
+        class_names,
+        max_batch=STREAM_MAX_BATCH,
+        queue_size=STREAM_QUEUE_SIZE,
+        max_wait=STREAM_MAX_WAIT,
+        on_batch=None,
+    ):
+        self.get_model = get_model
+        self.class_names = class_names
+        self.max_batch = max_batch
+        self.queue_size = queue_size
+        self.max_wait = max_wait
+        self.on_batch = on_batch
+
+    async def _read(self, messages, queue):
+        seq = 0
+        try:
+            async for message in messages:
+                for features, error in _parse(message):
+                    if queue.full():
+                        stream_backpressure_counter.inc()
+                    await queue.put((seq, features, error, time.perf_counter()))
+                    seq += 1
+        except Exception as e:
+            logger.info(f"Stream input closed: {e}")
+        # Not reached when cancelled: nobody drains the queue any more, and
+        # waiting on a full queue would keep the task and its rows alive
+        await queue.put(_END)
+
+    async def _next_batch(self, queue):
+        first = await queue.get()
+        if first is _END:
+            return None, True
+        batch = [first]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch:
+            if queue.empty():
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(queue.get(), remaining)
+                except asyncio.TimeoutError:
+                    break
+            else:
+                item = queue.get_nowait()
+            if item is _END:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _score(self, batch):
+        results = []
+        valid = [row for row in batch if row[1] is not None]
+        if valid:
+            import pandas as pd
+
+            served = self.get_model()
+            feature_df = pd.DataFrame([row[1] for row in valid], columns=FEATURE_NAMES)
+            predictions, confidences = served.score_batch(feature_df)
+            now = time.perf_counter()
+            latencies = [now - row[3] for row in valid]
+            stream_batch_histogram.observe(len(valid))
+            if self.on_batch is not None:
+                self.on_batch(predictions, confidences, latencies)
+            scored = {
+                row[0]: (int(prediction), float(confidence))
+                for row, prediction, confidence in zip(valid, predictions, confidences)
+            }
+        for seq, features, error, _ in batch:
+            if features is None:
+                results.append({"seq": seq, "error": error})
+                continue
+            prediction, confidence = scored[seq]
+            results.append(
+                {
+                    "seq": seq,
+                    "prediction": prediction,
+                    "prediction_label": self.class_names[prediction],
+                    "confidence": confidence,
+                }
+            )
+        stream_rows_counter.labels(result="scored").inc(len(valid))
+        stream_rows_counter.labels(result="invalid").inc(len(batch) - len(valid))
+        return results
+
+    async def stream(self, messages):
+        """Yield a list of results for each batch scored from messages
+
+        Results carry the zero-based sequence number of their input row.
+        """
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        reader = asyncio.create_task(self._read(messages, queue))
+        try:
+            done = False
+            while not done:
+                batch, done = await self._next_batch(queue)
+                if batch:
+                    # Large batches run off the event loop so other
+                    # requests are not blocked behind them
+                    if len(batch) > 1:
+                        yield await asyncio.to_thread(self._score, batch)
+                    else:
+                        yield self._score(batch)
+        finally:
+            reader.cancel()
+            try:
+                await reader
+            except asyncio.CancelledError:
+                pass
+
+    async def ndjson(self, messages):
+        """Results as NDJSON, one chunk per batch"""
+        async for results in self.stream(messages):
+            yield "".join(json.dumps(result) + "\n" for result in results)
+
+
+class NDJSONStreamEndpoint:
+    """ASGI endpoint scoring a chunked NDJSON body into an NDJSON response
+
+    A plain ASGI app rather than a StreamingResponse, because the latter
+    listens for disconnects on receive() while the body is still being read
+    and would swallow the remaining body messages.
+    """
+
+    def __init__(self, scorer, is_ready):
+        self.scorer = scorer
+        self.is_ready = is_ready
+
+    async def __call__(self, scope, receive, send):
+        # is_ready may have to load the model, so it runs off the event loop
+        if not await asyncio.to_thread(self.is_ready):
+            body = json.dumps({"detail": "Model not loaded"}).encode()
+            await send(
+                {
+                    "type": "http.response.start",
+                    "status": 503,
+                    "headers": [(b"content-type", b"application/json")],
+                }
+            )
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        async def body():
+            while True:
+                message = await receive()
+                if message["type"] == "http.disconnect":
+                    return
+                yield message.get("body", b"")
+                if not message.get("more_body", False):
+                    return
+
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 200,
+                "headers": [(b"content-type", b"application/x-ndjson")],
+            }
+        )
+        async for chunk in self.scorer.ndjson(iter_lines(body())):
+            await send(
+                {
+                    "type": "http.response.body",
+                    "body": chunk.encode(),
+                    "more_body": True,
+                }
+            )
+        await send({"type": "http.response.body", "body": b""})
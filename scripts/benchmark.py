@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+"""
+Load testing and latency benchmark for the prediction API
+
+Drives the FastAPI app either in-process (ASGI transport) or over a local
+uvicorn socket, in closed-loop (fixed concurrency) or open-loop (constant
+arrival rate) mode, and saves the results as JSON so runs can be compared
+between commits.
+
+Examples:
+    python scripts/benchmark.py --target asgi --mode closed --concurrency 16 --duration 10
+    python scripts/benchmark.py --target uvicorn --mode open --rate 500 --duration 10
+    python scripts/benchmark.py --payloads logs/predictions.jsonl --output logs/bench.json
+    python scripts/benchmark.py --compare logs/bench_baseline.json
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import socket
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+import httpx
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+DEFAULT_PAYLOADS = [
+    {"sepal_length": 5.1, "sepal_width": 3.5, "petal_length": 1.4, "petal_width": 0.2},
+    {"sepal_length": 6.0, "sepal_width": 2.7, "petal_length": 4.5, "petal_width": 1.5},
+    {"sepal_length": 6.5, "sepal_width": 3.0, "petal_length": 5.5, "petal_width": 2.0},
+]
+
+FEATURE_FIELDS = ('sepal_length', 'sepal_width', 'petal_length', 'petal_width')
+PERCENTILES = {"p50": 50, "p95": 95, "p99": 99, "p999": 99.9}
+
+
+def load_payloads(path):
+    """Load request bodies from a JSONL file
+
+    Each line is either a feature dict, or a logged record with the
+    request under "features" (as in logs/predictions.jsonl) or "body".
+    """
+    if not path:
+        return DEFAULT_PAYLOADS
+
+    payloads = []
+    with open(path, 'r') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if not isinstance(record, dict):
+                continue
+            payload = record.get('features') or record.get('body') or record
+            # Prediction logs store features as a list in field order
+            if isinstance(payload, list):
+                payload = dict(zip(FEATURE_FIELDS, payload))
+            payloads.append(payload)
+
+    if not payloads:
+        raise ValueError(f"No payloads found in {path}")
+    return payloads
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+class UvicornServer:
+    """Run the API with uvicorn in a separate process on a local socket"""
+
+    def __init__(self, port):
+        self.port = port
+        self.url = f"http://127.0.0.1:{port}"
+        self.process = None
+
+    def __enter__(self):
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        self.process = subprocess.Popen(
+            [sys.executable, '-m', 'uvicorn', 'api.app:app',
+             '--host', '127.0.0.1', '--port', str(self.port), '--log-level', 'warning'],
+            cwd=root, stdout=subprocess.DEVNULL,
+        )
+        deadline = time.time() + 60
+        while True:
+            try:
+                # Ready once the model is loaded and warmed up
+                if httpx.get(f"{self.url}/readyz", timeout=1).status_code == 200:
+                    return self
+            except httpx.HTTPError:
+                pass
+            if time.time() > deadline or self.process.poll() is not None:
+                self.process.kill()
+                raise RuntimeError("uvicorn did not start")
+            time.sleep(0.1)
+
+    def __exit__(self, *exc):
+        self.process.terminate()
+        self.process.wait(timeout=10)
+
+
+def make_client(url, concurrency):
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    # An explicit URL always goes over the network, whatever the target
+    if url is None:
+        from api.app import app
+
+        transport = httpx.ASGITransport(app=app)
+        return httpx.AsyncClient(transport=transport, base_url='http://bench', limits=limits)
+    return httpx.AsyncClient(base_url=url, limits=limits, timeout=30)
+
+
+class Recorder:
+    """Collect per-request latencies and outcomes"""
+
+    def __init__(self, record_after):
+        self.latencies = []
+        self.status_counts = {}
+        self.errors = 0
+        self.record_after = record_after
+
+    def record(self, latency, status):
+        # Drop requests completed during warm-up
+        if time.perf_counter() < self.record_after:
+            return
+        self.latencies.append(latency)
+        key = str(status)
+        self.status_counts[key] = self.status_counts.get(key, 0) + 1
+        if status == 'error' or int(status) >= 400:
+            self.errors += 1
+
+
+async def send(client, endpoint, payload, recorder, scheduled_at=None):
+    # In open-loop mode latency is measured from the scheduled send time so
+    # that queueing delay is not hidden (coordinated omission)
+    start = scheduled_at if scheduled_at is not None else time.perf_counter()
+    try:
+        response = await client.post(endpoint, json=payload)
+        status = response.status_code
+    except httpx.HTTPError:
+        status = 'error'
+    recorder.record(time.perf_counter() - start, status)
+
+
+async def run_closed_loop(client, args, payloads, recorder):
+    """Fixed number of workers, each sending its next request on completion"""
+    stop_at = time.perf_counter() + args.warmup + args.duration
+    counter = iter(range(sys.maxsize))
+
+    async def worker():
+        while time.perf_counter() < stop_at:
+            i = next(counter)
+            if args.requests and i >= args.requests:
+                return
+            await send(client, args.endpoint, payloads[i % len(payloads)], recorder)
+
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+
+
+async def run_open_loop(client, args, payloads, recorder):
+    """Send requests at a constant arrival rate regardless of completions"""
+    interval = 1.0 / args.rate
+    total = int((args.warmup + args.duration) * args.rate)
+    if args.requests:
+        total = min(total, args.requests)
+
+    start = time.perf_counter()
+    tasks = []
+    for i in range(total):
+        scheduled_at = start + i * interval
+        delay = scheduled_at - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(
+            send(client, args.endpoint, payloads[i % len(payloads)], recorder, scheduled_at)
+        ))
+    await asyncio.gather(*tasks)
+
+
+async def run_benchmark(args, url=None):
+    payloads = load_payloads(args.payloads)
+
+    async with make_client(url, args.concurrency) as client:
+        runner = run_open_loop if args.mode == 'open' else run_closed_loop
+        started = time.perf_counter()
+        recorder = Recorder(record_after=started + args.warmup)
+        await runner(client, args, payloads, recorder)
+        elapsed = time.perf_counter() - recorder.record_after
+
+    return summarize(recorder, elapsed)
+
+
+def summarize(recorder, elapsed):
+    latencies = np.array(recorder.latencies)
+    count = len(latencies)
+    summary = {
+        'requests': count,
+        'duration_seconds': elapsed,
+        'throughput_rps': count / elapsed if elapsed > 0 else 0.0,
+        'error_rate': recorder.errors / count if count else 0.0,
+        'status_counts': recorder.status_counts,
+        'latency_ms': {},
+    }
+    if count:
+        summary['latency_ms'] = {
+            name: float(np.percentile(latencies, q) * 1000) for name, q in PERCENTILES.items()
+        }
+        summary['latency_ms']['mean'] = float(latencies.mean() * 1000)
+        summary['latency_ms']['max'] = float(latencies.max() * 1000)
+    return summary
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def compare(result, baseline_path, tolerance):
+    """Print deltas against a saved run, returning False on regression"""
+    with open(baseline_path, 'r') as f:
+        baseline = json.load(f)['results']
+
+    ok = True
+    print(f"\n📉 Comparison with {baseline_path} (tolerance {tolerance:.0%}):")
+    for name in PERCENTILES:
+        old = baseline['latency_ms'].get(name)
+        new = result['latency_ms'].get(name)
+        if not old or new is None:
+            continue
+        change = (new - old) / old
+        flag = '❌' if change > tolerance else '✅'
+        ok = ok and change <= tolerance
+        print(f"   {flag} {name}: {old:.3f}ms -> {new:.3f}ms ({change:+.1%})")
+
+    old_rps = baseline['throughput_rps']
+    change = (result['throughput_rps'] - old_rps) / old_rps if old_rps else 0.0
+    flag = '❌' if change < -tolerance else '✅'
+    ok = ok and change >= -tolerance
+    print(f"   {flag} throughput: {old_rps:.1f} -> {result['throughput_rps']:.1f} rps ({change:+.1%})")
+    return ok
+
+
+def print_summary(result):
+    print("\n📊 Results")
+    print(f"   Requests: {result['requests']}")
+    print(f"   Throughput: {result['throughput_rps']:.1f} req/s")
+    print(f"   Error rate: {result['error_rate']:.2%}")
+    for name, value in result['latency_ms'].items():
+        print(f"   {name}: {value:.3f} ms")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Benchmark the prediction API')
+    parser.add_argument('--target', choices=['asgi', 'uvicorn'], default='asgi')
+    parser.add_argument('--url', help='Benchmark an already running server instead')
+    parser.add_argument('--mode', choices=['closed', 'open'], default='closed')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--rate', type=float, default=200, help='Requests/s in open-loop mode')
+    parser.add_argument('--duration', type=float, default=10, help='Measured seconds')
+    parser.add_argument('--warmup', type=float, default=1, help='Unmeasured seconds')
+    parser.add_argument('--requests', type=int, default=0, help='Stop after N requests')
+    parser.add_argument('--endpoint', default='/predict')
+    parser.add_argument('--payloads', help='JSONL file of request payloads to replay')
+    parser.add_argument('--output', default='logs/benchmark.json')
+    parser.add_argument('--compare', help='Baseline JSON to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.1)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    logging.getLogger('httpx').setLevel(logging.WARNING)
+    target = args.url or args.target
+    print(f"🚀 Benchmarking {args.endpoint} ({target}, {args.mode} loop)")
+
+    if args.url:
+        result = asyncio.run(run_benchmark(args, args.url))
+    elif args.target == 'uvicorn':
+        with UvicornServer(free_port()) as server:
+            result = asyncio.run(run_benchmark(args, server.url))
+    else:
+        result = asyncio.run(run_benchmark(args))
+
+    print_summary(result)
+
+    report = {
+        'timestamp': datetime.utcnow().isoformat(),
+        'git_commit': git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'config': vars(args),
+        'results': result,
+    }
+    os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults saved to {args.output}")
+
+    if args.compare and not compare(result, args.compare, args.tolerance):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,99 +1,110 @@
-import json
+import os
+import sys
+import time
 import pandas as pd
-from datetime import datetime, timedelta
 import matplotlib.pyplot as plt
-import seaborn as sns
-import os
-import numpy as np
 
-def analyze_predictions(log_file='logs/predictions.jsonl', last_hours=24):
-    """Analyze prediction logs"""
-    
-    if not os.path.exists(log_file):
-        print(f"Log file {log_file} not found. Make some predictions first!")
-        return
-    
-    # Read logs
-    predictions = []
-    with open(log_file, 'r') as f:
-        for line in f:
-            try:
-                predictions.append(json.loads(line))
-            except json.JSONDecodeError:
-                continue
-    
-    if not predictions:
-        print("No predictions found in log file.")
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from api.rollups import (
+    CONFIDENCE_EDGES,
+    DURATION_EDGES,
+    read_rollups,
+    summarize_rollups,
+)
+
+CLASS_NAMES = {0: 'setosa', 1: 'versicolor', 2: 'virginica'}
+
+
+def _bin_labels(edges, fmt):
+    labels = [f'<{fmt(edges[0])}']
+    labels += [f'{fmt(lo)}-{fmt(hi)}' for lo, hi in zip(edges, edges[1:])]
+    labels.append(f'>{fmt(edges[-1])}')
+    return labels
+
+
+def analyze_predictions(rollup_db='logs/rollups.db', last_hours=24):
+    """Analyze prediction rollups
+
+    Reads the pre-aggregated minute/hour tables maintained by the API, so
+    the cost depends on the time range and not on the number of predictions.
+    """
+
+    if not os.path.exists(rollup_db):
+        print(f"Rollup database {rollup_db} not found. Make some predictions first!")
         return
-    
-    df = pd.DataFrame(predictions)
-    df['timestamp'] = pd.to_datetime(df['timestamp'])
-    
-    # Filter by time
-    cutoff_time = datetime.utcnow() - timedelta(hours=last_hours)
-    df = df[df['timestamp'] > cutoff_time]
-    
+
+    since = time.time() - last_hours * 3600
+    # Minute buckets give exact window edges for short ranges
+    granularity = 'minute' if last_hours <= 6 else 'hour'
+    df = read_rollups(rollup_db, granularity, since=since)
+    summary = summarize_rollups(df)
+
     print(f"\n=== Prediction Analytics (Last {last_hours} hours) ===")
-    print(f"Total predictions: {len(df)}")
-    
-    if len(df) == 0:
+    print(f"Total predictions: {summary['count']}")
+
+    if summary['count'] == 0:
         print("No predictions in the specified time range.")
         return
-    
+
+    by_class = pd.Series(
+        {CLASS_NAMES[i]: count for i, count in summary['by_class'].items()}
+    )
     print(f"\nPredictions by class:")
-    print(df['prediction_label'].value_counts())
-    
-    print(f"\nAverage confidence: {df['confidence'].mean():.3f}")
-    print(f"Min confidence: {df['confidence'].min():.3f}")
-    print(f"Max confidence: {df['confidence'].max():.3f}")
-    
-    print(f"\nAverage response time: {df['duration'].mean():.3f}s")
-    
+    print(by_class)
+
+    print(f"\nAverage confidence: {summary['confidence_mean']:.3f}")
+    print(f"Min confidence: {summary['confidence_min']:.3f}")
+    print(f"Max confidence: {summary['confidence_max']:.3f}")
+
+    print(f"\nAverage response time: {summary['duration_mean']:.3f}s")
+    print(f"Max response time: {summary['duration_max']:.3f}s")
+
     # Create visualizations
     fig, axes = plt.subplots(2, 2, figsize=(12, 8))
-    
+
     # Predictions over time
-    if len(df) > 1:
-        df.set_index('timestamp').resample('1H')['prediction'].count().plot(
-            ax=axes[0, 0]
-        )
-        axes[0, 0].set_title('Predictions per Hour')
+    hourly = read_rollups(rollup_db, 'hour', since=since)
+    if len(hourly) > 1:
+        pd.Series(
+            hourly['count'].values,
+            index=pd.to_datetime(hourly['bucket'], unit='s'),
+        ).plot(ax=axes[0, 0])
     else:
-        axes[0, 0].text(0.5, 0.5, 'Not enough data for time series', 
+        axes[0, 0].text(0.5, 0.5, 'Not enough data for time series',
                         ha='center', va='center', transform=axes[0, 0].transAxes)
-        axes[0, 0].set_title('Predictions per Hour')
-    
+    axes[0, 0].set_title('Predictions per Hour')
+
     # Class distribution
-    df['prediction_label'].value_counts().plot(kind='bar', ax=axes[0, 1])
+    by_class.plot(kind='bar', ax=axes[0, 1])
     axes[0, 1].set_title('Class Distribution')
     axes[0, 1].set_xlabel('Class')
     axes[0, 1].set_ylabel('Count')
-    
+
     # Confidence distribution
-    if df['confidence'].nunique() > 1:
-        df['confidence'].hist(bins=20, ax=axes[1, 0])
-    else:
-        axes[1, 0].bar([df['confidence'].iloc[0]], [len(df)], width=0.01)
-        axes[1, 0].set_xlim(df['confidence'].iloc[0] - 0.1, df['confidence'].iloc[0] + 0.1)
+    pd.Series(
+        summary['confidence_histogram'],
+        index=_bin_labels(CONFIDENCE_EDGES, lambda v: f'{v:.1f}'),
+    ).plot(kind='bar', ax=axes[1, 0])
     axes[1, 0].set_title('Confidence Distribution')
     axes[1, 0].set_xlabel('Confidence')
     axes[1, 0].set_ylabel('Frequency')
-    
+
     # Response time distribution
-    if df['duration'].nunique() > 1:
-        df['duration'].hist(bins=20, ax=axes[1, 1])
-    else:
-        axes[1, 1].bar([df['duration'].mean()], [len(df)], width=df['duration'].std() if df['duration'].std() > 0 else 0.001)
+    pd.Series(
+        summary['duration_histogram'],
+        index=_bin_labels(DURATION_EDGES, lambda v: f'{v * 1000:g}ms'),
+    ).plot(kind='bar', ax=axes[1, 1])
     axes[1, 1].set_title('Response Time Distribution')
-    axes[1, 1].set_xlabel('Duration (seconds)')
+    axes[1, 1].set_xlabel('Duration')
     axes[1, 1].set_ylabel('Frequency')
-    
+
     plt.tight_layout()
-    
+
     # Ensure logs directory exists
     os.makedirs('logs', exist_ok=True)
     plt.savefig('logs/monitoring_report.png', dpi=150, bbox_inches='tight')
     print("\nMonitoring report saved to logs/monitoring_report.png")
 
 if __name__ == "__main__":
-    analyze_predictions()
\ No newline at end of file
+    analyze_predictions()
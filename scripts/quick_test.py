@@ -6,6 +6,9 @@ import requests
 import random
 import time
 import json
+from datetime import datetime
+
+CLASS_NAMES = {0: 'setosa', 1: 'versicolor', 2: 'virginica'}
 
 def test_all_endpoints():
     """Test all API endpoints"""
@@ -82,7 +85,11 @@ def test_all_endpoints():
             if lines:
                 for line in lines[-3:]:  # Last 3 predictions
                     log = json.loads(line)
-                    print(f"   {log['timestamp']}: {log['prediction_label']} (confidence: {log['confidence']:.3f})")
+                    if 'error' in log:
+                        continue
+                    timestamp = datetime.fromtimestamp(log['ts']).isoformat(timespec='seconds')
+                    label = CLASS_NAMES[log['prediction']]
+                    print(f"   {timestamp}: {label} (confidence: {log['confidence']:.3f})")
             else:
                 print("   No predictions logged yet")
     except FileNotFoundError:
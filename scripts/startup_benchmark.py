@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Startup time benchmark for the prediction API
+
+Measures how long `import api.app` takes (and which modules dominate it,
+from `python -X importtime`), then starts uvicorn in a subprocess and
+records the time until /livez answers and until /readyz reports the model
+loaded and warmed up. Results are saved as JSON so runs can be compared
+between commits.
+
+Examples:
+    python scripts/startup_benchmark.py
+    python scripts/startup_benchmark.py --runs 5 --output logs/startup.json
+    python scripts/startup_benchmark.py --compare logs/startup_baseline.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+import httpx
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from benchmark import free_port, git_commit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TIMINGS = ('import_s', 'livez_s', 'readyz_s')
+
+
+def import_profile(top=10):
+    """Total import time of api.app and its slowest top-level packages"""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import api.app'],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    packages = {}
+    total = 0
+    for line in result.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line.split('|')
+        # Nesting is shown by two spaces per level after the separator
+        name = name.rstrip()[1:]
+        if name.startswith('  ') and not name.startswith('   '):
+            root = name.strip().split('.')[0]
+            packages[root] = packages.get(root, 0) + int(cumulative)
+        if name.strip() == 'api.app':
+            total = int(cumulative)
+    slowest = sorted(packages.items(), key=lambda item: -item[1])[:top]
+    return total / 1e6, {name: us / 1e6 for name, us in slowest}
+
+
+def wait_for(url, deadline, process):
+    while time.time() < deadline and process.poll() is None:
+        try:
+            if httpx.get(url, timeout=1).status_code == 200:
+                return True
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.01)
+    return False
+
+
+def server_startup(timeout=60):
+    """Seconds from process start until /livez and /readyz answer 200"""
+    port = free_port()
+    url = f"http://127.0.0.1:{port}"
+    start = time.time()
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', 'api.app:app',
+         '--host', '127.0.0.1', '--port', str(port), '--log-level', 'warning'],
+        cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        deadline = start + timeout
+        if not wait_for(f"{url}/livez", deadline, process):
+            raise RuntimeError("uvicorn did not start")
+        livez = time.time() - start
+        if not wait_for(f"{url}/readyz", deadline, process):
+            raise RuntimeError("API did not become ready (is the model trained?)")
+        return livez, time.time() - start
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+
+
+def compare(result, baseline_path, tolerance):
+    """Print deltas against a saved run, returning False on regression"""
+    with open(baseline_path, 'r') as f:
+        baseline = json.load(f)['results']
+
+    ok = True
+    print(f"\n📉 Comparison with {baseline_path} (tolerance {tolerance:.0%}):")
+    for name in TIMINGS:
+        old = baseline.get(name)
+        new = result.get(name)
+        if not old or new is None:
+            continue
+        change = (new - old) / old
+        flag = '❌' if change > tolerance else '✅'
+        ok = ok and change <= tolerance
+        print(f"   {flag} {name}: {old:.3f}s -> {new:.3f}s ({change:+.1%})")
+    return ok
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Benchmark API startup time')
+    parser.add_argument('--runs', type=int, default=3, help='Median of N server starts')
+    parser.add_argument('--output', default='logs/startup_benchmark.json')
+    parser.add_argument('--compare', help='Baseline JSON to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.2)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    print("🚀 Benchmarking API startup")
+
+    import_s, slowest = import_profile()
+    starts = [server_startup() for _ in range(args.runs)]
+    result = {
+        'import_s': import_s,
+        'livez_s': statistics.median(livez for livez, _ in starts),
+        'readyz_s': statistics.median(readyz for _, readyz in starts),
+        'slowest_imports_s': slowest,
+    }
+
+    print(f"\n📊 Results (median of {args.runs} starts)")
+    for name in TIMINGS:
+        print(f"   {name}: {result[name]:.3f}s")
+    print("   Slowest imports:")
+    for name, seconds in slowest.items():
+        print(f"     {name}: {seconds:.3f}s")
+
+    report = {
+        'timestamp': datetime.utcnow().isoformat(),
+        'git_commit': git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'config': vars(args),
+        'results': result,
+    }
+    os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults saved to {args.output}")
+
+    if args.compare and not compare(result, args.compare, args.tolerance):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
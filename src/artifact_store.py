@@ -0,0 +1,215 @@
+"""Versioned, content-addressed store for model artifacts
+
+Training publishes the model, its scaler and the reference index together
+as one version. Each artifact is pickled to a temporary file, hashed and
+moved into models/objects/<sha256>, so identical artifacts are stored once.
+A version directory models/versions/<id>/ links the artifacts under their
+names next to a manifest.json, where the id is derived from the artifact
+hashes: publishing the same artifacts again reuses the existing version.
+The version is built under a temporary name and renamed into place, and
+published by atomically replacing models/CURRENT, a one-line file holding
+the version id. Readers never see a half-written file or a model paired
+with another version's scaler, and compare current_version() with the
+version they loaded to decide whether to reload.
+
+The flat files models/best_model.pkl, scaler.pkl and reference_index.pkl
+are also replaced atomically, for scripts that read them directly.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import time
+
+logger = logging.getLogger(__name__)
+
+ARTIFACTS_DIR = "models"
+POINTER = "CURRENT"
+MANIFEST = "manifest.json"
+
+# Flat files kept up to date for readers that do not use the store
+LEGACY_NAMES = {
+    "model": "best_model.pkl",
+    "scaler": "scaler.pkl",
+    "reference_index": "reference_index.pkl",
+}
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _link_or_copy(source, target):
+    try:
+        os.link(source, target)
+    except OSError:
+        shutil.copy2(source, target)
+
+
+def _replace_with(source, target):
+    """Atomically make target a copy (or hard link) of source"""
+    tmp = f"{target}.tmp-{os.getpid()}"
+    if os.path.exists(tmp):
+        os.remove(tmp)
+    _link_or_copy(source, tmp)
+    os.replace(tmp, target)
+
+
+class ArtifactStore:
+    """Publish and resolve versions of the model artifacts"""
+
+    def __init__(self, root=ARTIFACTS_DIR):
+        self.root = root
+        self.objects_dir = os.path.join(root, "objects")
+        self.versions_dir = os.path.join(root, "versions")
+        self.pointer_path = os.path.join(root, POINTER)
+
+    def _store_object(self, obj):
+        """Pickle obj into the object directory, returning its hash"""
+        import joblib
+
+        os.makedirs(self.objects_dir, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.objects_dir, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                joblib.dump(obj, f)
+                f.flush()
+                os.fsync(f.fileno())
+            # mkstemp creates files readable by the owner only
+            os.chmod(tmp, 0o644)
+            sha = file_sha256(tmp)
+            target = os.path.join(self.objects_dir, sha)
+            if os.path.exists(target):
+                os.remove(tmp)
+            else:
+                os.replace(tmp, target)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+        return sha
+
+    def publish(self, artifacts, metadata=None, export_legacy=True):
+        """Store {name: object} as a version and make it current
+
+        Returns the version id.
+        """
+        hashes = {name: self._store_object(obj) for name, obj in artifacts.items()}
+        version = hashlib.sha256(
+            json.dumps(hashes, sort_keys=True).encode()
+        ).hexdigest()[:16]
+        version_dir = os.path.join(self.versions_dir, version)
+
+        if os.path.isdir(version_dir):
+            logger.info(f"Artifacts unchanged, reusing version {version}")
+        else:
+            os.makedirs(self.versions_dir, exist_ok=True)
+            staging = tempfile.mkdtemp(dir=self.versions_dir, prefix=".tmp-")
+            try:
+                for name, sha in hashes.items():
+                    _link_or_copy(
+                        os.path.join(self.objects_dir, sha),
+                        os.path.join(staging, f"{name}.pkl"),
+                    )
+                manifest = {
+                    "version": version,
+                    "created_at": time.time(),
+                    "artifacts": {
+                        name: {"file": f"{name}.pkl", "sha256": sha}
+                        for name, sha in hashes.items()
+                    },
+                    "metadata": metadata or {},
+                }
+                with open(os.path.join(staging, MANIFEST), "w") as f:
+                    json.dump(manifest, f, indent=2)
+                os.rename(staging, version_dir)
+            except OSError:
+                shutil.rmtree(staging, ignore_errors=True)
+                # Another writer published the same version first
+                if not os.path.isdir(version_dir):
+                    raise
+
+        self._set_current(version)
+        if export_legacy:
+            for name, sha in hashes.items():
+                if name in LEGACY_NAMES:
+                    _replace_with(
+                        os.path.join(self.objects_dir, sha),
+                        os.path.join(self.root, LEGACY_NAMES[name]),
+                    )
+        logger.info(f"Published artifact version {version}")
+        return version
+
+    def _set_current(self, version):
+        tmp = f"{self.pointer_path}.tmp-{os.getpid()}"
+        with open(tmp, "w") as f:
+            f.write(version + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.pointer_path)
+
+    def current_version(self):
+        """Id of the published version, or None; cheap enough to poll"""
+        try:
+            with open(self.pointer_path) as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def manifest(self, version=None):
+        version = version or self.current_version()
+        if version is None:
+            return None
+        with open(os.path.join(self.versions_dir, version, MANIFEST)) as f:
+            return json.load(f)
+
+    def paths(self, version=None):
+        """{name: file path} of a version (default current)
+
+        Falls back to the flat legacy files when nothing has been published.
+        """
+        manifest = self.manifest(version)
+        if manifest is None:
+            return {
+                name: os.path.join(self.root, filename)
+                for name, filename in LEGACY_NAMES.items()
+            }
+        directory = os.path.join(self.versions_dir, manifest["version"])
+        return {
+            name: os.path.join(directory, entry["file"])
+            for name, entry in manifest["artifacts"].items()
+        }
+
+    def versions(self):
+        """Published version ids, oldest first"""
+        if not os.path.isdir(self.versions_dir):
+            return []
+        entries = [
+            (os.path.getmtime(os.path.join(self.versions_dir, name)), name)
+            for name in os.listdir(self.versions_dir)
+            if not name.startswith(".")
+        ]
+        return [name for _, name in sorted(entries)]
+
+    def prune(self, keep=5):
+        """Delete all but the newest keep versions and unreferenced objects"""
+        current = self.current_version()
+        old = [v for v in self.versions()[:-keep] if v != current]
+        for version in old:
+            shutil.rmtree(os.path.join(self.versions_dir, version))
+        referenced = {
+            entry["sha256"]
+            for version in self.versions()
+            for entry in self.manifest(version)["artifacts"].values()
+        }
+        if os.path.isdir(self.objects_dir):
+            for name in os.listdir(self.objects_dir):
+                if not name.startswith(".") and name not in referenced:
+                    os.remove(os.path.join(self.objects_dir, name))
+        return old
@@ -1,15 +1,22 @@
 import os
+import argparse
+import asyncio
 import time
-import hashlib
-import pandas as pd
 from pathlib import Path
 from datetime import datetime, timedelta
 import logging
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
-import schedule
 from train import train_models
-import json  # Added for JSONDecodeError
+from retrain_triggers import (
+    AccuracyTrigger,
+    DataDriftTrigger,
+    DataHashTrigger,
+    LiveDriftTrigger,
+    ModelAgeTrigger,
+    PerformanceTrigger,
+    TriggerEngine,
+)
 
 logging.basicConfig(
     level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
@@ -18,25 +25,35 @@ logger = logging.getLogger(__name__)
 
 
 class DataChangeHandler(FileSystemEventHandler):
-    """Monitor data directory for changes"""
+    """Forward data file events to the scheduler without doing any work"""
 
-    def __init__(self, retrainer):
-        self.retrainer = retrainer
-        self.last_trigger = datetime.now() - timedelta(minutes=5)  # Cooldown period
+    def __init__(self, scheduler, filename="iris.csv"):
+        self.scheduler = scheduler
+        self.filename = filename
+
+    def _forward(self, path):
+        if path.endswith(self.filename):
+            self.scheduler.notify_data_changed(path)
 
     def on_modified(self, event):
-        if event.src_path.endswith("iris.csv") and not event.is_directory:
-            # Avoid multiple triggers in quick succession
-            if (datetime.now() - self.last_trigger).seconds > 60:
-                logger.info(f"Data file changed: {event.src_path}")
-                self.last_trigger = datetime.now()
-                self.retrainer.check_and_retrain()
+        if not event.is_directory:
+            self._forward(event.src_path)
+
+    def on_created(self, event):
+        if not event.is_directory:
+            self._forward(event.src_path)
+
+    def on_moved(self, event):
+        # Atomic replacements show up as a move onto the data file
+        if not event.is_directory:
+            self._forward(event.dest_path)
 
 
 class AutoRetrainer:
     """Automatic model retraining based on various triggers"""
 
-    def __init__(self):
+    def __init__(self, short_circuit=False):
+        self.data_path = "data/raw/iris.csv"
         self.data_hash_file = Path("models/data_hash.txt")
         self.last_training_file = Path("models/last_training.txt")
         self.performance_file = Path("models/performance_metrics.txt")
@@ -46,119 +63,41 @@ class AutoRetrainer:
         os.makedirs("models", exist_ok=True)
         os.makedirs("logs", exist_ok=True)
 
+        self.hash_trigger = DataHashTrigger(self.data_path, self.data_hash_file)
+        self.drift_trigger = DataDriftTrigger(self.data_path, "models/data_stats.json")
+        self.performance_trigger = PerformanceTrigger("logs/predictions.jsonl")
+        self.engine = TriggerEngine(
+            [
+                ModelAgeTrigger(self.last_training_file),
+                AccuracyTrigger("logs/feedback.db"),
+                LiveDriftTrigger("models/live_drift.json", self.last_training_file),
+                self.hash_trigger,
+                self.drift_trigger,
+                self.performance_trigger,
+            ],
+            short_circuit=short_circuit,
+        )
+
     def get_data_hash(self):
-        """Calculate hash of current data"""
-        try:
-            data = pd.read_csv("data/raw/iris.csv")
-            return hashlib.md5(data.to_csv().encode()).hexdigest()
-        except Exception as e:
-            logger.error(f"Error calculating data hash: {e}")
-            return None
+        """Calculate hash of current data (cached until the file changes)"""
+        return self.hash_trigger.current_hash()
 
     def check_data_drift(self):
         """Check for data drift by comparing statistics"""
-        try:
-            current_data = pd.read_csv("data/raw/iris.csv")
-
-            # Calculate basic statistics
-            stats = {
-                "mean": current_data.select_dtypes(include=[float, int])
-                .mean()
-                .to_dict(),
-                "std": current_data.select_dtypes(include=[float, int]).std().to_dict(),
-                "shape": current_data.shape,
-            }
-
-            # Compare with stored statistics
-            stats_file = Path("models/data_stats.json")
-            if stats_file.exists():
-                with open(stats_file, "r") as f:
-                    old_stats = json.load(f)
-
-                # Simple drift detection: check if mean changed significantly
-                for col, mean in stats["mean"].items():
-                    if col in old_stats["mean"]:
-                        drift = (
-                            abs(mean - old_stats["mean"][col]) / old_stats["mean"][col]
-                        )
-                        if drift > 0.1:  # 10% change
-                            return True, f"Drift detected in {col}: {drift:.2%}"
-
-            # Save current stats
-            with open(stats_file, "w") as f:
-                json.dump(stats, f)
-
-            return False, None
-
-        except Exception as e:
-            logger.error(f"Error checking data drift: {e}")
-            return False, None
+        return self.drift_trigger.check()
 
     def check_model_performance(self):
         """Check if model performance has degraded"""
-        try:
-            # Read recent predictions log
-            predictions_file = Path("logs/predictions.jsonl")
-            if not predictions_file.exists():
-                return False, None
-
-            # Analyze recent predictions
-            recent_predictions = []
-            with open(predictions_file, "r") as f:
-                for line in f:
-                    try:
-                        recent_predictions.append(json.loads(line))
-                    except json.JSONDecodeError:  # UPDATED: was bare except
-                        continue
-
-            if len(recent_predictions) < 100:
-                return False, None
-
-            # Check average confidence
-            recent_confidences = [p["confidence"] for p in recent_predictions[-100:]]
-            avg_confidence = sum(recent_confidences) / len(recent_confidences)
-
-            # If confidence drops below threshold, trigger retraining
-            if avg_confidence < 0.85:
-                return True, f"Low average confidence: {avg_confidence:.2f}"
-
-            return False, None
-
-        except Exception as e:
-            logger.error(f"Error checking performance: {e}")
-            return False, None
+        return self.performance_trigger.check()
 
     def should_retrain(self):
-        """Check all conditions for retraining"""
-        reasons = []
-
-        # Check 1: Data changed
-        current_hash = self.get_data_hash()
-        if current_hash and self.data_hash_file.exists():
-            stored_hash = self.data_hash_file.read_text().strip()
-            if current_hash != stored_hash:
-                reasons.append("Data hash changed")
-
-        # Check 2: Time-based (weekly)
-        if self.last_training_file.exists():
-            last_training = datetime.fromisoformat(
-                self.last_training_file.read_text().strip()
-            )
-            days_since = (datetime.now() - last_training).days
-            if days_since >= 7:
-                reasons.append(f"Model is {days_since} days old")
-
-        # Check 3: Data drift
-        has_drift, drift_reason = self.check_data_drift()
-        if has_drift:
-            reasons.append(drift_reason)
-
-        # Check 4: Performance degradation
-        has_degraded, perf_reason = self.check_model_performance()
-        if has_degraded:
-            reasons.append(perf_reason)
-
-        return len(reasons) > 0, reasons
+        """Check all conditions for retraining, cheapest first"""
+        start = time.perf_counter()
+        result = self.engine.evaluate()
+        logger.info(
+            f"Retrain checks took {(time.perf_counter() - start) * 1000:.1f} ms"
+        )
+        return result
 
     def check_and_retrain(self):
         """Check conditions and retrain if needed"""
@@ -185,6 +124,9 @@ class AutoRetrainer:
 
                 self.last_training_file.write_text(datetime.now().isoformat())
 
+                # Trigger results from before the retrain are stale now
+                self.engine.invalidate()
+
                 logger.info("✅ Retraining completed successfully!")
 
                 # Log success
@@ -201,41 +143,145 @@ class AutoRetrainer:
             logger.info("✓ No retraining needed")
 
 
-def run_monitoring():
-    """Run automatic monitoring"""
-    retrainer = AutoRetrainer()
+class RetrainScheduler:
+    """Asyncio scheduler for retrain checks
 
-    # Set up file system monitoring
-    event_handler = DataChangeHandler(retrainer)
-    observer = Observer()
-    observer.schedule(event_handler, path="data/raw", recursive=False)
-    observer.start()
+    File events are debounced: a check runs once no event has arrived for
+    quiet_period seconds. Periodic and daily checks fire at their due time.
+    Checks run in a worker thread, one at a time; requests arriving while a
+    check is running are coalesced into a single follow-up check.
+    """
 
-    # Set up scheduled checks
-    schedule.every(1).hours.do(retrainer.check_and_retrain)
-    schedule.every().day.at("02:00").do(retrainer.check_and_retrain)
+    def __init__(self, retrainer, quiet_period=5.0, interval=3600, daily_at="02:00"):
+        self.retrainer = retrainer
+        self.quiet_period = quiet_period
+        self.interval = interval
+        self.daily_at = datetime.strptime(daily_at, "%H:%M").time()
+        self.loop = None
+        self._debounce_handle = None
+        self._check_task = None
+        self._pending_reason = None
+        self._stopped = None
+
+    def notify_data_changed(self, path):
+        """Called from the watchdog thread for every data file event"""
+        self.loop.call_soon_threadsafe(self._debounce, path)
+
+    def _debounce(self, path):
+        if self._debounce_handle is not None:
+            self._debounce_handle.cancel()
+        self._debounce_handle = self.loop.call_later(
+            self.quiet_period, self._on_quiet, path
+        )
+
+    def _on_quiet(self, path):
+        self._debounce_handle = None
+        logger.info(f"Data file changed: {path}")
+        self.request_check("data change")
+
+    def request_check(self, reason):
+        """Run a check now, or once after the running check finishes"""
+        if self._check_task is not None and not self._check_task.done():
+            self._pending_reason = reason
+            return
+        self._check_task = self.loop.create_task(self._run_check(reason))
+
+    async def _run_check(self, reason):
+        while reason is not None:
+            logger.info(f"Running retrain check ({reason})")
+            try:
+                await self.loop.run_in_executor(None, self.retrainer.check_and_retrain)
+            except Exception as e:
+                logger.error(f"Retrain check failed: {e}")
+            reason, self._pending_reason = self._pending_reason, None
+
+    def _schedule_periodic(self, due):
+        def fire():
+            self.request_check("periodic")
+            # Schedule from the previous due time so intervals do not drift
+            self._schedule_periodic(due + self.interval)
+
+        self.loop.call_at(due, fire)
+
+    def _seconds_until_daily(self):
+        now = datetime.now()
+        due = datetime.combine(now.date(), self.daily_at)
+        if due <= now:
+            due += timedelta(days=1)
+        return (due - now).total_seconds()
+
+    def _schedule_daily(self):
+        def fire():
+            self.request_check("daily")
+            self._schedule_daily()
+
+        self.loop.call_later(self._seconds_until_daily(), fire)
+
+    def stop(self):
+        self.loop.call_soon_threadsafe(self._stopped.set)
+
+    async def run(self, watch_path="data/raw"):
+        self.loop = asyncio.get_running_loop()
+        self._stopped = asyncio.Event()
+
+        observer = Observer()
+        observer.schedule(DataChangeHandler(self), path=watch_path, recursive=False)
+        observer.start()
+
+        self._schedule_periodic(self.loop.time() + self.interval)
+        self._schedule_daily()
+
+        try:
+            await self._stopped.wait()
+        finally:
+            observer.stop()
+            observer.join()
+            if self._check_task is not None:
+                await self._check_task
+
+
+def run_monitoring(quiet_period=5.0, interval=3600, daily_at="02:00", retrainer=None):
+    """Run automatic monitoring"""
+    retrainer = retrainer or AutoRetrainer()
+    scheduler = RetrainScheduler(
+        retrainer, quiet_period=quiet_period, interval=interval, daily_at=daily_at
+    )
 
     logger.info("🚀 Automatic retraining monitor started!")
     logger.info("Monitoring:")
-    logger.info("  - File changes in data/raw/")
-    logger.info("  - Hourly performance checks")
-    logger.info("  - Daily scheduled check at 02:00")
+    logger.info(f"  - File changes in data/raw/ (quiet period {quiet_period}s)")
+    logger.info(f"  - Periodic checks every {interval}s")
+    logger.info(f"  - Daily scheduled check at {daily_at}")
 
     try:
-        while True:
-            schedule.run_pending()
-            time.sleep(30)  # Check every 30 seconds
+        asyncio.run(scheduler.run())
     except KeyboardInterrupt:
-        observer.stop()
         logger.info("Monitor stopped")
-    observer.join()
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Automatic retraining monitor")
+    parser.add_argument(
+        "--quiet-period",
+        type=float,
+        default=float(os.getenv("RETRAIN_QUIET_PERIOD", "5")),
+        help="Seconds without data file events before a check runs",
+    )
+    parser.add_argument(
+        "--interval", type=float, default=3600, help="Seconds between periodic checks"
+    )
+    parser.add_argument("--daily-at", default="02:00", help="Daily check time (HH:MM)")
+    parser.add_argument(
+        "--short-circuit",
+        action="store_true",
+        help="Stop evaluating triggers once one fires",
+    )
+    args = parser.parse_args()
+
     # Run initial check
-    retrainer = AutoRetrainer()
+    retrainer = AutoRetrainer(short_circuit=args.short_circuit)
     retrainer.check_and_retrain()
 
     # Start monitoring
     print("\nStarting automatic monitoring... (Press Ctrl+C to stop)")
-    run_monitoring()
+    run_monitoring(args.quiet_period, args.interval, args.daily_at, retrainer)
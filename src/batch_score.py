@@ -0,0 +1,327 @@
+"""Offline batch scoring for large files of iris features.
+
+The input file is split into byte ranges (CSV/JSONL) or row groups (Parquet).
+Each worker reads, parses and scores its own chunk with the model and scaler,
+which are scattered to the workers once, so parsing scales with the number
+of workers as well as inference. Chunks run on an execution backend (see
+execution.py), so scoring can spread over a cluster whose nodes can read
+the input file. Results are written in input order and a checkpoint is kept next
+to the output file so an interrupted run can be resumed.
+"""
+
+import argparse
+import io
+import json
+import logging
+import os
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from artifact_store import ArtifactStore
+from execution import get_backend
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+FEATURE_NAMES = [
+    "sepal length (cm)",
+    "sepal width (cm)",
+    "petal length (cm)",
+    "petal width (cm)",
+]
+
+# Column names accepted by the API, mapped to the training column names
+API_FEATURE_NAMES = {
+    "sepal_length": "sepal length (cm)",
+    "sepal_width": "sepal width (cm)",
+    "petal_length": "petal length (cm)",
+    "petal_width": "petal width (cm)",
+}
+
+CLASS_NAMES = {0: "setosa", 1: "versicolor", 2: "virginica"}
+
+
+def detect_format(path):
+    """Infer file format from the extension"""
+    suffix = os.path.splitext(path)[1].lower()
+    if suffix in (".csv", ".txt"):
+        return "csv"
+    if suffix in (".jsonl", ".ndjson", ".json"):
+        return "jsonl"
+    if suffix in (".parquet", ".pq"):
+        return "parquet"
+    raise ValueError(f"Unsupported file format: {path}")
+
+
+def plan_chunks(path, fmt, chunk_bytes):
+    """Split the input into independent chunks.
+
+    CSV and JSONL chunks are byte ranges aligned to line boundaries, Parquet
+    chunks are row groups. Returns the chunk list and the CSV header (if any).
+    """
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+
+        num_row_groups = pq.ParquetFile(path).num_row_groups
+        return [("parquet", path, i, None) for i in range(num_row_groups)], None
+
+    size = os.path.getsize(path)
+    header = None
+    with open(path, "rb") as f:
+        if fmt == "csv":
+            header = f.readline().decode().strip().split(",")
+        start = f.tell()
+        chunks = []
+        while start < size:
+            f.seek(min(start + chunk_bytes, size))
+            # Extend the range to the end of the current line
+            if f.tell() < size:
+                f.readline()
+            end = f.tell()
+            chunks.append((fmt, path, start, end))
+            start = end
+    return chunks, header
+
+
+def read_chunk(chunk, header=None):
+    """Read one chunk into a DataFrame with training column names"""
+    fmt, path, start, end = chunk
+
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+
+        df = pq.ParquetFile(path).read_row_group(start).to_pandas()
+    else:
+        with open(path, "rb") as f:
+            f.seek(start)
+            data = f.read(end - start)
+        if fmt == "csv":
+            df = pd.read_csv(io.BytesIO(data), header=None, names=header)
+        else:
+            df = pd.read_json(io.BytesIO(data), lines=True)
+
+    df = df.rename(columns=API_FEATURE_NAMES)
+    missing = [c for c in FEATURE_NAMES if c not in df.columns]
+    if missing:
+        raise ValueError(f"Missing feature columns: {missing}")
+    return df[FEATURE_NAMES]
+
+
+def score_frame(df, model, scaler):
+    """Score a feature DataFrame, returning predictions and confidences"""
+    features_scaled = scaler.transform(df)
+    probabilities = model.predict_proba(features_scaled)
+    predictions = model.classes_[np.argmax(probabilities, axis=1)]
+    confidences = probabilities.max(axis=1)
+    return predictions.astype(np.int64), confidences
+
+
+def _score_chunk(task, artifacts):
+    """Backend task: read and score one (chunk, header)"""
+    chunk, header = task
+    df = read_chunk(chunk, header)
+    return score_frame(df, artifacts["model"], artifacts["scaler"])
+
+
+def format_results(predictions, confidences, row_offset, out_fmt, write_header):
+    """Render a chunk of results in the output format"""
+    labels = [CLASS_NAMES.get(int(p), str(p)) for p in predictions]
+    df = pd.DataFrame(
+        {
+            "row_id": np.arange(row_offset, row_offset + len(predictions)),
+            "prediction": predictions,
+            "prediction_label": labels,
+            "confidence": confidences,
+        }
+    )
+    if out_fmt == "csv":
+        return df.to_csv(index=False, header=write_header)
+    return df.to_json(orient="records", lines=True) + "\n"
+
+
+def _fingerprint(path):
+    stat = os.stat(path)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def _load_checkpoint(checkpoint_path, expected):
+    """Return the saved checkpoint if it belongs to the same job"""
+    if not os.path.exists(checkpoint_path):
+        return None
+    try:
+        with open(checkpoint_path, "r") as f:
+            checkpoint = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+    if any(checkpoint.get(k) != v for k, v in expected.items()):
+        logger.warning("Checkpoint does not match this job, starting over")
+        return None
+    return checkpoint
+
+
+def _save_checkpoint(checkpoint_path, checkpoint):
+    tmp_path = checkpoint_path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(checkpoint, f)
+    os.replace(tmp_path, checkpoint_path)
+
+
+def batch_score(
+    input_path,
+    output_path,
+    model_path=None,
+    scaler_path=None,
+    chunk_mb=32,
+    workers=None,
+    resume=True,
+    backend=None,
+):
+    """Score a CSV/Parquet/JSONL file and write predictions in input order
+
+    Model and scaler default to the published artifact version, so both
+    come from the same training run. backend names the execution backend
+    (default EXECUTION_BACKEND or loky).
+    """
+    published = ArtifactStore().paths()
+    model_path = model_path or published["model"]
+    scaler_path = scaler_path or published["scaler"]
+    fmt = detect_format(input_path)
+    out_fmt = "jsonl" if detect_format(output_path) == "jsonl" else "csv"
+    chunk_bytes = int(chunk_mb * 1024 * 1024)
+
+    chunks, header = plan_chunks(input_path, fmt, chunk_bytes)
+    checkpoint_path = output_path + ".checkpoint.json"
+    job = {
+        "input": os.path.abspath(input_path),
+        "input_fingerprint": _fingerprint(input_path),
+        # A retrain between crash and resume must not mix two models
+        "model_fingerprint": _fingerprint(model_path),
+        "scaler_fingerprint": _fingerprint(scaler_path),
+        "chunk_bytes": chunk_bytes,
+        "num_chunks": len(chunks),
+    }
+
+    checkpoint = _load_checkpoint(checkpoint_path, job) if resume else None
+    if checkpoint and os.path.exists(output_path):
+        next_chunk = checkpoint["next_chunk"]
+        rows_written = checkpoint["rows"]
+        out = open(output_path, "r+b")
+        out.truncate(checkpoint["output_bytes"])
+        out.seek(checkpoint["output_bytes"])
+        logger.info(f"Resuming from chunk {next_chunk}/{len(chunks)}")
+    else:
+        next_chunk = 0
+        rows_written = 0
+        out = open(output_path, "wb")
+
+    executor = get_backend(backend, workers)
+    logger.info(
+        f"Scoring {input_path} ({len(chunks)} chunks) "
+        f"with {executor.workers} workers..."
+    )
+    start_time = time.perf_counter()
+    rows_scored = 0
+    bytes_scored = 0
+
+    try:
+        with executor:
+            artifacts = executor.scatter(
+                {"model": joblib.load(model_path), "scaler": joblib.load(scaler_path)}
+            )
+            # Results come back in input order, with a bounded number of
+            # chunks in flight to cap memory
+            results = executor.imap(
+                _score_chunk,
+                ((chunk, header) for chunk in chunks[next_chunk:]),
+                artifacts,
+            )
+            for index, (predictions, confidences) in enumerate(results, next_chunk):
+                text = format_results(
+                    predictions,
+                    confidences,
+                    rows_written,
+                    out_fmt,
+                    write_header=(out_fmt == "csv" and rows_written == 0),
+                )
+                out.write(text.encode())
+                out.flush()
+
+                rows_written += len(predictions)
+                rows_scored += len(predictions)
+                if fmt != "parquet":
+                    bytes_scored += chunks[index][3] - chunks[index][2]
+
+                _save_checkpoint(
+                    checkpoint_path,
+                    {
+                        **job,
+                        "next_chunk": index + 1,
+                        "rows": rows_written,
+                        "output_bytes": out.tell(),
+                    },
+                )
+    finally:
+        out.close()
+
+    elapsed = time.perf_counter() - start_time
+    if os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+
+    stats = {
+        "rows": rows_written,
+        "rows_scored": rows_scored,
+        "seconds": elapsed,
+        "rows_per_second": rows_scored / elapsed if elapsed > 0 else 0.0,
+        "mb_per_second": bytes_scored / 1024 / 1024 / elapsed if elapsed > 0 else 0.0,
+        "workers": executor.workers,
+        "backend": executor.name,
+    }
+    logger.info(
+        f"Scored {rows_scored} rows in {elapsed:.2f}s "
+        f"({stats['rows_per_second']:.0f} rows/s, "
+        f"{stats['mb_per_second']:.1f} MB/s)"
+    )
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch score iris features")
+    parser.add_argument("input", help="Input CSV, Parquet or JSONL file")
+    parser.add_argument("output", help="Output CSV or JSONL file")
+    parser.add_argument(
+        "--model", default=None, help="Model file (default the published version)"
+    )
+    parser.add_argument(
+        "--scaler", default=None, help="Scaler file (default the published version)"
+    )
+    parser.add_argument("--chunk-mb", type=float, default=32)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument(
+        "--backend",
+        choices=["loky", "local", "dask"],
+        default=None,
+        help="Execution backend (default EXECUTION_BACKEND or loky)",
+    )
+    parser.add_argument(
+        "--no-resume", action="store_true", help="Ignore any saved checkpoint"
+    )
+    args = parser.parse_args()
+
+    stats = batch_score(
+        args.input,
+        args.output,
+        model_path=args.model,
+        scaler_path=args.scaler,
+        chunk_mb=args.chunk_mb,
+        workers=args.workers,
+        resume=not args.no_resume,
+        backend=args.backend,
+    )
+    print(json.dumps(stats, indent=2))
+
+
+if __name__ == "__main__":
+    main()
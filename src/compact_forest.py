@@ -0,0 +1,180 @@
+"""Compact serving format for RandomForest classifiers
+
+A fitted forest pickles every sklearn Tree with 64-byte node records and a
+float64 class-count array per node. For serving only four small arrays per
+node are needed, so all trees are packed into contiguous struct-of-arrays:
+int16 feature ids and child indices (relative to the tree), float32
+thresholds and leaf class distributions quantized to uint8 (or stored as
+float16). Leaves point to themselves, so traversal is a fixed number of
+vectorized steps that advance every tree for every row of a batch at once.
+
+The arrays are saved as a plain dict (to_dict), like the reference index,
+and can be loaded with joblib's mmap_mode="r" so server workers share one
+copy through the page cache.
+"""
+
+import argparse
+import logging
+import pickle
+
+import numpy as np
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+LEAF_DTYPES = ("uint8", "float16", "float32")
+UINT8_SCALE = 255
+
+# Rows per traversal step; bounds the (trees x rows) index arrays
+MAX_BATCH_ROWS = 1024
+
+
+def _float32_floor(values):
+    """Largest float32 <= each value
+
+    Features are float32, so x <= t holds exactly when x <= floor32(t);
+    rounding a threshold up instead would send boundary rows the wrong way.
+    """
+    rounded = values.astype(np.float32)
+    too_high = rounded.astype(np.float64) > values
+    rounded[too_high] = np.nextafter(rounded[too_high], np.float32(-np.inf))
+    return rounded
+
+
+class CompactForest:
+    """Struct-of-arrays forest with a batched predict_proba"""
+
+    ARRAYS = ("feature", "threshold", "left", "right", "values", "offsets")
+
+    def __init__(
+        self, feature, threshold, left, right, values, offsets, classes, max_depth
+    ):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.values = values
+        self.offsets = offsets
+        self.classes_ = np.asarray(classes)
+        self.max_depth = int(max_depth)
+
+    @classmethod
+    def from_forest(cls, forest, leaf_dtype="uint8"):
+        """Pack a fitted RandomForestClassifier (single output)"""
+        if leaf_dtype not in LEAF_DTYPES:
+            raise ValueError(f"leaf_dtype must be one of {LEAF_DTYPES}")
+        trees = [estimator.tree_ for estimator in forest.estimators_]
+        if max(tree.node_count for tree in trees) > np.iinfo(np.int16).max:
+            raise ValueError("Trees are too large for int16 node indices")
+
+        features, thresholds, lefts, rights, values = [], [], [], [], []
+        for tree in trees:
+            nodes = np.arange(tree.node_count)
+            leaf = tree.children_left < 0
+            features.append(np.where(leaf, 0, tree.feature))
+            thresholds.append(np.where(leaf, 0.0, tree.threshold))
+            lefts.append(np.where(leaf, nodes, tree.children_left))
+            rights.append(np.where(leaf, nodes, tree.children_right))
+            # Per-node class distribution, as each tree's predict_proba uses
+            counts = tree.value[:, 0, :]
+            totals = counts.sum(axis=1, keepdims=True)
+            values.append(counts / np.where(totals > 0, totals, 1))
+
+        distributions = np.concatenate(values)
+        if leaf_dtype == "uint8":
+            packed_values = np.rint(distributions * UINT8_SCALE).astype(np.uint8)
+        else:
+            packed_values = distributions.astype(leaf_dtype)
+
+        return cls(
+            feature=np.concatenate(features).astype(np.int16),
+            threshold=_float32_floor(np.concatenate(thresholds)),
+            left=np.concatenate(lefts).astype(np.int16),
+            right=np.concatenate(rights).astype(np.int16),
+            values=packed_values,
+            offsets=np.cumsum([0] + [t.node_count for t in trees[:-1]]).astype(
+                np.int32
+            ),
+            classes=forest.classes_,
+            max_depth=max(tree.max_depth for tree in trees),
+        )
+
+    @property
+    def n_trees(self):
+        return len(self.offsets)
+
+    def _leaf_nodes(self, X):
+        """Global index of the leaf each tree reaches, shape (trees, rows)"""
+        rows = np.arange(len(X))[None, :]
+        offsets = self.offsets[:, None]
+        nodes = np.zeros((self.n_trees, len(X)), dtype=np.int32)
+        for _ in range(self.max_depth):
+            index = offsets + nodes
+            go_left = X[rows, self.feature[index]] <= self.threshold[index]
+            nodes = np.where(go_left, self.left[index], self.right[index])
+        return offsets + nodes
+
+    def predict_proba(self, X):
+        # sklearn also compares float32 features with the thresholds
+        X = np.asarray(X, dtype=np.float32)
+        probabilities = np.empty((len(X), len(self.classes_)))
+        for start in range(0, len(X), MAX_BATCH_ROWS):
+            batch = X[start : start + MAX_BATCH_ROWS]
+            leaves = self.values[self._leaf_nodes(batch)]
+            probabilities[start : start + len(batch)] = leaves.mean(
+                axis=0, dtype=np.float64
+            )
+        if self.values.dtype == np.uint8:
+            probabilities /= UINT8_SCALE
+        return probabilities
+
+    def predict(self, X):
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
+
+    @property
+    def nbytes(self):
+        return sum(getattr(self, name).nbytes for name in self.ARRAYS)
+
+    def to_dict(self):
+        """Plain arrays, loadable without this module"""
+        state = {name: getattr(self, name) for name in self.ARRAYS}
+        state.update(classes=self.classes_, max_depth=self.max_depth)
+        return state
+
+    @classmethod
+    def from_dict(cls, state):
+        return cls(**state)
+
+
+def memory_report(forest, compact):
+    """Pickled size of the sklearn forest and size of the compact arrays"""
+    original = len(pickle.dumps(forest, protocol=pickle.HIGHEST_PROTOCOL))
+    packed = len(pickle.dumps(compact.to_dict(), protocol=pickle.HIGHEST_PROTOCOL))
+    return {
+        "trees": compact.n_trees,
+        "nodes": len(compact.feature),
+        "leaf_dtype": str(compact.values.dtype),
+        "sklearn_bytes": original,
+        "compact_array_bytes": compact.nbytes,
+        "compact_pickle_bytes": packed,
+        "ratio": original / packed,
+    }
+
+
+if __name__ == "__main__":
+    import joblib
+
+    parser = argparse.ArgumentParser(
+        description="Convert a RandomForest to serving format"
+    )
+    parser.add_argument("--model", default="models/best_model.pkl")
+    parser.add_argument("--output", default="models/compact_model.pkl")
+    parser.add_argument("--leaf-dtype", choices=LEAF_DTYPES, default="uint8")
+    args = parser.parse_args()
+
+    forest = joblib.load(args.model)
+    compact = CompactForest.from_forest(forest, args.leaf_dtype)
+    joblib.dump(compact.to_dict(), args.output)
+    logger.info(
+        f"Compact forest saved to {args.output}: {memory_report(forest, compact)}"
+    )
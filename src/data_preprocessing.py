@@ -1,39 +1,61 @@
 import pandas as pd
+import numpy as np
 from sklearn.datasets import load_iris
 from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import StandardScaler
-import joblib
 import os
 import logging
+from contextlib import nullcontext
+
+from dataset import FEATURE_COLUMNS, RAW_DATA_PATH, TARGET_COLUMN, read_dataset
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
-def load_and_preprocess_data():
-    """Load Iris dataset and perform preprocessing"""
+def load_and_preprocess_data(profiler=None):
+    """Load Iris dataset and perform preprocessing
+
+    Returns the scaled splits and the fitted scaler, which training
+    publishes with the model as one artifact version. If a StageProfiler is given, the load, split and scaling stages are
+    recorded on it.
+    """
+    stage = profiler.stage if profiler is not None else lambda name: nullcontext()
     logger.info("Loading Iris dataset...")
 
-    # Load data
-    iris = load_iris()
-    X = pd.DataFrame(iris.data, columns=iris.feature_names)
-    y = pd.Series(iris.target, name="target")
+    with stage("data_load"):
+        if os.path.exists(RAW_DATA_PATH):
+            # Train on the raw file the retrain triggers watch
+            raw_data = read_dataset(RAW_DATA_PATH)
+            logger.info(f"Raw data loaded: {raw_data.shape}")
+        else:
+            iris = load_iris()
+            raw_data = pd.DataFrame(iris.data, columns=FEATURE_COLUMNS)
+            raw_data[TARGET_COLUMN] = iris.target
 
-    # Save raw data
-    os.makedirs("data/raw", exist_ok=True)
-    raw_data = pd.concat([X, y], axis=1)
-    raw_data.to_csv("data/raw/iris.csv", index=False)
-    logger.info(f"Raw data saved: {raw_data.shape}")
+            # Save raw data
+            os.makedirs("data/raw", exist_ok=True)
+            raw_data.to_csv(RAW_DATA_PATH, index=False)
+            logger.info(f"Raw data saved: {raw_data.shape}")
+        # A C-ordered block, as load_iris gives, so scaling sums in the
+        # same order and the processed files are reproduced bit for bit
+        X = pd.DataFrame(
+            np.ascontiguousarray(raw_data[FEATURE_COLUMNS].to_numpy()),
+            columns=FEATURE_COLUMNS,
+        )
+        y = raw_data[TARGET_COLUMN]
 
-    # Split data
-    X_train, X_test, y_train, y_test = train_test_split(
-        X, y, test_size=0.2, random_state=42, stratify=y
-    )
+    with stage("split"):
+        # Split data
+        X_train, X_test, y_train, y_test = train_test_split(
+            X, y, test_size=0.2, random_state=42, stratify=y
+        )
 
-    # Scale features
-    scaler = StandardScaler()
-    X_train_scaled = scaler.fit_transform(X_train)
-    X_test_scaled = scaler.transform(X_test)
+    with stage("scaling"):
+        # Scale features
+        scaler = StandardScaler()
+        X_train_scaled = scaler.fit_transform(X_train)
+        X_test_scaled = scaler.transform(X_test)
 
     # Save processed data
     os.makedirs("data/processed", exist_ok=True)
@@ -45,12 +67,8 @@ def load_and_preprocess_data():
     test_data["target"] = y_test.values
     test_data.to_csv("data/processed/test.csv", index=False)
 
-    # Save scaler
-    os.makedirs("models", exist_ok=True)
-    joblib.dump(scaler, "models/scaler.pkl")
-
     logger.info("Data preprocessing completed!")
-    return X_train_scaled, X_test_scaled, y_train, y_test
+    return X_train_scaled, X_test_scaled, y_train, y_test, scaler
 
 
 if __name__ == "__main__":
@@ -0,0 +1,199 @@
+"""Typed, cached reader for the raw iris dataset
+
+Every consumer of data/raw/iris.csv goes through read_dataset or
+iter_chunks instead of calling pd.read_csv with inferred dtypes. Known
+columns get an explicit schema (float64 or float32 features, int8 target),
+only the requested columns are materialized, and the CSV is parsed with
+pyarrow's multi-threaded reader when it is installed.
+
+The parsed columns are kept in a sidecar cache next to the file
+(.<name>.cache/<column>.npy plus a meta.json) tagged with the file's
+(size, mtime_ns) fingerprint. Later reads load the .npy files memory-mapped
+instead of re-parsing, until the CSV changes.
+"""
+
+import hashlib
+import json
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+RAW_DATA_PATH = "data/raw/iris.csv"
+FEATURE_COLUMNS = [
+    "sepal length (cm)",
+    "sepal width (cm)",
+    "petal length (cm)",
+    "petal width (cm)",
+]
+TARGET_COLUMN = "target"
+CACHE_META = "meta.json"
+# Larger files are streamed by iter_chunks instead of being cached whole
+CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+# pyarrow is in requirements.txt; without it reads still work, single-threaded
+try:
+    import pyarrow  # noqa: F401
+
+    PARSER_ENGINE = "pyarrow"
+except ImportError:
+    PARSER_ENGINE = "c"
+    logger.warning("pyarrow is not installed, parsing CSVs with the C engine")
+
+
+def schema(feature_dtype="float64"):
+    """Column dtypes of the iris layout"""
+    dtypes = {column: np.dtype(feature_dtype) for column in FEATURE_COLUMNS}
+    dtypes[TARGET_COLUMN] = np.dtype(np.int8)
+    return dtypes
+
+
+def fingerprint(path):
+    """(size, mtime_ns) of a file"""
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def header(path):
+    """Column names from the first line of a CSV"""
+    return pd.read_csv(path, nrows=0).columns.tolist()
+
+
+def cache_dir(path):
+    directory, name = os.path.split(path)
+    return os.path.join(directory, f".{name}.cache")
+
+
+def _column_file(directory, index):
+    # Column names contain spaces and parentheses, so files use positions
+    return os.path.join(directory, f"{index}.npy")
+
+
+def _load_cache(path, columns):
+    """Cached arrays of columns, or None if the cache is missing or stale"""
+    directory = cache_dir(path)
+    try:
+        with open(os.path.join(directory, CACHE_META)) as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if meta["fingerprint"] != fingerprint(path):
+        return None
+    positions = {column: i for i, column in enumerate(meta["columns"])}
+    if any(column not in positions for column in columns):
+        return None
+    try:
+        return {
+            column: np.load(_column_file(directory, positions[column]), mmap_mode="r")
+            for column in columns
+        }
+    except OSError:
+        return None
+
+
+def _write_cache(path, frame, file_fingerprint):
+    """Save every column as .npy, then the meta file that validates them"""
+    directory = cache_dir(path)
+    try:
+        os.makedirs(directory, exist_ok=True)
+        for i, column in enumerate(frame.columns):
+            target = _column_file(directory, i)
+            tmp = f"{target}.tmp-{os.getpid()}.npy"
+            np.save(tmp, frame[column].to_numpy())
+            os.replace(tmp, target)
+        meta_path = os.path.join(directory, CACHE_META)
+        tmp = f"{meta_path}.tmp-{os.getpid()}"
+        with open(tmp, "w") as f:
+            json.dump(
+                {"fingerprint": file_fingerprint, "columns": list(frame.columns)}, f
+            )
+        os.replace(tmp, meta_path)
+    except OSError as e:
+        # A read-only data directory only costs the cache
+        logger.warning(f"Could not write dataset cache for {path}: {e}")
+
+
+def _parse(path, columns, dtypes):
+    return pd.read_csv(path, usecols=columns, dtype=dtypes, engine=PARSER_ENGINE)[
+        columns
+    ]
+
+
+def read_dataset(path=RAW_DATA_PATH, columns=None, feature_dtype="float64", cache=True):
+    """Read the columns of a CSV with the iris schema applied
+
+    Columns outside the iris layout keep their inferred dtype. With cache,
+    the whole file is parsed once per change and cached; a projection then
+    only loads the requested columns.
+    """
+    all_columns = header(path)
+    columns = list(columns) if columns is not None else all_columns
+    dtypes = {c: t for c, t in schema().items() if c in all_columns}
+
+    if cache:
+        arrays = _load_cache(path, columns)
+        if arrays is None:
+            file_fingerprint = fingerprint(path)
+            frame = _parse(path, all_columns, dtypes)
+            _write_cache(path, frame, file_fingerprint)
+            arrays = {column: frame[column].to_numpy() for column in columns}
+        frame = pd.DataFrame({column: np.asarray(arrays[column]) for column in columns})
+    else:
+        frame = _parse(path, columns, {c: dtypes[c] for c in columns if c in dtypes})
+
+    if feature_dtype != "float64":
+        features = [c for c in FEATURE_COLUMNS if c in frame.columns]
+        frame[features] = frame[features].astype(feature_dtype)
+    return frame
+
+
+def iter_chunks(
+    path=RAW_DATA_PATH, columns=None, chunksize=100_000, feature_dtype="float64"
+):
+    """Yield DataFrames of at most chunksize rows with a running index
+
+    Served from the sidecar cache when it is valid; otherwise the CSV is
+    streamed, so memory stays bounded for files of any size.
+    """
+    all_columns = header(path)
+    columns = list(columns) if columns is not None else all_columns
+    dtypes = {c: t for c, t in schema(feature_dtype).items() if c in columns}
+
+    arrays = _load_cache(path, columns)
+    if arrays is None and os.path.getsize(path) <= CACHE_MAX_BYTES:
+        read_dataset(path)
+        arrays = _load_cache(path, columns)
+    if arrays is not None:
+        rows = len(arrays[columns[0]]) if columns else 0
+        for start in range(0, rows, chunksize):
+            stop = min(start + chunksize, rows)
+            yield pd.DataFrame(
+                {
+                    column: np.asarray(arrays[column][start:stop]).astype(
+                        dtypes.get(column, arrays[column].dtype), copy=False
+                    )
+                    for column in columns
+                },
+                index=pd.RangeIndex(start, stop),
+            )
+        return
+
+    # pyarrow's reader does not support chunksize
+    yield from pd.read_csv(
+        path, usecols=columns, dtype=dtypes, chunksize=chunksize, engine="c"
+    )
+
+
+def content_hash(path=RAW_DATA_PATH, chunksize=100_000):
+    """MD5 of the data as DataFrame.to_csv() renders it, computed in chunks
+
+    Chunks are rendered with a running index and a single header, so the
+    digest equals hashing the whole frame's to_csv() at bounded memory.
+    """
+    digest = hashlib.md5()
+    for i, chunk in enumerate(iter_chunks(path, chunksize=chunksize)):
+        digest.update(chunk.to_csv(header=i == 0).encode())
+    return digest.hexdigest()
@@ -0,0 +1,191 @@
+"""Classification metrics from a single confusion matrix
+
+All metrics are derived from one confusion matrix built with a single
+np.bincount over encoded (true, predicted) pairs, instead of re-validating
+and re-encoding the labels once per metric. The same derivation works on a
+stack of matrices, which is what makes the bootstrap vectorized: every
+resample is a row of an index array, and all resampled confusion matrices
+come from one offset bincount.
+
+Cross-validation fits stratified folds as tasks on an execution backend
+and pools the out-of-fold predictions, so intervals are computed over the
+whole training set rather than a 30-row test split.
+"""
+
+import numpy as np
+
+from execution import LokyBackend
+
+METRICS = ("accuracy", "precision", "recall", "f1")
+
+# Cap on resample x row cells per bootstrap chunk (int64 index arrays)
+MAX_BOOTSTRAP_CELLS = 5_000_000
+
+
+def _encode(y_true, y_pred, classes=None):
+    """Class indices of y_true and y_pred, and the classes"""
+    y_true = np.asarray(y_true)
+    y_pred = np.asarray(y_pred)
+    if classes is None:
+        classes = np.union1d(y_true, y_pred)
+    return np.searchsorted(classes, y_true), np.searchsorted(classes, y_pred), classes
+
+
+def confusion_matrix(y_true, y_pred, classes=None):
+    """Counts with true classes as rows and predicted classes as columns"""
+    true_idx, pred_idx, classes = _encode(y_true, y_pred, classes)
+    k = len(classes)
+    return np.bincount(true_idx * k + pred_idx, minlength=k * k).reshape(k, k)
+
+
+def metrics_from_confusion(cm):
+    """Accuracy and support-weighted precision, recall and F1
+
+    cm may be a stack of matrices (..., k, k); each metric then has the
+    leading shape. Classes without predictions or support score 0, as in
+    scikit-learn with zero_division=0.
+    """
+    cm = np.asarray(cm, dtype=np.float64)
+    tp = np.diagonal(cm, axis1=-2, axis2=-1)
+    support = cm.sum(axis=-1)
+    predicted = cm.sum(axis=-2)
+    total = support.sum(axis=-1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        precision = np.where(predicted > 0, tp / predicted, 0.0)
+        recall = np.where(support > 0, tp / support, 0.0)
+        f1 = np.where(
+            precision + recall > 0, 2 * precision * recall / (precision + recall), 0.0
+        )
+        weights = support / total[..., None]
+    return {
+        "accuracy": tp.sum(axis=-1) / total,
+        "precision": (precision * weights).sum(axis=-1),
+        "recall": (recall * weights).sum(axis=-1),
+        "f1": (f1 * weights).sum(axis=-1),
+    }
+
+
+def evaluate(y_true, y_pred, classes=None):
+    """All metrics of one set of predictions, as floats"""
+    metrics = metrics_from_confusion(confusion_matrix(y_true, y_pred, classes))
+    return {name: float(value) for name, value in metrics.items()}
+
+
+def bootstrap_intervals(
+    y_true, y_pred, n_resamples=2000, confidence=0.95, seed=42, classes=None
+):
+    """Percentile bootstrap intervals of every metric
+
+    Each resample draws row indices with replacement; resample b's pairs
+    are offset by b * k * k so one bincount yields all confusion matrices.
+    Resamples are processed in chunks only to bound memory.
+    """
+    true_idx, pred_idx, classes = _encode(y_true, y_pred, classes)
+    k = len(classes)
+    codes = true_idx * k + pred_idx
+    n = len(codes)
+    rng = np.random.default_rng(seed)
+
+    per_chunk = max(1, MAX_BOOTSTRAP_CELLS // max(n, 1))
+    samples = {name: [] for name in METRICS}
+    for start in range(0, n_resamples, per_chunk):
+        size = min(per_chunk, n_resamples - start)
+        rows = rng.integers(0, n, size=(size, n))
+        offsets = np.arange(size)[:, None] * (k * k)
+        cms = np.bincount(
+            (codes[rows] + offsets).ravel(), minlength=size * k * k
+        ).reshape(size, k, k)
+        for name, values in metrics_from_confusion(cms).items():
+            samples[name].append(values)
+
+    alpha = (1 - confidence) / 2
+    intervals = {}
+    for name in METRICS:
+        values = np.concatenate(samples[name])
+        lower, upper = np.quantile(values, [alpha, 1 - alpha])
+        intervals[name] = {"lower": float(lower), "upper": float(upper)}
+    return intervals
+
+
+def cv_splits(y, n_splits=5, seed=42):
+    """Shuffled stratified (train, test) index pairs"""
+    from sklearn.model_selection import StratifiedKFold
+
+    splitter = StratifiedKFold(n_splits=n_splits, shuffle=True, random_state=seed)
+    return list(splitter.split(np.zeros(len(y)), y))
+
+
+def fit_fold(task, data):
+    """Backend task: fit on a fold's training rows and predict its test rows
+
+    task is (estimator, params, train_idx, test_idx); data holds the
+    scattered X and y.
+    """
+    estimator, params, train_idx, test_idx = task
+    X, y = data["X"], data["y"]
+    model = estimator(**params)
+    model.fit(X[train_idx], y[train_idx])
+    return test_idx, model.predict(X[test_idx])
+
+
+def summarize_folds(y, folds, n_resamples=2000, confidence=0.95, seed=42):
+    """Fold statistics and pooled intervals from fit_fold results"""
+    y = np.asarray(y)
+    classes = np.unique(y)
+    out_of_fold = np.empty_like(y)
+    fold_cms = []
+    for test_idx, predictions in folds:
+        out_of_fold[test_idx] = predictions
+        fold_cms.append(confusion_matrix(y[test_idx], predictions, classes))
+    fold_metrics = metrics_from_confusion(np.stack(fold_cms))
+
+    return {
+        "folds": len(folds),
+        "mean": {name: float(values.mean()) for name, values in fold_metrics.items()},
+        "std": {name: float(values.std()) for name, values in fold_metrics.items()},
+        "ci": bootstrap_intervals(
+            y, out_of_fold, n_resamples, confidence, seed, classes
+        ),
+        "confidence": confidence,
+    }
+
+
+def cross_validate(
+    estimator,
+    params,
+    X,
+    y,
+    n_splits=5,
+    n_jobs=-1,
+    seed=42,
+    n_resamples=2000,
+    confidence=0.95,
+    backend=None,
+):
+    """Stratified k-fold CV with folds fitted in parallel
+
+    Folds run on backend (default a loky pool of n_jobs workers), with X
+    and y scattered once. Returns per-metric fold means and standard
+    deviations, and bootstrap intervals over the pooled out-of-fold
+    predictions.
+    """
+    X = np.asarray(X)
+    y = np.asarray(y)
+    own_backend = backend is None
+    if own_backend:
+        backend = LokyBackend(n_jobs)
+    try:
+        data = backend.scatter({"X": X, "y": y})
+        folds = backend.map(
+            fit_fold,
+            [
+                (estimator, params, train, test)
+                for train, test in cv_splits(y, n_splits, seed)
+            ],
+            data,
+        )
+        backend.release(data)
+    finally:
+        if own_backend:
+            backend.close()
+    return summarize_folds(y, folds, n_resamples, confidence, seed)
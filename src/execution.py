@@ -0,0 +1,292 @@
+"""Execution backends for independent training and scoring tasks
+
+Candidate fits, cross-validation folds and batch scoring chunks are
+independent tasks over shared read-only data. A backend runs them:
+
+- "loky": joblib's reusable loky process pool on this machine (default)
+- "local": a local multi-process cluster whose workers get data only
+  through scatter, like cluster nodes; used to test cluster behaviour
+- "dask": a Dask distributed cluster at DASK_SCHEDULER_ADDRESS, or a
+  LocalCluster when no address is given (optional dependency)
+
+Shared data is scattered once and tasks receive a small handle instead of
+the data. Each worker resolves a handle the first time it sees it and
+caches the payload for later tasks: loky workers memory-map a spill file,
+local cluster workers receive all scattered data when they start, and
+Dask broadcasts it to every worker.
+
+Task functions take (item, data) and must be importable or picklable.
+"""
+
+import itertools
+import logging
+import os
+import shutil
+import tempfile
+import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BACKEND = "loky"
+# Scattered payloads kept per worker process
+MAX_CACHED_PAYLOADS = 4
+
+# Per-process payloads, keyed by handle
+_payloads = OrderedDict()
+
+
+class Scattered:
+    """Handle of data sent to the workers; cheap to pickle with every task"""
+
+    def __init__(self, key, path=None):
+        self.key = key
+        self.path = path
+
+    def __repr__(self):
+        return f"Scattered({self.key!r})"
+
+
+def _cache(key, data):
+    _payloads[key] = data
+    while len(_payloads) > MAX_CACHED_PAYLOADS:
+        _payloads.popitem(last=False)
+
+
+def _receive(payloads):
+    """Local cluster worker initializer: keep the scattered data"""
+    for key, data in payloads.items():
+        _cache(key, data)
+
+
+def resolve(handle):
+    """Data of a handle in this process, loading it on first use"""
+    if handle.key not in _payloads:
+        if handle.path is None:
+            raise KeyError(f"{handle!r} was not scattered to this worker")
+        import joblib
+
+        _cache(handle.key, joblib.load(handle.path, mmap_mode="r"))
+    return _payloads[handle.key]
+
+
+def _run(fn, item, handle=None, payload=None):
+    """Worker entry point: call fn with the item and the shared data"""
+    if payload is None and handle is not None:
+        payload = resolve(handle)
+    return fn(item, payload)
+
+
+def resolve_workers(workers=None):
+    """Worker count from joblib-style n_jobs (None or -1 means all CPUs)"""
+    cpus = os.cpu_count() or 1
+    if workers is None:
+        return cpus
+    if workers < 0:
+        return max(cpus + 1 + workers, 1)
+    return max(workers, 1)
+
+
+class ExecutionBackend:
+    """Run fn(item, data) tasks on a pool of workers"""
+
+    name = None
+
+    def __init__(self, workers=None):
+        self.workers = resolve_workers(workers)
+
+    def scatter(self, data):
+        """Send data to the workers once, returning a handle for tasks"""
+        raise NotImplementedError
+
+    def release(self, handle):
+        """Forget scattered data that no more tasks will use"""
+
+    def submit(self, fn, item, handle=None):
+        """Run one task, returning a future with a result() method"""
+        raise NotImplementedError
+
+    def imap(self, fn, items, handle=None, max_in_flight=None):
+        """Yield results in input order with a bounded number of tasks in flight
+
+        Keeping only max_in_flight tasks (default twice the workers)
+        submitted caps the memory held by queued inputs and results.
+        """
+        items = iter(items)
+        pending = deque(
+            self.submit(fn, item, handle)
+            for item in itertools.islice(items, max_in_flight or 2 * self.workers)
+        )
+        while pending:
+            result = pending.popleft().result()
+            for item in itertools.islice(items, 1):
+                pending.append(self.submit(fn, item, handle))
+            yield result
+
+    def map(self, fn, items, handle=None):
+        """Results of all tasks, in input order"""
+        return [
+            future.result() for future in [self.submit(fn, i, handle) for i in items]
+        ]
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class LokyBackend(ExecutionBackend):
+    """joblib's reusable loky process pool
+
+    Scattered data is dumped once to a spill file that workers memory-map,
+    so large arrays are shared through the page cache. The pool is shared
+    with joblib and kept alive between backends, as joblib does.
+    """
+
+    name = "loky"
+
+    def __init__(self, workers=None):
+        super().__init__(workers)
+        self._spill_dir = None
+
+    def scatter(self, data):
+        import joblib
+
+        if self._spill_dir is None:
+            self._spill_dir = tempfile.mkdtemp(prefix="execution-")
+        key = uuid.uuid4().hex
+        path = os.path.join(self._spill_dir, f"{key}.pkl")
+        joblib.dump(data, path)
+        return Scattered(key, path)
+
+    def release(self, handle):
+        if handle.path is not None and os.path.exists(handle.path):
+            os.remove(handle.path)
+
+    def submit(self, fn, item, handle=None):
+        from joblib.externals.loky import get_reusable_executor
+
+        executor = get_reusable_executor(max_workers=self.workers)
+        return executor.submit(_run, fn, item, handle)
+
+    def close(self):
+        if self._spill_dir is not None:
+            shutil.rmtree(self._spill_dir, ignore_errors=True)
+            self._spill_dir = None
+
+
+class LocalClusterBackend(ExecutionBackend):
+    """A process pool that behaves like a cluster of independent nodes
+
+    Workers get every scattered payload once, as initializer arguments when
+    they start, and read nothing from the parent's filesystem. Scattering
+    new data restarts the workers on the next submit.
+    """
+
+    name = "local"
+
+    def __init__(self, workers=None):
+        super().__init__(workers)
+        self._scattered = {}
+        self._executor = None
+
+    def scatter(self, data):
+        key = uuid.uuid4().hex
+        self._scattered[key] = data
+        self._shutdown()
+        return Scattered(key)
+
+    def release(self, handle):
+        self._scattered.pop(handle.key, None)
+
+    def submit(self, fn, item, handle=None):
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                initializer=_receive,
+                initargs=(dict(self._scattered),),
+            )
+        return self._executor.submit(_run, fn, item, handle)
+
+    def _shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def close(self):
+        self._shutdown()
+        self._scattered.clear()
+
+
+class DaskBackend(ExecutionBackend):
+    """Tasks on a Dask distributed cluster
+
+    Connects to address (default DASK_SCHEDULER_ADDRESS) or starts a local
+    cluster of single-threaded worker processes.
+    """
+
+    name = "dask"
+
+    def __init__(self, workers=None, address=None):
+        try:
+            from dask.distributed import Client, LocalCluster
+        except ImportError as e:
+            raise ImportError(
+                "The dask backend requires dask[distributed] to be installed"
+            ) from e
+
+        address = address or os.getenv("DASK_SCHEDULER_ADDRESS")
+        self._cluster = None
+        if address:
+            self.client = Client(address)
+        else:
+            self._cluster = LocalCluster(
+                n_workers=resolve_workers(workers), threads_per_worker=1
+            )
+            self.client = Client(self._cluster)
+        self.workers = max(sum(self.client.nthreads().values()), 1)
+        self._futures = {}
+
+    def scatter(self, data):
+        key = uuid.uuid4().hex
+        # A list keeps a dict payload as one object instead of one per value
+        [self._futures[key]] = self.client.scatter([data], broadcast=True)
+        return Scattered(key)
+
+    def release(self, handle):
+        future = self._futures.pop(handle.key, None)
+        if future is not None:
+            future.release()
+
+    def submit(self, fn, item, handle=None):
+        # Dask replaces the payload future with its data on the worker
+        payload = self._futures[handle.key] if handle is not None else None
+        return self.client.submit(_run, fn, item, None, payload, pure=False)
+
+    def close(self):
+        self.client.close()
+        if self._cluster is not None:
+            self._cluster.close()
+
+
+BACKENDS = {
+    backend.name: backend for backend in (LokyBackend, LocalClusterBackend, DaskBackend)
+}
+
+
+def get_backend(name=None, workers=None):
+    """Backend by name, defaulting to EXECUTION_BACKEND and EXECUTION_WORKERS"""
+    name = name or os.getenv("EXECUTION_BACKEND", DEFAULT_BACKEND)
+    if name not in BACKENDS:
+        raise ValueError(
+            f"Unknown execution backend {name!r}, use one of {list(BACKENDS)}"
+        )
+    if workers is None and os.getenv("EXECUTION_WORKERS"):
+        workers = int(os.getenv("EXECUTION_WORKERS"))
+    logger.info(f"Using the {name} execution backend")
+    return BACKENDS[name](workers)
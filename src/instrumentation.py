@@ -0,0 +1,153 @@
+"""Stage timing and resource usage instrumentation for the training pipeline"""
+
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB, if available"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and kilobytes elsewhere
+    if sys.platform == "darwin":
+        return peak / 1024 / 1024
+    return peak / 1024
+
+
+class StageProfiler:
+    """Record wall time, CPU time and peak RSS for named pipeline stages
+
+    If progress_path is given (by default from RETRAIN_PROGRESS_FILE), a
+    JSON line is appended when each stage starts and ends so that another
+    process can follow the run.
+    """
+
+    def __init__(self, progress_path=None):
+        self.stages = []
+        # CPU time spent in stages running on background threads
+        self._background_cpu = 0.0
+        self._lock = threading.Lock()
+        self.started_at = datetime.now().isoformat()
+        self.progress_path = progress_path or os.getenv("RETRAIN_PROGRESS_FILE")
+
+    def _report(self, event):
+        if not self.progress_path:
+            return
+        with open(self.progress_path, "a") as f:
+            f.write(json.dumps(event) + "\n")
+
+    @contextmanager
+    def stage(self, name):
+        """Time the enclosed block as one stage
+
+        Stages on the main thread use process CPU time, so work on worker
+        threads they start (e.g. n_jobs) is included. Stages on other
+        threads use that thread's CPU time, which is subtracted from main
+        thread stages running at the same time so overlapping stages do
+        not count each other's CPU.
+        """
+        self._report({"event": "start", "stage": name, "time": time.time()})
+        background = threading.current_thread() is not threading.main_thread()
+        rss_before = peak_rss_mb()
+        wall_start = time.perf_counter()
+        if background:
+            cpu_start = time.thread_time()
+        else:
+            cpu_start = time.process_time()
+            background_start = self._background_cpu
+        try:
+            yield
+        finally:
+            if background:
+                cpu_seconds = time.thread_time() - cpu_start
+                with self._lock:
+                    self._background_cpu += cpu_seconds
+            else:
+                overlap = self._background_cpu - background_start
+                cpu_seconds = max(time.process_time() - cpu_start - overlap, 0.0)
+            rss_after = peak_rss_mb()
+            record = {
+                "stage": name,
+                "wall_seconds": time.perf_counter() - wall_start,
+                "cpu_seconds": cpu_seconds,
+                "cpu_clock": "thread" if background else "process",
+                "peak_rss_mb": rss_after,
+                # Growth of the high-water mark attributable to this stage
+                "peak_rss_growth_mb": (
+                    rss_after - rss_before if rss_after is not None else None
+                ),
+            }
+            self.stages.append(record)
+            self._report({"event": "end", "time": time.time(), **record})
+            logger.info(
+                f"Stage {name}: {record['wall_seconds']:.3f}s wall, "
+                f"{record['cpu_seconds']:.3f}s CPU"
+            )
+
+    def record(
+        self,
+        name,
+        wall_seconds,
+        cpu_seconds,
+        peak_rss_mb=None,
+        peak_rss_growth_mb=None,
+    ):
+        """Add a stage that ran in another process, measured there
+
+        peak_rss_mb is the worker's high-water mark, which a reused worker
+        carries over from earlier tasks; peak_rss_growth_mb is the part of
+        it this stage raised.
+        """
+        record = {
+            "stage": name,
+            "wall_seconds": wall_seconds,
+            "cpu_seconds": cpu_seconds,
+            "cpu_clock": "worker",
+            "peak_rss_mb": peak_rss_mb,
+            "peak_rss_growth_mb": peak_rss_growth_mb,
+        }
+        self.stages.append(record)
+        self._report({"event": "end", "time": time.time(), **record})
+
+    def metrics(self, stages=None):
+        """Flatten stage records into MLflow metric names"""
+        metrics = {}
+        for record in self.stages:
+            if stages is not None and record["stage"] not in stages:
+                continue
+            prefix = f"stage_{record['stage']}"
+            metrics[f"{prefix}_wall_seconds"] = record["wall_seconds"]
+            metrics[f"{prefix}_cpu_seconds"] = record["cpu_seconds"]
+            if record["peak_rss_mb"] is not None:
+                metrics[f"{prefix}_peak_rss_mb"] = record["peak_rss_mb"]
+        return metrics
+
+    def summary(self):
+        """Structured summary of all recorded stages"""
+        return {
+            "started_at": self.started_at,
+            "total_wall_seconds": sum(r["wall_seconds"] for r in self.stages),
+            "total_cpu_seconds": sum(r["cpu_seconds"] for r in self.stages),
+            "peak_rss_mb": peak_rss_mb(),
+            "stages": self.stages,
+        }
+
+    def save(self, path):
+        """Write the summary as JSON"""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(self.summary(), f, indent=2)
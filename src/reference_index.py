@@ -0,0 +1,89 @@
+"""Nearest-neighbour index and covariance summary of the training data
+
+The index is saved next to the model as a plain dict of NumPy arrays and a
+scikit-learn KDTree, so the API can load it without importing this module.
+"""
+
+import argparse
+import logging
+import os
+
+import joblib
+import numpy as np
+from scipy.stats import chi2
+from sklearn.neighbors import KDTree
+
+from dataset import read_dataset
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+INDEX_PATH = "models/reference_index.pkl"
+
+# Ridge added to covariance diagonals so inverses stay well conditioned
+COVARIANCE_RIDGE = 1e-6
+
+
+def _inverse_covariance(X):
+    covariance = np.cov(X, rowvar=False)
+    covariance += np.eye(X.shape[1]) * COVARIANCE_RIDGE
+    return np.linalg.inv(covariance)
+
+
+def build_reference_index(X_scaled, y, X_original=None, quantile=0.999):
+    """Build the KD-tree and per-class Mahalanobis summary
+
+    A sample is out of distribution when its squared Mahalanobis distance
+    to the nearest class exceeds the chi-squared quantile for the number
+    of features.
+    """
+    X_scaled = np.asarray(X_scaled, dtype=np.float64)
+    y = np.asarray(y)
+    classes = np.unique(y)
+
+    class_means = np.stack([X_scaled[y == c].mean(axis=0) for c in classes])
+    class_inv_covariances = np.stack(
+        [_inverse_covariance(X_scaled[y == c]) for c in classes]
+    )
+
+    return {
+        "tree": KDTree(X_scaled),
+        "labels": y,
+        "features": np.asarray(X_original if X_original is not None else X_scaled),
+        "classes": classes,
+        "class_means": class_means,
+        "class_inv_covariances": class_inv_covariances,
+        "ood_threshold": float(chi2.ppf(quantile, df=X_scaled.shape[1])),
+        "quantile": quantile,
+    }
+
+
+def save_reference_index(index, path=INDEX_PATH):
+    # Replaced atomically: the API may be loading the previous index
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    joblib.dump(index, tmp_path)
+    os.replace(tmp_path, path)
+    logger.info(
+        f"Reference index saved: {len(index['labels'])} samples, "
+        f"OOD threshold {index['ood_threshold']:.2f}"
+    )
+
+
+def build_from_processed(
+    train_path="data/processed/train.csv", scaler_path="models/scaler.pkl"
+):
+    """Build the index from the scaled training split on disk"""
+    train = read_dataset(train_path)
+    X_scaled = train.drop(columns=["target"])
+    scaler = joblib.load(scaler_path)
+    X_original = scaler.inverse_transform(X_scaled.values)
+    return build_reference_index(X_scaled.values, train["target"], X_original)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the training data index")
+    parser.add_argument("--train", default="data/processed/train.csv")
+    parser.add_argument("--scaler", default="models/scaler.pkl")
+    parser.add_argument("--output", default=INDEX_PATH)
+    args = parser.parse_args()
+    save_reference_index(build_from_processed(args.train, args.scaler), args.output)
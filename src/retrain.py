@@ -1,52 +1,39 @@
-import pandas as pd
-import hashlib
 from pathlib import Path
 import logging
+import sys
 from datetime import datetime
 from train import train_models
+from retrain_triggers import DataHashTrigger, ModelAgeTrigger, TriggerEngine
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Process exit codes, read by the API's retrain jobs
+EXIT_CODES = {"succeeded": 0, "failed": 1, "skipped": 3}
+
 
 class ModelRetrainer:
     def __init__(self):
         self.data_hash_file = Path("models/data_hash.txt")
         self.last_training_file = Path("models/last_training.txt")
+        self.hash_trigger = DataHashTrigger("data/raw/iris.csv", self.data_hash_file)
+        self.engine = TriggerEngine(
+            [ModelAgeTrigger(self.last_training_file), self.hash_trigger]
+        )
 
     def get_data_hash(self):
-        """Calculate hash of current data"""
-        try:
-            data = pd.read_csv("data/raw/iris.csv")
-            return hashlib.md5(data.to_csv().encode()).hexdigest()
-        except Exception as e:
-            logger.error(f"Error calculating data hash: {e}")
-            return None
+        """Calculate hash of current data (cached until the file changes)"""
+        return self.hash_trigger.current_hash()
 
     def should_retrain(self):
         """Check if retraining is needed"""
-        reasons = []
-
-        # Check 1: Data changed
-        current_hash = self.get_data_hash()
-        if current_hash and self.data_hash_file.exists():
-            stored_hash = self.data_hash_file.read_text().strip()
-            if current_hash != stored_hash:
-                reasons.append("Data has changed")
-
-        # Check 2: Time-based (e.g., weekly retraining)
-        if self.last_training_file.exists():
-            last_training = datetime.fromisoformat(
-                self.last_training_file.read_text().strip()
-            )
-            days_since_training = (datetime.now() - last_training).days
-            if days_since_training >= 7:
-                reasons.append(f"Model is {days_since_training} days old")
-
-        return len(reasons) > 0, reasons
+        return self.engine.evaluate()
 
     def retrain(self):
-        """Trigger model retraining"""
+        """Retrain if a trigger fires
+
+        Returns "succeeded", "failed" or "skipped" (no retrain needed).
+        """
         should_retrain, reasons = self.should_retrain()
 
         if should_retrain:
@@ -63,20 +50,26 @@ class ModelRetrainer:
 
                 self.last_training_file.write_text(datetime.now().isoformat())
 
+                # Trigger results from before the retrain are stale now
+                self.engine.invalidate()
+
                 logger.info("Retraining completed successfully")
+                return "succeeded"
 
             except Exception as e:
-                logger.error(f"Retraining failed: {e}")
+                logger.error(f"Retraining failed: {e}", exc_info=True)
+                return "failed"
         else:
             logger.info("No retraining needed")
+            return "skipped"
 
 
 def check_and_retrain():
     """Function to be scheduled"""
     retrainer = ModelRetrainer()
-    retrainer.retrain()
+    return retrainer.retrain()
 
 
 if __name__ == "__main__":
-    # Run once
-    check_and_retrain()
+    # Run once; the exit code tells the caller what happened
+    sys.exit(EXIT_CODES[check_and_retrain()])
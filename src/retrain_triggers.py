@@ -0,0 +1,367 @@
+"""Pluggable retrain triggers evaluated cheapest first
+
+Each trigger declares a relative cost and the files it reads. Results are
+memoized against the (size, mtime) fingerprint of those files, so a
+trigger whose inputs have not changed is never re-run.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import time
+from datetime import datetime
+from pathlib import Path
+
+from dataset import content_hash, read_dataset
+
+logger = logging.getLogger(__name__)
+
+
+def file_fingerprint(path):
+    """Cheap change detector for a file: (size, mtime_ns), or None if missing"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_size, stat.st_mtime_ns)
+
+
+class Trigger:
+    """Base class for retrain triggers
+
+    Subclasses set name and cost, list the files they read in inputs(),
+    and implement check() returning (fired, reason).
+    """
+
+    name = "trigger"
+    cost = 1
+    cacheable = True
+
+    def inputs(self):
+        return []
+
+    def check(self):
+        raise NotImplementedError
+
+
+class ModelAgeTrigger(Trigger):
+    """Fire when the last training is older than max_days"""
+
+    name = "model_age"
+    cost = 1
+    # Depends on the current time, so never memoized
+    cacheable = False
+
+    def __init__(self, last_training_file, max_days=7):
+        self.last_training_file = Path(last_training_file)
+        self.max_days = max_days
+
+    def check(self):
+        if not self.last_training_file.exists():
+            return False, None
+        last_training = datetime.fromisoformat(
+            self.last_training_file.read_text().strip()
+        )
+        days_since = (datetime.now() - last_training).days
+        if days_since >= self.max_days:
+            return True, f"Model is {days_since} days old"
+        return False, None
+
+
+class DataHashTrigger(Trigger):
+    """Fire when the data content hash differs from the stored one"""
+
+    name = "data_hash"
+    cost = 3
+
+    def __init__(self, data_path, hash_file):
+        self.data_path = data_path
+        self.hash_file = Path(hash_file)
+        self._hash_cache = (None, None)
+
+    def inputs(self):
+        return [self.data_path, str(self.hash_file)]
+
+    def current_hash(self):
+        """Hash of the data file, recomputed only when the file changed"""
+        fingerprint = file_fingerprint(self.data_path)
+        cached_fingerprint, cached_hash = self._hash_cache
+        if fingerprint is not None and fingerprint == cached_fingerprint:
+            return cached_hash
+        try:
+            # Same digest as hashing the whole frame's to_csv(), in chunks
+            data_hash = content_hash(self.data_path)
+        except Exception as e:
+            logger.error(f"Error calculating data hash: {e}")
+            return None
+        self._hash_cache = (fingerprint, data_hash)
+        return data_hash
+
+    def check(self):
+        current_hash = self.current_hash()
+        if current_hash and self.hash_file.exists():
+            stored_hash = self.hash_file.read_text().strip()
+            if current_hash != stored_hash:
+                return True, "Data hash changed"
+        return False, None
+
+
+class DataDriftTrigger(Trigger):
+    """Fire when a feature mean moved more than threshold from stored stats"""
+
+    name = "data_drift"
+    cost = 5
+
+    def __init__(self, data_path, stats_file, threshold=0.1):
+        self.data_path = data_path
+        self.stats_file = Path(stats_file)
+        self.threshold = threshold
+
+    def inputs(self):
+        # The stats file is this trigger's own state, so only the data
+        # file decides whether the result can be reused
+        return [self.data_path]
+
+    def check(self):
+        try:
+            current_data = read_dataset(self.data_path)
+
+            # Calculate basic statistics
+            numeric = current_data.select_dtypes(include="number")
+            stats = {
+                "mean": numeric.mean().to_dict(),
+                "std": numeric.std().to_dict(),
+                "shape": current_data.shape,
+            }
+
+            # Compare with stored statistics
+            if self.stats_file.exists():
+                with open(self.stats_file, "r") as f:
+                    old_stats = json.load(f)
+
+                # Simple drift detection: check if mean changed significantly
+                for col, mean in stats["mean"].items():
+                    if col in old_stats["mean"]:
+                        drift = (
+                            abs(mean - old_stats["mean"][col]) / old_stats["mean"][col]
+                        )
+                        if drift > self.threshold:
+                            return True, f"Drift detected in {col}: {drift:.2%}"
+
+            # Save current stats
+            with open(self.stats_file, "w") as f:
+                json.dump(stats, f)
+
+            return False, None
+
+        except Exception as e:
+            logger.error(f"Error checking data drift: {e}")
+            return False, None
+
+
+class LiveDriftTrigger(Trigger):
+    """Fire when the API's last live traffic drift test detected drift
+
+    Results older than max_age_seconds, or from before the last training,
+    are ignored: they describe traffic the current model has not seen.
+    """
+
+    name = "live_drift"
+    cost = 2
+    # Results expire with time, so never memoized
+    cacheable = False
+
+    def __init__(self, drift_file, last_training_file=None, max_age_seconds=3600):
+        self.drift_file = Path(drift_file)
+        self.last_training_file = (
+            Path(last_training_file) if last_training_file else None
+        )
+        self.max_age_seconds = max_age_seconds
+
+    def inputs(self):
+        files = [str(self.drift_file)]
+        if self.last_training_file is not None:
+            files.append(str(self.last_training_file))
+        return files
+
+    def check(self):
+        try:
+            result = json.loads(self.drift_file.read_text())
+        except (OSError, ValueError):
+            return False, None
+        checked_at = result.get("checked_at", 0)
+        if time.time() - checked_at > self.max_age_seconds:
+            return False, None
+        if self.last_training_file is not None and self.last_training_file.exists():
+            last_training = datetime.fromisoformat(
+                self.last_training_file.read_text().strip()
+            )
+            if checked_at < last_training.timestamp():
+                return False, None
+        if not result.get("drift"):
+            return False, None
+        features = ", ".join(result.get("drifted_features") or []) or "joint"
+        return True, (
+            f"Live traffic drift ({features}; " f"MMD p={result['mmd']['p_value']:.4f})"
+        )
+
+
+def read_last_lines(path, num_lines, block_size=65536):
+    """Read the last num_lines lines of a file without scanning all of it"""
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        position = f.tell()
+        data = b""
+        while position > 0 and data.count(b"\n") <= num_lines:
+            read_size = min(block_size, position)
+            position -= read_size
+            f.seek(position)
+            data = f.read(read_size) + data
+    return data.decode(errors="ignore").splitlines()[-num_lines:]
+
+
+class PerformanceTrigger(Trigger):
+    """Fire when average confidence of recent predictions is low"""
+
+    name = "performance"
+    cost = 8
+
+    def __init__(self, predictions_file, window=100, threshold=0.85):
+        self.predictions_file = Path(predictions_file)
+        self.window = window
+        self.threshold = threshold
+
+    def inputs(self):
+        return [str(self.predictions_file)]
+
+    def check(self):
+        try:
+            if not self.predictions_file.exists():
+                return False, None
+
+            # Only the most recent window of predictions is needed
+            recent_confidences = []
+            weights = []
+            for line in read_last_lines(self.predictions_file, self.window):
+                try:
+                    record = json.loads(line)
+                    confidence = float(record["confidence"])
+                except (json.JSONDecodeError, KeyError, TypeError):
+                    continue
+                recent_confidences.append(confidence)
+                # Sampled logs keep every low-confidence prediction but only
+                # some of the rest, and rate limiting drops some of each, so
+                # records are weighted by 1/probability of being logged
+                weights.append(record.get("w", 1.0))
+
+            if len(recent_confidences) < self.window:
+                return False, None
+
+            avg_confidence = sum(
+                c * w for c, w in zip(recent_confidences, weights)
+            ) / sum(weights)
+
+            # If confidence drops below threshold, trigger retraining
+            if avg_confidence < self.threshold:
+                return True, f"Low average confidence: {avg_confidence:.2f}"
+
+            return False, None
+
+        except Exception as e:
+            logger.error(f"Error checking performance: {e}")
+            return False, None
+
+
+class AccuracyTrigger(Trigger):
+    """Fire when accuracy on recent ground-truth feedback is low"""
+
+    name = "feedback_accuracy"
+    cost = 2
+
+    def __init__(self, feedback_db, window=100, min_labels=50, threshold=0.9):
+        self.feedback_db = feedback_db
+        self.window = window
+        self.min_labels = min_labels
+        self.threshold = threshold
+
+    def inputs(self):
+        # SQLite in WAL mode appends new rows to the -wal file first
+        return [self.feedback_db, self.feedback_db + "-wal"]
+
+    def check(self):
+        if not os.path.exists(self.feedback_db):
+            return False, None
+        try:
+            conn = sqlite3.connect(f"file:{self.feedback_db}?mode=ro", uri=True)
+            try:
+                rows = conn.execute(
+                    "SELECT label = prediction FROM labels ORDER BY ts DESC LIMIT ?",
+                    (self.window,),
+                ).fetchall()
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            logger.error(f"Error checking feedback accuracy: {e}")
+            return False, None
+
+        if len(rows) < self.min_labels:
+            return False, None
+        accuracy = sum(row[0] for row in rows) / len(rows)
+        if accuracy < self.threshold:
+            return True, f"Low accuracy on feedback: {accuracy:.2f}"
+        return False, None
+
+
+class TriggerEngine:
+    """Evaluate triggers in cost order with memoization
+
+    With short_circuit=True evaluation stops at the first trigger that
+    fires, so expensive checks are skipped when a cheap one already
+    decided that a retrain is needed.
+    """
+
+    def __init__(self, triggers, short_circuit=False):
+        self.triggers = sorted(triggers, key=lambda t: t.cost)
+        self.short_circuit = short_circuit
+        self.timings = []
+        self._memo = {}
+
+    def _evaluate(self, trigger):
+        key = None
+        if trigger.cacheable:
+            key = tuple(file_fingerprint(path) for path in trigger.inputs())
+            cached = self._memo.get(trigger.name)
+            if cached is not None and cached[0] == key:
+                return cached[1], True
+
+        result = trigger.check()
+        if key is not None:
+            self._memo[trigger.name] = (key, result)
+        return result, False
+
+    def evaluate(self):
+        """Return (should_retrain, reasons)"""
+        reasons = []
+        self.timings = []
+        for trigger in self.triggers:
+            start = time.perf_counter()
+            (fired, reason), cached = self._evaluate(trigger)
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            self.timings.append(
+                {"trigger": trigger.name, "ms": elapsed_ms, "cached": cached}
+            )
+            logger.info(
+                f"Trigger {trigger.name}: {elapsed_ms:.2f} ms"
+                f"{' (cached)' if cached else ''}"
+                f"{' -> ' + reason if fired else ''}"
+            )
+            if fired:
+                reasons.append(reason)
+                if self.short_circuit:
+                    break
+        return len(reasons) > 0, reasons
+
+    def invalidate(self):
+        """Forget memoized results, e.g. after retraining"""
+        self._memo.clear()
@@ -1,108 +1,328 @@
 from sklearn.linear_model import LogisticRegression
 from sklearn.ensemble import RandomForestClassifier
-from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score
+import argparse
 import mlflow
 import mlflow.sklearn
-import joblib
+import json
 import logging
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 from data_preprocessing import load_and_preprocess_data
+from evaluation import cv_splits, evaluate, fit_fold, summarize_folds
+from execution import get_backend
+from instrumentation import StageProfiler, peak_rss_mb
+from reference_index import build_reference_index
+from artifact_store import ArtifactStore
+from compact_forest import CompactForest, memory_report
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+PROFILE_PATH = "logs/training_profile.json"
+EXPERIMENT_NAME = "iris-classification"
+REGISTERED_MODEL_NAME = "iris-classifier"
+# Artifact versions kept in the store for rollback
+KEEP_VERSIONS = 5
+
+# (run name, stage suffix, estimator, parameters)
+CANDIDATES = [
+    (
+        "logistic-regression",
+        "logistic_regression",
+        LogisticRegression,
+        {"max_iter": 1000, "random_state": 42, "solver": "lbfgs"},
+    ),
+    (
+        "random-forest",
+        "random_forest",
+        RandomForestClassifier,
+        {"n_estimators": 100, "max_depth": 5, "random_state": 42},
+    ),
+]
+
 
 def evaluate_model(model, X_test, y_test):
-    """Evaluate model and return metrics"""
-    y_pred = model.predict(X_test)
-
-    metrics = {
-        "accuracy": accuracy_score(y_test, y_pred),
-        "precision": precision_score(y_test, y_pred, average="weighted"),
-        "recall": recall_score(y_test, y_pred, average="weighted"),
-        "f1": f1_score(y_test, y_pred, average="weighted"),
-    }
+    """Evaluate model and return metrics (from one confusion matrix)"""
+    return evaluate(y_test, model.predict(X_test))
 
-    return metrics
 
+def selection_key(candidate):
+    """Rank by the CV accuracy interval's lower bound, then its mean
 
-def train_models():
-    """Train multiple models and track with MLflow"""
-    # Set MLflow tracking URI - always use SQLite
-    mlflow.set_tracking_uri("sqlite:///mlflow.db")
+    A lucky split cannot win on a small test set: the model whose accuracy
+    is most reliably high is preferred.
+    """
+    metrics = candidate["metrics"]
+    return (metrics["accuracy_ci_lower"], metrics["cv_accuracy_mean"])
 
-    # Create or get experiment
-    try:
-        mlflow.create_experiment("iris-classification")
-    except Exception:
-        # Experiment already exists
-        pass
 
-    mlflow.set_experiment("iris-classification")
+def fit_candidate(task, data):
+    """Backend task: fit one candidate on the scattered training split
 
-    # Load data
-    X_train, X_test, y_train, y_test = load_and_preprocess_data()
+    Returns the model with the wall and CPU seconds the fit took, and the
+    worker's peak RSS in MB after the fit with the growth the fit caused.
+    """
+    estimator, params = task
+    rss_before = peak_rss_mb()
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    model = estimator(**params)
+    model.fit(data["X"], data["y"])
+    wall = time.perf_counter() - wall_start
+    cpu = time.process_time() - cpu_start
+    rss_after = peak_rss_mb()
+    growth = rss_after - rss_before if rss_after is not None else None
+    return model, wall, cpu, rss_after, growth
 
-    # Model 1: Logistic Regression
-    with mlflow.start_run(run_name="logistic-regression"):
-        logger.info("Training Logistic Regression...")
 
-        # Parameters
-        params = {"max_iter": 1000, "random_state": 42, "solver": "lbfgs"}
+def train_candidates(data, backend, profiler):
+    """Fit and evaluate all candidate models
 
-        # Train model
-        lr_model = LogisticRegression(**params)
-        lr_model.fit(X_train, y_train)
+    The training split is scattered to the backend once. Every candidate's
+    full fit and its stratified CV folds are submitted together, so they
+    run concurrently across the backend's workers; fitted models and fold
+    predictions are gathered back for evaluation and MLflow logging here.
+    """
+    X_train, X_test, y_train, y_test = data
+    y_train = np.asarray(y_train)
+    splits = cv_splits(y_train)
 
-        # Evaluate
-        lr_metrics = evaluate_model(lr_model, X_test, y_test)
+    with profiler.stage("train_candidates"):
+        shared = backend.scatter({"X": np.asarray(X_train), "y": y_train})
+        fits, folds = [], []
+        for run_name, _, estimator, params in CANDIDATES:
+            logger.info(f"Training {run_name}...")
+            fits.append(backend.submit(fit_candidate, (estimator, params), shared))
+            folds.append(
+                [
+                    backend.submit(fit_fold, (estimator, params, train, test), shared)
+                    for train, test in splits
+                ]
+            )
+        fits = [future.result() for future in fits]
+        folds = [[future.result() for future in futures] for futures in folds]
+        backend.release(shared)
 
-        # Log to MLflow
-        mlflow.log_params(params)
-        mlflow.log_metrics(lr_metrics)
-        mlflow.sklearn.log_model(lr_model, "model")
+    candidates = []
+    for (run_name, key, _, params), (model, *usage), candidate_folds in zip(
+        CANDIDATES, fits, folds
+    ):
+        profiler.record(f"fit_{key}", *usage)
 
-        logger.info(f"Logistic Regression metrics: {lr_metrics}")
+        with profiler.stage(f"evaluate_{key}"):
+            metrics = evaluate_model(model, X_test, y_test)
 
-    # Model 2: Random Forest
-    with mlflow.start_run(run_name="random-forest"):
-        logger.info("Training Random Forest...")
+        with profiler.stage(f"cv_{key}"):
+            cv = summarize_folds(y_train, candidate_folds)
+        for name in ("accuracy", "f1"):
+            metrics[f"cv_{name}_mean"] = cv["mean"][name]
+            metrics[f"cv_{name}_std"] = cv["std"][name]
+            metrics[f"{name}_ci_lower"] = cv["ci"][name]["lower"]
+            metrics[f"{name}_ci_upper"] = cv["ci"][name]["upper"]
 
-        # Parameters
-        params = {"n_estimators": 100, "max_depth": 5, "random_state": 42}
+        logger.info(f"{run_name} metrics: {metrics}")
+        candidates.append(
+            {
+                "run_name": run_name,
+                "key": key,
+                "model": model,
+                "params": params,
+                "metrics": metrics,
+            }
+        )
+    return candidates
 
-        # Train model
-        rf_model = RandomForestClassifier(**params)
-        rf_model.fit(X_train, y_train)
 
-        # Evaluate
-        rf_metrics = evaluate_model(rf_model, X_test, y_test)
+def log_candidate(candidate, session_id, profiler):
+    """Log one trained candidate to MLflow, returning its run ID"""
+    key = candidate["key"]
+    with mlflow.start_run(run_name=candidate["run_name"]) as run:
+        mlflow.set_tag("training_session", session_id)
+        mlflow.log_params(candidate["params"])
+        mlflow.log_metrics(candidate["metrics"])
+        with profiler.stage(f"log_model_{key}"):
+            mlflow.sklearn.log_model(candidate["model"], "model")
+        mlflow.log_metrics(
+            profiler.metrics(
+                [f"fit_{key}", f"evaluate_{key}", f"cv_{key}", f"log_model_{key}"]
+            )
+        )
+    return run.info.run_id
 
-        # Log to MLflow
-        mlflow.log_params(params)
-        mlflow.log_metrics(rf_metrics)
-        mlflow.sklearn.log_model(rf_model, "model")
 
-        logger.info(f"Random Forest metrics: {rf_metrics}")
+def register_best(resolve_run_id):
+    """Register the selected run once its model has been logged"""
+    run_id = resolve_run_id()
+    mlflow.register_model(f"runs:/{run_id}/model", REGISTERED_MODEL_NAME)
+    return run_id
 
-    # Register best model
-    client = mlflow.tracking.MlflowClient()
-    experiment = client.get_experiment_by_name("iris-classification")
-    runs = client.search_runs(experiment.experiment_id)
 
-    best_run = max(runs, key=lambda r: r.data.metrics["accuracy"])
-    model_uri = f"runs:/{best_run.info.run_id}/model"
+def search_best_run(client, session_id=None):
+    """Find the best run with an ordered, filtered registry query
 
-    mlflow.register_model(model_uri, "iris-classifier")
-    logger.info(
-        f"Best model registered with accuracy: {best_run.data.metrics['accuracy']}"
+    Runs are ranked by the lower bound of their CV accuracy interval, then
+    by test accuracy (runs logged before intervals were added come last).
+    """
+    experiment = client.get_experiment_by_name(EXPERIMENT_NAME)
+    filter_string = "metrics.accuracy >= 0"
+    if session_id:
+        filter_string += f" and tags.training_session = '{session_id}'"
+    runs = client.search_runs(
+        [experiment.experiment_id],
+        filter_string=filter_string,
+        order_by=["metrics.accuracy_ci_lower DESC", "metrics.accuracy DESC"],
+        max_results=1,
     )
+    return runs[0] if runs else None
+
+
+def train_models(selection="session", backend=None):
+    """Train multiple models and track with MLflow
+
+    The best model is chosen from the candidates trained in this session
+    and exported directly. MLflow logging and registration run on a
+    background thread so they stay off the critical path. With
+    selection="registry" the best run across the whole experiment is
+    found with an ordered registry query instead, falling back to this
+    session's best candidate when no run matches. Candidates are fitted on
+    the named execution backend (default EXECUTION_BACKEND or loky).
+    """
+    profiler = StageProfiler()
+    session_id = uuid.uuid4().hex
+
+    # Set MLflow tracking URI - always use SQLite
+    mlflow.set_tracking_uri("sqlite:///mlflow.db")
 
-    # Save best model locally
-    best_model = mlflow.sklearn.load_model(model_uri)
-    joblib.dump(best_model, "models/best_model.pkl")
+    # Create or get experiment
+    try:
+        mlflow.create_experiment(EXPERIMENT_NAME)
+    except Exception:
+        # Experiment already exists
+        pass
+
+    mlflow.set_experiment(EXPERIMENT_NAME)
+
+    # Load data
+    *data, scaler = load_and_preprocess_data(profiler)
+
+    # A single worker keeps MLflow's fluent run stack to one thread
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="mlflow-logging")
+    with get_backend(backend) as cluster:
+        candidates = train_candidates(data, cluster, profiler)
+    run_ids = {
+        candidate["key"]: executor.submit(
+            log_candidate, candidate, session_id, profiler
+        )
+        for candidate in candidates
+    }
+
+    client = mlflow.tracking.MlflowClient()
+    best_run = None
+    if selection == "registry":
+        # The query needs this session's runs to be logged first
+        session_runs = {
+            future.result(): c for c, future in zip(candidates, run_ids.values())
+        }
+        with profiler.stage("registry_search"):
+            best_run = search_best_run(client)
+        if best_run is None:
+            logger.warning(
+                "No run matched the registry query, selecting from this session"
+            )
+    if best_run is not None:
+        best = session_runs.get(best_run.info.run_id)
+        if best is not None:
+            best_model = best["model"]
+        else:
+            # The best run is from an earlier session
+            with profiler.stage("reload_best_model"):
+                best_model = mlflow.sklearn.load_model(
+                    f"runs:/{best_run.info.run_id}/model"
+                )
+        best_accuracy = best_run.data.metrics["accuracy"]
+        resolve_run_id = lambda: best_run.info.run_id  # noqa: E731
+    else:
+        best = max(candidates, key=selection_key)
+        best_model = best["model"]
+        best_accuracy = best["metrics"]["accuracy"]
+        resolve_run_id = run_ids[best["key"]].result
+
+    # Index the training set for nearest-neighbour context and OOD scoring
+    with profiler.stage("build_reference_index"):
+        X_train, _, y_train, _ = data
+        reference_index = build_reference_index(
+            X_train, y_train, scaler.inverse_transform(X_train)
+        )
+
+    # Publish model, scaler and index together as one version, so readers
+    # never pair this model with another run's scaler
+    with profiler.stage("export_best_model"):
+        artifacts = {
+            "model": best_model,
+            "scaler": scaler,
+            "reference_index": reference_index,
+        }
+        # Forests are also published in the compact serving format
+        if isinstance(best_model, RandomForestClassifier):
+            compact = CompactForest.from_forest(best_model)
+            artifacts["compact_model"] = compact.to_dict()
+            logger.info(
+                f"Compact forest: {json.dumps(memory_report(best_model, compact))}"
+            )
+        store = ArtifactStore()
+        version = store.publish(
+            artifacts,
+            metadata={"accuracy": best_accuracy, "training_session": session_id},
+        )
+        pruned = store.prune(keep=KEEP_VERSIONS)
+        if pruned:
+            logger.info(f"Pruned old artifact versions: {pruned}")
+    logger.info(f"Best model exported as {version} with accuracy: {best_accuracy}")
+
+    registration = executor.submit(register_best, resolve_run_id)
+    with profiler.stage("mlflow_logging_wait"):
+        executor.shutdown(wait=True)
+    run_id = registration.result()
+    logger.info(f"Best model registered from run {run_id}")
+
+    # Record the session-wide stages on the selected run
+    summary = profiler.summary()
+    for key, value in profiler.metrics(
+        [
+            "data_load",
+            "split",
+            "scaling",
+            "train_candidates",
+            "registry_search",
+            "reload_best_model",
+            "export_best_model",
+            "build_reference_index",
+            "mlflow_logging_wait",
+        ]
+    ).items():
+        client.log_metric(run_id, key, value)
+    client.log_dict(run_id, summary, "training_profile.json")
+    profiler.save(PROFILE_PATH)
+    logger.info(f"Training profile: {json.dumps(summary)}")
 
     logger.info("Model training completed successfully!")
+    return {"run_id": run_id, "accuracy": best_accuracy}
 
 
 if __name__ == "__main__":
-    train_models()
+    parser = argparse.ArgumentParser(description="Train iris classifiers")
+    parser.add_argument(
+        "--selection",
+        choices=["session", "registry"],
+        default="session",
+        help="Pick the best model from this session or the whole experiment",
+    )
+    parser.add_argument(
+        "--backend",
+        choices=["loky", "local", "dask"],
+        default=None,
+        help="Execution backend (default EXECUTION_BACKEND or loky)",
+    )
+    args = parser.parse_args()
+    train_models(selection=args.selection, backend=args.backend)
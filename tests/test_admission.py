@@ -0,0 +1,136 @@
+import pytest
+import asyncio
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from api.admission import (
+    AdmissionMiddleware,
+    ConcurrencyLimiter,
+    TokenBuckets,
+    BULK,
+    INTERACTIVE,
+    shed_counter,
+)
+
+def make_client(**kwargs):
+    app = FastAPI()
+
+    @app.get("/")
+    async def health():
+        return {"status": "ok"}
+
+    @app.post("/predict")
+    async def predict():
+        return {"prediction": 0}
+
+    app.add_middleware(AdmissionMiddleware, **kwargs)
+    return TestClient(app)
+
+def test_token_bucket_refills():
+    """Test a client gets burst tokens and then the refill rate"""
+    buckets = TokenBuckets(rate=10, burst=2)
+
+    assert buckets.take('a', now=0.0) == 0
+    assert buckets.take('a', now=0.0) == 0
+    assert buckets.take('a', now=0.0) == pytest.approx(0.1)
+    assert buckets.take('b', now=0.0) == 0
+    assert buckets.take('a', now=0.2) == 0
+
+def test_rate_limited_requests_get_429():
+    """Test requests over the client quota are shed with Retry-After"""
+    client = make_client(rate=0.001, burst=2)
+
+    statuses = [client.post('/predict').status_code for _ in range(3)]
+    assert statuses == [200, 200, 429]
+    assert int(client.post('/predict').headers['retry-after']) >= 1
+
+    # Health checks bypass quotas
+    assert client.get('/').status_code == 200
+    # Quotas are per client
+    assert client.post('/predict', headers={'X-Client-ID': 'other'}).status_code == 200
+
+def test_limiter_serves_higher_priority_first():
+    """Test queued interactive requests are admitted before bulk ones"""
+    async def scenario():
+        limiter = ConcurrencyLimiter(limit=1, queue_size=4, queue_timeout=1.0)
+        assert await limiter.acquire(INTERACTIVE) is None
+        order = []
+
+        async def wait(priority, name):
+            reason = await limiter.acquire(priority)
+            order.append((name, reason))
+            limiter.release()
+
+        tasks = [
+            asyncio.create_task(wait(BULK, 'bulk')),
+            asyncio.create_task(wait(INTERACTIVE, 'interactive')),
+        ]
+        await asyncio.sleep(0)
+        limiter.release()
+        await asyncio.gather(*tasks)
+        return order, limiter.in_flight
+
+    order, in_flight = asyncio.run(scenario())
+    assert order == [('interactive', None), ('bulk', None)]
+    assert in_flight == 0
+
+def test_limiter_sheds_when_queue_full():
+    """Test a full queue displaces bulk waiters and rejects on timeout"""
+    async def scenario():
+        limiter = ConcurrencyLimiter(limit=1, queue_size=1, queue_timeout=0.05)
+        await limiter.acquire(INTERACTIVE)
+        bulk = asyncio.create_task(limiter.acquire(BULK))
+        await asyncio.sleep(0)
+        interactive = asyncio.create_task(limiter.acquire(INTERACTIVE))
+        await asyncio.sleep(0)
+        # Queue holds an interactive waiter, so bulk is rejected outright
+        rejected = await limiter.acquire(BULK)
+        results = await asyncio.gather(bulk, interactive)
+        return results, rejected
+
+    (bulk, interactive), rejected = asyncio.run(scenario())
+    assert bulk == 'displaced'
+    assert interactive == 'queue_timeout'
+    assert rejected == 'queue_full'
+
+def test_displaced_request_counted_once():
+    """Test each displaced request adds exactly one to the shed counter"""
+    counter = shed_counter.labels(priority='bulk', reason='displaced')
+
+    async def scenario():
+        release = asyncio.Event()
+
+        async def app(scope, receive, send):
+            await release.wait()
+            await send({'type': 'http.response.start', 'status': 200, 'headers': []})
+            await send({'type': 'http.response.body', 'body': b''})
+
+        middleware = AdmissionMiddleware(app, max_concurrency=1, queue_size=1, queue_timeout=1)
+        statuses = []
+
+        async def request(path, headers=()):
+            async def send(message):
+                if message['type'] == 'http.response.start':
+                    statuses.append((path, message['status']))
+            scope = {'type': 'http', 'path': path, 'headers': list(headers)}
+            await middleware(scope, None, send)
+
+        holder = asyncio.create_task(request('/predict'))
+        await asyncio.sleep(0)
+        bulk = asyncio.create_task(request('/rollups'))
+        await asyncio.sleep(0)
+        interactive = asyncio.create_task(request('/predict'))
+        await asyncio.sleep(0.01)
+        release.set()
+        await asyncio.gather(holder, bulk, interactive)
+        return statuses
+
+    before = counter._value.get()
+    statuses = asyncio.run(scenario())
+    assert ('/rollups', 503) in statuses
+    assert counter._value.get() == before + 1
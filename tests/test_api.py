@@ -52,4 +52,127 @@ def test_metrics_endpoint():
     """Test metrics endpoint"""
     response = client.get("/metrics")
     assert response.status_code == 200
-    assert "predictions_total" in response.text
\ No newline at end of file
+    assert "predictions_total" in response.text
+
+def test_stage_metrics():
+    """Test per-stage prediction timings are exported"""
+    response = client.get("/metrics")
+    assert "prediction_stage_duration_seconds" in response.text
+
+def test_profiling_disabled():
+    """Test profiler endpoints are off unless enabled"""
+    from api.profiling import profiler
+
+    enabled = profiler.enabled
+    profiler.enabled = False
+    try:
+        assert client.post("/debug/profile?requests=1").status_code == 404
+        assert client.get("/debug/profile").status_code == 404
+    finally:
+        profiler.enabled = enabled
+
+def test_profiler_not_rearmed_while_active():
+    """Test arming is refused while a request is being profiled"""
+    from api.profiling import RequestProfiler
+
+    profiler = RequestProfiler(enabled=True)
+    profiler.arm(1)
+    assert profiler._start("/predict")
+    assert not profiler.arm(5)
+    profiler._stop()
+
+    assert profiler.status()["captured"] == 1
+    assert profiler.arm(2)
+
+def test_profiler_counts_overlapping_requests():
+    """Test only requested routes are profiled and overlaps are reported"""
+    from api.profiling import RequestProfiler
+
+    profiler = RequestProfiler(enabled=True)
+    profiler.arm(2)
+    assert not profiler._start("/metrics")
+    assert profiler._start("/predict")
+    # Requests arriving while one is profiled run into its profile
+    assert not profiler._start("/predict")
+    assert not profiler._start("/metrics")
+    profiler._stop()
+
+    status = profiler.status()
+    assert status["paths"] == ["/predict"]
+    assert status["overlapping_requests"] == 2
+    assert status["contaminated"]
+
+    profiler.arm(1, ["/"])
+    assert profiler._start("/")
+    assert profiler.status()["overlapping_requests"] == 0
+
+def test_profile_capture():
+    """Test profiling the next request produces a downloadable profile"""
+    from api.profiling import profiler
+
+    profiler.enabled = True
+    try:
+        response = client.post("/debug/profile?requests=1")
+        assert response.json()["remaining"] == 1
+        assert response.json()["paths"] == ["/predict"]
+
+        client.get("/")
+        assert profiler.status()["captured"] == 0
+        client.post("/predict", json={
+            "sepal_length": 5.1,
+            "sepal_width": 3.5,
+            "petal_length": 1.4,
+            "petal_width": 0.2
+        })
+        assert profiler.status()["captured"] == 1
+
+        response = client.get("/debug/profile?format=text")
+        assert response.status_code == 200
+        assert "function calls" in response.text
+        assert response.headers["X-Profile-Overlapping-Requests"] == "0"
+        assert client.get("/debug/profile").status_code == 200
+    finally:
+        profiler.enabled = False
+
+def test_retrain_status_not_found():
+    """Test unknown retrain jobs return 404"""
+    response = client.get("/retrain/does-not-exist")
+    assert response.status_code == 404
+
+def test_liveness_and_readiness():
+    """Test /livez always answers and /readyz reports warm-up"""
+    from api import app as api_app
+    assert client.get("/livez").status_code == 200
+
+    api_app.load_resources()
+    api_app.warm_up(iterations=1)
+    response = client.get("/readyz")
+    if api_app.MODEL_LOADED:
+        assert response.status_code == 200
+        assert response.json()["warmed_up"] is True
+    else:
+        assert response.status_code == 503
+
+def test_import_is_lazy():
+    """Test importing the API does not load pandas, sklearn or the model"""
+    import subprocess
+    code = (
+        "import sys, api.app as a; "
+        "assert 'pandas' not in sys.modules and 'sklearn' not in sys.modules; "
+        "assert a.model is None"
+    )
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run([sys.executable, "-c", code], cwd=root, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+
+def test_predictions_feed_live_drift_window():
+    """Test /predict offers its features to the live drift reservoir"""
+    import api.app as api_app
+    api_app.load_resources()
+    if not api_app.MODEL_LOADED or api_app.reference is None:
+        pytest.skip("Model artifacts not available")
+
+    before = client.get("/drift").json()["window"]["requests"]
+    response = client.post("/predict", json={"sepal_length": 5.1, "sepal_width": 3.5, "petal_length": 1.4, "petal_width": 0.2})
+    assert response.status_code == 200
+    assert client.get("/drift").json()["window"]["requests"] == before + 1
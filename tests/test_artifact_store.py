@@ -0,0 +1,74 @@
+import pytest
+import joblib
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.artifact_store import ArtifactStore
+
+def test_publish_versions_and_pointer(tmp_path):
+    """Test artifacts are published together and the pointer flips"""
+    store = ArtifactStore(str(tmp_path))
+    assert store.current_version() is None
+    assert store.paths()['model'] == os.path.join(str(tmp_path), 'best_model.pkl')
+
+    first = store.publish({'model': {'w': 1}, 'scaler': {'s': 1}}, metadata={'accuracy': 0.9})
+    assert store.current_version() == first
+    paths = store.paths()
+    assert joblib.load(paths['model']) == {'w': 1}
+    assert joblib.load(paths['scaler']) == {'s': 1}
+    assert store.manifest()['metadata'] == {'accuracy': 0.9}
+    # Flat files are kept in sync for direct readers
+    assert joblib.load(tmp_path / 'best_model.pkl') == {'w': 1}
+
+    second = store.publish({'model': {'w': 2}, 'scaler': {'s': 1}})
+    assert second != first
+    assert store.current_version() == second
+    # The earlier version is untouched
+    assert joblib.load(store.paths(first)['model']) == {'w': 1}
+
+def test_identical_artifacts_are_deduplicated(tmp_path):
+    """Test identical artifacts share objects and reuse the version"""
+    store = ArtifactStore(str(tmp_path))
+    first = store.publish({'model': {'w': 1}, 'scaler': {'s': 1}})
+    second = store.publish({'model': {'w': 2}, 'scaler': {'s': 1}})
+    # The shared scaler is stored once
+    assert len(os.listdir(store.objects_dir)) == 3
+
+    assert store.publish({'model': {'w': 1}, 'scaler': {'s': 1}}) == first
+    assert store.current_version() == first
+    assert sorted(store.versions()) == sorted([first, second])
+    assert not [name for name in os.listdir(store.versions_dir) if name.startswith('.')]
+
+def test_prune_keeps_current(tmp_path):
+    """Test pruning drops old versions and their unreferenced objects"""
+    store = ArtifactStore(str(tmp_path))
+    for i in range(4):
+        store.publish({'model': {'w': i}, 'scaler': {'s': 1}})
+
+    removed = store.prune(keep=2)
+    assert len(removed) == 2
+    assert store.current_version() in store.versions()
+    assert len(os.listdir(store.objects_dir)) == 3
+
+def test_api_reloads_published_version(tmp_path, monkeypatch):
+    """Test the API swaps in a new version when the pointer changes"""
+    from api import app as api_app
+    api_app.load_resources()
+    if not api_app.MODEL_LOADED:
+        pytest.skip("Model not loaded")
+    for name in ('model', 'scaler', 'primary', 'reference', 'ARTIFACT_VERSION'):
+        monkeypatch.setattr(api_app, name, getattr(api_app, name))
+    store = ArtifactStore(str(tmp_path))
+    monkeypatch.setattr(api_app, 'artifacts', store)
+
+    assert api_app.reload_models() is False
+    version = store.publish({
+        'model': api_app.model,
+        'scaler': api_app.scaler,
+        'reference_index': joblib.load('models/reference_index.pkl'),
+    })
+    assert api_app.reload_models() is True
+    assert api_app.ARTIFACT_VERSION == version
+    assert api_app.reload_models() is False
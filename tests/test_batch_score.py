@@ -0,0 +1,104 @@
+import pytest
+import pandas as pd
+import json
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from src.artifact_store import ArtifactStore
+from src.batch_score import batch_score, plan_chunks, read_chunk, _fingerprint
+
+def make_input(tmp_path, n_copies=20):
+    """Write a CSV of repeated iris rows"""
+    data = pd.read_csv('data/raw/iris.csv').drop(columns=['target'])
+    data = pd.concat([data] * n_copies, ignore_index=True)
+    path = tmp_path / 'features.csv'
+    data.to_csv(path, index=False)
+    return str(path), len(data)
+
+def test_chunks_cover_file(tmp_path):
+    """Test chunk byte ranges are contiguous and line aligned"""
+    path, _ = make_input(tmp_path)
+    chunks, header = plan_chunks(path, 'csv', 4096)
+
+    assert len(header) == 4
+    assert len(chunks) > 1
+    for prev, nxt in zip(chunks, chunks[1:]):
+        assert prev[3] == nxt[2]
+    assert chunks[-1][3] == os.path.getsize(path)
+
+def test_batch_score_keeps_order(tmp_path):
+    """Test parallel scoring writes one ordered result per input row"""
+    path, n_rows = make_input(tmp_path)
+    output = str(tmp_path / 'scores.csv')
+
+    stats = batch_score(path, output, chunk_mb=0.01, workers=2)
+    result = pd.read_csv(output)
+
+    assert stats['rows'] == n_rows
+    assert list(result['row_id']) == list(range(n_rows))
+    assert result['prediction_label'].isin(['setosa', 'versicolor', 'virginica']).all()
+    assert result['confidence'].between(0, 1).all()
+    assert not os.path.exists(output + '.checkpoint.json')
+
+def write_partial_run(path, output, **overrides):
+    """Keep the first chunk of a finished run and write its checkpoint"""
+    chunk_bytes = int(0.01 * 1024 * 1024)
+    full = pd.read_json(output, lines=True)
+    chunks, header = plan_chunks(path, 'csv', chunk_bytes)
+    first = full.head(len(read_chunk(chunks[0], header)))
+    published = ArtifactStore().paths()
+    with open(output, 'w') as f:
+        f.write(first.to_json(orient='records', lines=True) + '\n')
+    checkpoint = {
+        'input': os.path.abspath(path),
+        'input_fingerprint': _fingerprint(path),
+        'model_fingerprint': _fingerprint(published['model']),
+        'scaler_fingerprint': _fingerprint(published['scaler']),
+        'chunk_bytes': chunk_bytes,
+        'num_chunks': len(chunks),
+        'next_chunk': 1,
+        'rows': len(first),
+        'output_bytes': os.path.getsize(output),
+    }
+    checkpoint.update(overrides)
+    with open(output + '.checkpoint.json', 'w') as f:
+        json.dump(checkpoint, f)
+    return full, len(first)
+
+def test_batch_score_resume(tmp_path):
+    """Test a run resumes from a checkpoint instead of rescoring"""
+    path, n_rows = make_input(tmp_path)
+    output = str(tmp_path / 'scores.jsonl')
+    batch_score(path, output, chunk_mb=0.01, workers=1)
+
+    # Simulate a crash after the first chunk was written
+    full, n_first = write_partial_run(path, output)
+
+    stats = batch_score(path, output, chunk_mb=0.01, workers=1)
+    resumed = pd.read_json(output, lines=True)
+
+    assert stats['rows_scored'] == n_rows - n_first
+    pd.testing.assert_frame_equal(resumed, full)
+
+def test_batch_score_rejects_checkpoint_from_other_model(tmp_path):
+    """Test a checkpoint written with a different model is not resumed"""
+    path, n_rows = make_input(tmp_path)
+    output = str(tmp_path / 'scores.jsonl')
+    batch_score(path, output, chunk_mb=0.01, workers=1)
+    write_partial_run(path, output, model_fingerprint={'size': 1, 'mtime_ns': 1})
+
+    stats = batch_score(path, output, chunk_mb=0.01, workers=1)
+
+    assert stats['rows_scored'] == n_rows
+
+def test_batch_score_on_local_cluster(tmp_path):
+    """Test the local cluster backend writes the same scores as loky"""
+    path, _ = make_input(tmp_path)
+    batch_score(path, str(tmp_path / 'loky.csv'), chunk_mb=0.01, workers=2, backend='loky')
+    stats = batch_score(path, str(tmp_path / 'local.csv'), chunk_mb=0.01, workers=2, backend='local')
+
+    assert stats['backend'] == 'local'
+    pd.testing.assert_frame_equal(pd.read_csv(tmp_path / 'local.csv'), pd.read_csv(tmp_path / 'loky.csv'))
@@ -0,0 +1,55 @@
+import pytest
+import joblib
+import numpy as np
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sklearn.datasets import load_iris
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.preprocessing import StandardScaler
+
+from src.compact_forest import CompactForest, memory_report
+
+@pytest.fixture(scope='module')
+def forest():
+    X, y = load_iris(return_X_y=True)
+    X = StandardScaler().fit_transform(X)
+    return RandomForestClassifier(n_estimators=100, max_depth=5, random_state=42).fit(X, y), X
+
+@pytest.mark.parametrize('leaf_dtype, tolerance', [('float32', 1e-6), ('float16', 1e-3), ('uint8', 1 / 255)])
+def test_parity_with_predict_proba(forest, leaf_dtype, tolerance):
+    """Test the compact forest matches sklearn within quantization error"""
+    model, X = forest
+    # Rows on and around split thresholds, not just training points
+    rng = np.random.default_rng(0)
+    X = np.vstack([X, X + rng.normal(scale=0.3, size=X.shape)])
+    compact = CompactForest.from_forest(model, leaf_dtype)
+
+    expected = model.predict_proba(X)
+    assert np.abs(compact.predict_proba(X) - expected).max() <= tolerance
+    assert (compact.predict(X) == model.predict(X)).mean() > 0.99
+
+def test_memory_savings(forest):
+    """Test the packed arrays are much smaller than the pickled forest"""
+    model, _ = forest
+    compact = CompactForest.from_forest(model)
+    report = memory_report(model, compact)
+
+    assert compact.feature.dtype == np.int16
+    assert compact.threshold.dtype == np.float32
+    assert compact.values.dtype == np.uint8
+    assert report['nodes'] == sum(e.tree_.node_count for e in model.estimators_)
+    assert report['ratio'] > 4
+
+def test_round_trip_memory_mapped(forest, tmp_path):
+    """Test the saved arrays load memory-mapped and predict the same"""
+    model, X = forest
+    compact = CompactForest.from_forest(model)
+    path = tmp_path / 'compact.pkl'
+    joblib.dump(compact.to_dict(), path)
+
+    loaded = CompactForest.from_dict(joblib.load(path, mmap_mode='r'))
+    assert isinstance(loaded.threshold, np.memmap)
+    assert np.array_equal(loaded.predict_proba(X), compact.predict_proba(X))
@@ -0,0 +1,73 @@
+import hashlib
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sklearn.datasets import load_iris
+
+from src import dataset
+from src.dataset import FEATURE_COLUMNS, TARGET_COLUMN, cache_dir, content_hash, iter_chunks, read_dataset
+
+@pytest.fixture
+def raw_csv(tmp_path):
+    iris = load_iris()
+    data = pd.DataFrame(iris.data, columns=FEATURE_COLUMNS)
+    data[TARGET_COLUMN] = iris.target
+    path = tmp_path / 'iris.csv'
+    data.to_csv(path, index=False)
+    return str(path), data
+
+def test_schema_is_applied(raw_csv):
+    """Test features and target get the declared dtypes"""
+    path, data = raw_csv
+    frame = read_dataset(path)
+    assert frame[TARGET_COLUMN].dtype == np.int8
+    assert (frame[FEATURE_COLUMNS].dtypes == np.float64).all()
+    np.testing.assert_array_equal(frame[FEATURE_COLUMNS].to_numpy(), data[FEATURE_COLUMNS].to_numpy())
+
+    frame = read_dataset(path, feature_dtype='float32', cache=False)
+    assert (frame[FEATURE_COLUMNS].dtypes == np.float32).all()
+
+def test_column_projection(raw_csv):
+    """Test only the requested columns are returned, in the requested order"""
+    path, _ = raw_csv
+    columns = [TARGET_COLUMN, FEATURE_COLUMNS[2]]
+    assert read_dataset(path, columns=columns).columns.tolist() == columns
+    assert read_dataset(path, columns=columns, cache=False).columns.tolist() == columns
+
+def test_cache_is_invalidated_when_file_changes(raw_csv):
+    """Test the sidecar cache is reused and rebuilt after a write"""
+    path, data = raw_csv
+    read_dataset(path)
+    assert os.path.exists(os.path.join(cache_dir(path), 'meta.json'))
+    assert len(read_dataset(path)) == len(data)
+
+    time.sleep(0.01)
+    data.iloc[:10].to_csv(path, index=False)
+    assert len(read_dataset(path)) == 10
+
+@pytest.mark.parametrize('max_cache_bytes', [dataset.CACHE_MAX_BYTES, 0])
+def test_chunks_cover_the_file(raw_csv, monkeypatch, max_cache_bytes):
+    """Test cached and streamed chunks carry a running index and cover the file"""
+    path, data = raw_csv
+    monkeypatch.setattr(dataset, 'CACHE_MAX_BYTES', max_cache_bytes)
+    chunks = list(iter_chunks(path, columns=FEATURE_COLUMNS, chunksize=40))
+    # Files over the size limit are streamed without building a cache
+    assert os.path.exists(cache_dir(path)) == (max_cache_bytes > 0)
+    assert [len(chunk) for chunk in chunks] == [40, 40, 40, 30]
+    combined = pd.concat(chunks)
+    assert combined.index.tolist() == list(range(len(data)))
+    np.testing.assert_array_equal(combined.to_numpy(), data[FEATURE_COLUMNS].to_numpy())
+
+def test_content_hash_matches_whole_file_hash(raw_csv):
+    """Test the chunked hash equals hashing the whole frame's CSV"""
+    path, _ = raw_csv
+    expected = hashlib.md5(pd.read_csv(path).to_csv().encode()).hexdigest()
+    assert content_hash(path, chunksize=7) == expected
+    assert content_hash(path) == expected
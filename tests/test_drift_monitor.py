@@ -0,0 +1,76 @@
+import json
+import numpy as np
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scipy.stats import ks_2samp
+from sklearn.datasets import load_iris
+
+from api.drift_monitor import LiveDriftMonitor, RFFMMD, drift_detected_gauge, ks_test
+
+X = load_iris().data
+
+def live_traffic(n=600, shift=0.0, seed=0):
+    """Rows resampled from the training data, optionally shifted in petal length"""
+    rng = np.random.default_rng(seed)
+    rows = X[rng.integers(0, len(X), n)] + rng.normal(0, 0.05, (n, X.shape[1]))
+    rows[:, 2] += shift
+    return rows
+
+def test_ks_matches_scipy():
+    """Test the vectorized KS statistics equal scipy's per-feature tests"""
+    sample = live_traffic(shift=0.5)
+    statistics, p_values = ks_test(X, sample)
+    for j in range(X.shape[1]):
+        expected = ks_2samp(X[:, j], sample[:, j])
+        assert abs(statistics[j] - expected.statistic) < 1e-9
+        assert abs(p_values[j] - expected.pvalue) < 0.02
+
+def test_mmd_separates_shifted_traffic():
+    """Test the RFF MMD p-value is high for the same distribution and low after a shift"""
+    mmd = RFFMMD(X)
+    assert mmd.test(live_traffic())[1] > 0.05
+    statistic, p_value = mmd.test(live_traffic(shift=1.5))
+    assert p_value < 0.01
+    assert statistic > mmd.test(live_traffic())[0]
+
+def test_reservoir_has_constant_size():
+    """Test the window sample stays bounded and check starts a new window"""
+    monitor = LiveDriftMonitor(reservoir_size=100, min_samples=50, path=None, seed=0)
+    # Nothing is sampled before training features are known
+    monitor.add([5.1, 3.5, 1.4, 0.2])
+    assert monitor.status()['window']['requests'] == 0
+
+    monitor.set_reference(X)
+    for row in live_traffic(n=1000).tolist():
+        monitor.add(row)
+    assert monitor.status()['window'] == {'requests': 1000, 'samples': 100}
+
+    result = monitor.check()
+    assert result['window_requests'] == 1000
+    assert result['window_samples'] == 100
+    assert monitor.status()['window'] == {'requests': 0, 'samples': 0}
+    # Too few samples: the window keeps growing instead
+    monitor.add([5.1, 3.5, 1.4, 0.2])
+    assert monitor.check() is None
+
+def test_check_exports_result(tmp_path):
+    """Test drift results reach the gauge and the JSON file"""
+    path = tmp_path / 'live_drift.json'
+    monitor = LiveDriftMonitor(min_samples=100, path=str(path), seed=0)
+    monitor.set_reference(X)
+
+    for row in live_traffic().tolist():
+        monitor.add(row)
+    assert not monitor.check()['drift']
+    assert drift_detected_gauge._value.get() == 0
+
+    for row in live_traffic(shift=0.8).tolist():
+        monitor.add(row)
+    result = monitor.check()
+    assert result['drift']
+    assert 'petal_length' in result['drifted_features']
+    assert drift_detected_gauge._value.get() == 1
+    assert json.loads(path.read_text()) == result
@@ -0,0 +1,58 @@
+import pytest
+import numpy as np
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import accuracy_score, f1_score, precision_score, recall_score
+
+from src.evaluation import bootstrap_intervals, confusion_matrix, cross_validate, evaluate
+
+def random_labels(n=300, seed=0):
+    rng = np.random.default_rng(seed)
+    y_true = rng.integers(0, 3, n)
+    y_pred = np.where(rng.random(n) < 0.8, y_true, rng.integers(0, 3, n))
+    return y_true, y_pred
+
+def test_metrics_match_sklearn():
+    """Test all metrics from one confusion matrix match scikit-learn"""
+    y_true, y_pred = random_labels()
+    # A class that is never predicted scores zero precision
+    y_pred[y_pred == 2] = 1
+
+    metrics = evaluate(y_true, y_pred)
+    assert metrics['accuracy'] == pytest.approx(accuracy_score(y_true, y_pred))
+    for name, scorer in [('precision', precision_score), ('recall', recall_score), ('f1', f1_score)]:
+        expected = scorer(y_true, y_pred, average='weighted', zero_division=0)
+        assert metrics[name] == pytest.approx(expected)
+
+def test_confusion_matrix_layout():
+    """Test rows are true classes and columns predictions"""
+    cm = confusion_matrix(['a', 'b', 'b'], ['a', 'a', 'b'])
+    assert cm.tolist() == [[1, 0], [1, 1]]
+
+def test_bootstrap_intervals_bracket_the_estimate():
+    """Test intervals contain the point estimate and narrow with more data"""
+    y_true, y_pred = random_labels(n=200)
+    small = bootstrap_intervals(y_true[:50], y_pred[:50], n_resamples=1000)
+    large = bootstrap_intervals(y_true, y_pred, n_resamples=1000)
+
+    accuracy = evaluate(y_true, y_pred)['accuracy']
+    assert large['accuracy']['lower'] <= accuracy <= large['accuracy']['upper']
+    width = lambda ci: ci['accuracy']['upper'] - ci['accuracy']['lower']
+    assert width(large) < width(small)
+    # Seeded, so repeated runs agree
+    assert bootstrap_intervals(y_true, y_pred, n_resamples=1000) == large
+
+def test_cross_validate_pools_folds():
+    """Test stratified CV returns fold statistics and an interval"""
+    from sklearn.datasets import load_iris
+    X, y = load_iris(return_X_y=True)
+
+    cv = cross_validate(LogisticRegression, {'max_iter': 1000}, X, y, n_splits=5, n_jobs=2, n_resamples=500)
+    assert cv['mean']['accuracy'] > 0.9
+    assert cv['ci']['accuracy']['lower'] <= cv['mean']['accuracy'] <= cv['ci']['accuracy']['upper']
+    assert cv['std']['accuracy'] >= 0
@@ -0,0 +1,61 @@
+import pytest
+import numpy as np
+import os
+import pickle
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from sklearn.datasets import load_iris
+from sklearn.ensemble import RandomForestClassifier
+
+from src.evaluation import cross_validate
+from src.execution import get_backend
+
+def weighted_sum(item, data):
+    return item * float(data['weights'].sum())
+
+def worker_payloads(item, data):
+    """Payloads cached by the worker that runs this task"""
+    from src import execution
+    return len(execution._payloads)
+
+@pytest.fixture(params=['loky', 'local'])
+def backend(request):
+    with get_backend(request.param, workers=2) as backend:
+        yield backend
+
+def test_map_keeps_input_order(backend):
+    """Test results come back in input order with the scattered data"""
+    handle = backend.scatter({'weights': np.arange(4)})
+    assert backend.map(weighted_sum, range(10), handle) == [i * 6.0 for i in range(10)]
+    assert list(backend.imap(weighted_sum, range(10), handle, max_in_flight=3)) == [i * 6.0 for i in range(10)]
+
+def test_tasks_carry_a_handle_not_the_data(backend):
+    """Test scattered data is sent once instead of with every task"""
+    handle = backend.scatter({'weights': np.ones(1_000_000)})
+    assert len(pickle.dumps(handle)) < 1000
+    assert backend.map(weighted_sum, [1, 2], handle) == [1e6, 2e6]
+    # Workers keep the payload for later tasks
+    assert min(backend.map(worker_payloads, range(4), handle)) >= 1
+
+def test_cross_validate_matches_across_backends(backend):
+    """Test folds give the same result on every backend"""
+    X, y = load_iris(return_X_y=True)
+    params = {'n_estimators': 20, 'random_state': 0}
+    local = cross_validate(RandomForestClassifier, params, X, y, n_resamples=200, backend=backend)
+    default = cross_validate(RandomForestClassifier, params, X, y, n_jobs=2, n_resamples=200)
+    assert local == default
+
+def test_unknown_backend_is_rejected():
+    """Test only the known backends can be selected"""
+    with pytest.raises(ValueError):
+        get_backend('ray')
+
+def test_dask_backend():
+    """Test the optional Dask backend runs tasks on a local cluster"""
+    pytest.importorskip('dask.distributed')
+    with get_backend('dask', workers=2) as backend:
+        handle = backend.scatter({'weights': np.arange(4)})
+        assert backend.map(weighted_sum, range(5), handle) == [i * 6.0 for i in range(5)]
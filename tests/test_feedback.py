@@ -0,0 +1,77 @@
+import pytest
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.testclient import TestClient
+
+from api.app import app
+from api.feedback_store import FeedbackStore, AlreadyLabeled, PredictionNotFound
+
+client = TestClient(app)
+
+CLASS_NAMES = {0: "setosa", 1: "versicolor", 2: "virginica"}
+FEATURES = {"sepal_length": 5.1, "sepal_width": 3.5, "petal_length": 1.4, "petal_width": 0.2}
+
+def test_store_metrics(tmp_path):
+    """Test confusion matrix and per-class metrics from labels"""
+    store = FeedbackStore(str(tmp_path / 'feedback.db'), flush_interval=0)
+    for i, (prediction, label) in enumerate([(0, 0), (1, 1), (1, 2), (2, 2)]):
+        store.record_prediction(f'id{i}', FEATURES, prediction, 0.9)
+        store.add_label(f'id{i}', label)
+
+    metrics = store.metrics(CLASS_NAMES)
+
+    assert metrics['labeled'] == 4
+    assert metrics['accuracy'] == 0.75
+    assert metrics['rolling_accuracy'] == 0.75
+    assert metrics['confusion_matrix'][2] == [0, 1, 1]
+    assert metrics['per_class']['versicolor']['precision'] == 0.5
+    assert metrics['per_class']['virginica']['recall'] == 0.5
+    assert len(store.labeled_training_data()) == 4
+    store.close()
+
+def test_store_rejects_unknown_and_duplicate(tmp_path):
+    """Test labels need a known, not yet labeled prediction"""
+    store = FeedbackStore(str(tmp_path / 'feedback.db'), flush_interval=0)
+    store.record_prediction('a', FEATURES, 0, 0.9)
+    store.add_label('a', 0)
+
+    with pytest.raises(AlreadyLabeled):
+        store.add_label('a', 1)
+    with pytest.raises(PredictionNotFound):
+        store.add_label('missing', 1)
+    store.close()
+
+def test_record_does_not_wait_for_writes(tmp_path):
+    """Test recording predictions never blocks on a database write"""
+    store = FeedbackStore(str(tmp_path / 'feedback.db'), flush_size=2, flush_interval=60)
+    with store._db_lock:
+        # A write is in progress; a full buffer only wakes the flush thread
+        for i in range(5):
+            store.record_prediction(f'id{i}', FEATURES, 0, 0.9)
+    store.add_label('id4', 0)
+    store.close()
+
+def test_feedback_endpoint():
+    """Test feedback attaches a label to a prediction ID"""
+    response = client.post("/predict", json=FEATURES)
+    if response.status_code == 503:
+        pytest.skip("Model not loaded")
+    prediction_id = response.json()["prediction_id"]
+
+    response = client.post("/feedback", json={"prediction_id": prediction_id, "label": 0})
+    assert response.status_code == 200
+    assert response.json()["correct"] is True
+
+    response = client.post("/feedback", json={"prediction_id": prediction_id, "label": 0})
+    assert response.status_code == 409
+
+    response = client.get("/feedback/metrics")
+    assert response.json()["labeled"] >= 1
+
+def test_feedback_unknown_prediction():
+    """Test feedback for an unknown prediction returns 404"""
+    response = client.post("/feedback", json={"prediction_id": "unknown", "label": 1})
+    assert response.status_code == 404
@@ -0,0 +1,67 @@
+import pytest
+import os
+import sys
+import threading
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.instrumentation import StageProfiler
+
+def test_stage_records_timings():
+    """Test each stage records wall time, CPU time and peak RSS"""
+    profiler = StageProfiler()
+    with profiler.stage('fit'):
+        sum(i * i for i in range(100000))
+
+    record = profiler.stages[0]
+    assert record['stage'] == 'fit'
+    assert record['wall_seconds'] > 0
+    assert record['cpu_seconds'] >= 0
+    assert 'stage_fit_wall_seconds' in profiler.metrics()
+
+def test_record_stage_from_worker():
+    """Test a stage timed in another process is added to the metrics"""
+    profiler = StageProfiler()
+    profiler.record('fit_forest', 1.5, 1.2)
+
+    assert profiler.stages[0]['cpu_clock'] == 'worker'
+    assert profiler.metrics() == {'stage_fit_forest_wall_seconds': 1.5, 'stage_fit_forest_cpu_seconds': 1.2}
+
+def test_record_stage_memory_from_worker():
+    """Test a worker's peak RSS is kept with the stage it measured"""
+    profiler = StageProfiler()
+    profiler.record('fit_forest', 1.5, 1.2, peak_rss_mb=210.0, peak_rss_growth_mb=12.5)
+
+    record = profiler.stages[0]
+    assert record['peak_rss_growth_mb'] == 12.5
+    assert profiler.metrics()['stage_fit_forest_peak_rss_mb'] == 210.0
+
+def test_stage_recorded_on_error():
+    """Test a failing stage is still recorded"""
+    profiler = StageProfiler()
+    with pytest.raises(ValueError):
+        with profiler.stage('load'):
+            raise ValueError('boom')
+
+    assert profiler.summary()['stages'][0]['stage'] == 'load'
+
+def test_background_stage_cpu_not_counted_twice():
+    """Test a stage on another thread does not inflate a main thread stage"""
+    profiler = StageProfiler()
+
+    def spin():
+        with profiler.stage('log_model'):
+            end = time.thread_time() + 0.3
+            while time.thread_time() < end:
+                pass
+
+    with profiler.stage('fit'):
+        thread = threading.Thread(target=spin)
+        thread.start()
+        thread.join()
+
+    records = {r['stage']: r for r in profiler.stages}
+    assert records['log_model']['cpu_clock'] == 'thread'
+    assert records['log_model']['cpu_seconds'] >= 0.3
+    assert records['fit']['cpu_seconds'] < 0.15
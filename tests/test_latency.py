@@ -0,0 +1,73 @@
+import pytest
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from fastapi.testclient import TestClient
+
+from api.app import app
+from api.latency import SlidingWindowRecorder, latency_buckets
+
+client = TestClient(app)
+
+test_data = {
+    "sepal_length": 5.1,
+    "sepal_width": 3.5,
+    "petal_length": 1.4,
+    "petal_width": 0.2
+}
+
+def test_buckets_resolve_sub_millisecond(monkeypatch):
+    """Test default buckets start well below 1 ms and can be overridden"""
+    buckets = latency_buckets()
+    assert buckets[0] < 0.0001
+    assert sum(1 for b in buckets if b < 0.001) >= 5
+    assert buckets[-1] == float('inf')
+
+    monkeypatch.setenv('LATENCY_BUCKETS', '0.002,0.001')
+    assert latency_buckets() == (0.001, 0.002, float('inf'))
+
+def test_recorder_quantiles_within_precision():
+    """Test quantiles match NumPy within the recorder's relative precision"""
+    recorder = SlidingWindowRecorder(precision=0.01)
+    values = np.random.default_rng(0).lognormal(np.log(0.0005), 0.5, 10000)
+    for value in values:
+        recorder.record(value, now=1000.0)
+
+    snapshot = recorder.snapshot(60, now=1000.5)
+    assert snapshot['count'] == 10000
+    for key, q in [('p50', 0.5), ('p99', 0.99), ('p999', 0.999)]:
+        assert snapshot[key] == pytest.approx(np.quantile(values, q), rel=0.02)
+
+def test_recorder_window_slides():
+    """Test values age out of the window"""
+    recorder = SlidingWindowRecorder(max_window=60)
+    recorder.record(0.1, now=0.0)
+    recorder.record(0.001, now=50.0)
+
+    assert recorder.snapshot(60, now=55.0)['count'] == 2
+    assert recorder.snapshot(10, now=55.0)['count'] == 1
+    assert recorder.snapshot(60, now=100.0)['max'] == 0.001
+    # A slot reused for a later time is reset
+    recorder.record(0.002, now=120.0)
+    assert recorder.snapshot(60, now=120.0)['count'] == 1
+
+def test_latency_endpoint_and_request_id():
+    """Test the latency endpoint and that the request ID is echoed"""
+    response = client.post('/predict', json=test_data, headers={'X-Request-ID': 'trace-123'})
+    if response.status_code == 503:
+        pytest.skip('Model not loaded')
+    assert response.headers['x-request-id'] == 'trace-123'
+
+    windows = client.get('/latency?windows=60').json()['windows']
+    assert windows[0]['count'] >= 1
+    assert windows[0]['p99'] is not None
+    assert client.get('/latency?windows=abc').status_code == 400
+
+def test_metrics_openmetrics_negotiation():
+    """Test OpenMetrics is served when requested"""
+    response = client.get('/metrics', headers={'Accept': 'application/openmetrics-text; version=1.0.0'})
+    assert response.headers['content-type'].startswith('application/openmetrics-text')
+    assert response.text.rstrip().endswith('# EOF')
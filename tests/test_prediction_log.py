@@ -0,0 +1,73 @@
+import json
+import logging
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.prediction_log import PredictionLogger, PredictionLogPolicy, log_records_counter
+
+def count(outcome, reason):
+    return log_records_counter.labels(outcome=outcome, reason=reason)._value.get()
+
+def test_sampling_keeps_low_confidence_and_errors():
+    """Test sampled-out predictions are counted and edge cases always kept"""
+    policy = PredictionLogPolicy(sample_rate=0.0, low_confidence=0.6)
+    before = count('sampled_out', 'sampled')
+
+    assert policy.decide(0.99) == (None, None)
+    assert count('sampled_out', 'sampled') == before + 1
+    assert policy.decide(0.4) == ('low_confidence', 1.0)
+    assert policy.decide(error=True) == ('error', 1.0)
+
+    assert PredictionLogPolicy(sample_rate=0.25).decide(0.99)[1] in (None, 4.0)
+
+def test_rate_limit_per_window():
+    """Test at most max_per_second records are logged in each second"""
+    policy = PredictionLogPolicy(max_per_second=2)
+    before = count('rate_limited', 'sampled')
+
+    logged = [policy.decide(0.99, now=100.5)[0] for _ in range(5)]
+    assert logged.count('sampled') == 2
+    assert count('rate_limited', 'sampled') == before + 3
+    assert policy.decide(0.99, now=101.0)[0] == 'sampled'
+
+def test_rate_limited_weights_cover_dropped_records():
+    """Test the weight dropped by the rate limit is carried by later records"""
+    policy = PredictionLogPolicy(max_per_second=2)
+    assert [policy.decide(0.99, now=100.5)[1] for _ in range(5)][:2] == [1.0, 1.0]
+
+    # 5 offered and 2 logged in the previous second
+    assert policy.decide(0.99, now=101.2) == ('sampled', 2.5)
+    assert policy.decide(0.4, now=101.3) == ('low_confidence', 2.5)
+    # No drops in second 101, and a gap resets the estimate
+    assert policy.decide(0.99, now=102.0)[1] == 1.0
+    assert policy.decide(0.99, now=105.0)[1] == 1.0
+
+def test_compact_records(tmp_path):
+    """Test records drop derived fields and carry their sampling weight"""
+    path = tmp_path / 'predictions.jsonl'
+    log = PredictionLogger(PredictionLogPolicy(), str(path))
+    log.log([5.1, 3.5, 1.4, 0.2], 0, 0.98, now=1700000000.0, id='abc')
+    log.log([5.1, 3.5, 1.4, 0.2], error='boom', id='def')
+    log.close()
+
+    records = [json.loads(line) for line in path.read_text().splitlines()]
+    assert records[0] == {
+        'ts': 1700000000.0, 'features': [5.1, 3.5, 1.4, 0.2], 'prediction': 0,
+        'confidence': 0.98, 'reason': 'sampled', 'w': 1.0, 'id': 'abc',
+    }
+    assert records[1]['reason'] == 'error'
+    assert records[1]['error'] == 'boom'
+
+def test_logger_skips_formatting_when_disabled(tmp_path):
+    """Test nothing is built when neither the file nor the logger emits"""
+    quiet = logging.getLogger('test_prediction_log.quiet')
+    quiet.setLevel(logging.WARNING)
+    log = PredictionLogger(PredictionLogPolicy(), None, quiet)
+
+    class Exploding(list):
+        def __iter__(self):
+            raise AssertionError('features were formatted')
+
+    assert log.log(Exploding([1, 2, 3, 4]), 0, 0.9) is True
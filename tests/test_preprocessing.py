@@ -6,12 +6,13 @@ import sys
 
 # Add parent directory to path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
 
 from src.data_preprocessing import load_and_preprocess_data
 
 def test_data_preprocessing():
     """Test data preprocessing function"""
-    X_train, X_test, y_train, y_test = load_and_preprocess_data()
+    X_train, X_test, y_train, y_test, scaler = load_and_preprocess_data()
     
     # Check shapes
     assert X_train.shape[0] == y_train.shape[0]
@@ -22,11 +23,13 @@ def test_data_preprocessing():
     assert np.abs(np.mean(X_train, axis=0)).max() < 0.1
     assert np.abs(np.std(X_train, axis=0) - 1).max() < 0.1
 
+    # The returned scaler is the one fitted on the training split
+    assert np.allclose(scaler.inverse_transform(X_train).mean(axis=0), scaler.mean_)
+
 def test_data_files_created():
     """Test that data files are created"""
     load_and_preprocess_data()
     
     assert os.path.exists('data/raw/iris.csv')
     assert os.path.exists('data/processed/train.csv')
-    assert os.path.exists('data/processed/test.csv')
-    assert os.path.exists('models/scaler.pkl')
\ No newline at end of file
+    assert os.path.exists('data/processed/test.csv')
\ No newline at end of file
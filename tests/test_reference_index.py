@@ -0,0 +1,61 @@
+import pytest
+import numpy as np
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from sklearn.datasets import load_iris
+from sklearn.preprocessing import StandardScaler
+from fastapi.testclient import TestClient
+
+from src.reference_index import build_reference_index
+from api.reference import ReferenceScorer
+from api.app import app
+
+client = TestClient(app)
+
+@pytest.fixture(scope='module')
+def scorer():
+    iris = load_iris()
+    scaler = StandardScaler().fit(iris.data)
+    index = build_reference_index(scaler.transform(iris.data), iris.target, iris.data)
+    return scaler, ReferenceScorer(index)
+
+def test_in_distribution_sample(scorer):
+    """Test a typical setosa sample is not flagged"""
+    scaler, reference = scorer
+    x = scaler.transform([[5.1, 3.5, 1.4, 0.2]])
+    score, is_ood = reference.ood_score(x)
+    assert score < reference.ood_threshold
+    assert not is_ood
+
+def test_out_of_distribution_sample(scorer):
+    """Test an implausible flower is flagged"""
+    scaler, reference = scorer
+    x = scaler.transform([[1.0, 9.0, 9.0, 0.1]])
+    assert reference.ood_score(x)[1]
+
+def test_neighbors(scorer):
+    """Test nearest training samples are returned closest first"""
+    scaler, reference = scorer
+    nearest = reference.neighbors(scaler.transform([[5.1, 3.5, 1.4, 0.2]]), 3, {0: 'setosa'})
+    assert len(nearest) == 3
+    assert nearest[0]['distance'] <= nearest[-1]['distance']
+    assert nearest[0]['label'] == 'setosa'
+    assert np.allclose(nearest[0]['features'], [5.1, 3.5, 1.4, 0.2])
+
+def test_predict_with_neighbors():
+    """Test /predict returns neighbours and an OOD score when requested"""
+    from api import app as api_app
+    api_app.load_resources()
+    if api_app.reference is None or not api_app.MODEL_LOADED:
+        pytest.skip("Reference index not built")
+
+    response = client.post("/predict?neighbors=2", json={
+        "sepal_length": 5.1, "sepal_width": 3.5, "petal_length": 1.4, "petal_width": 0.2
+    })
+    result = response.json()
+    assert len(result["neighbors"]) == 2
+    assert result["is_ood"] is False
@@ -0,0 +1,112 @@
+import pytest
+import sys
+import os
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from api.retrain_jobs import RetrainJobManager
+
+def wait_for(job, timeout=30):
+    deadline = time.time() + timeout
+    while job.status in ('queued', 'running') and time.time() < deadline:
+        time.sleep(0.05)
+
+def test_triggers_are_coalesced(tmp_path):
+    """Test concurrent triggers share one running and one queued job"""
+    manager = RetrainJobManager(
+        command=[sys.executable, '-c', 'import time; time.sleep(0.5)'],
+        progress_dir=str(tmp_path),
+    )
+
+    first = manager.trigger()
+    jobs = [manager.trigger() for _ in range(9)]
+
+    assert first.status == 'running'
+    assert all(job is jobs[0] for job in jobs)
+    assert jobs[0].status == 'queued'
+    assert jobs[0].triggers == 9
+
+    wait_for(first)
+    wait_for(jobs[0])
+    assert first.status == 'succeeded'
+    assert jobs[0].status == 'succeeded'
+
+def test_job_reports_stages(tmp_path):
+    """Test stage timings written by the worker appear in the job status"""
+    script = (
+        'import os, sys; sys.path.insert(0, "src")\n'
+        'from instrumentation import StageProfiler\n'
+        'with StageProfiler().stage("fit"): pass\n'
+    )
+    manager = RetrainJobManager(command=[sys.executable, '-c', script], progress_dir=str(tmp_path))
+
+    job = manager.trigger()
+    wait_for(job)
+    status = job.to_dict()
+
+    assert status['status'] == 'succeeded'
+    assert status['progress']['stages_completed'] == 1
+    assert status['stages'][0]['stage'] == 'fit'
+
+def test_failed_job(tmp_path):
+    """Test a failing worker marks the job failed with its error output"""
+    manager = RetrainJobManager(
+        command=[sys.executable, '-c', 'raise SystemExit("boom")'],
+        progress_dir=str(tmp_path),
+    )
+    job = manager.trigger()
+    wait_for(job)
+
+    assert job.status == 'failed'
+    assert 'boom' in job.error
+
+def test_worker_runs_niced(tmp_path):
+    """Test the worker runs with the configured niceness"""
+    script = 'import os; print(os.nice(0))'
+    manager = RetrainJobManager(
+        command=[sys.executable, '-c', script], niceness=5, max_cpus=1, progress_dir=str(tmp_path)
+    )
+
+    command = manager._limited_command()
+    assert command[-3:] == [sys.executable, '-c', script]
+
+    import subprocess
+    output = subprocess.run(command, capture_output=True, text=True).stdout
+    assert int(output) >= 5
+
+def test_skipped_job(tmp_path):
+    """Test a worker that found nothing to retrain marks the job skipped"""
+    from api.retrain_jobs import SKIPPED_EXIT_CODE
+    manager = RetrainJobManager(
+        command=[sys.executable, '-c', f'raise SystemExit({SKIPPED_EXIT_CODE})'],
+        progress_dir=str(tmp_path),
+    )
+    job = manager.trigger()
+    wait_for(job)
+
+    assert job.status == 'skipped'
+    assert job.returncode == SKIPPED_EXIT_CODE
+
+def test_retrain_script_exit_codes(tmp_path, monkeypatch):
+    """Test retrain.py reports failed and skipped runs through its exit code"""
+    import subprocess
+    from api.retrain_jobs import SKIPPED_EXIT_CODE
+    from src import retrain
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+    retrainer = retrain.ModelRetrainer()
+    monkeypatch.setattr(retrainer, 'should_retrain', lambda: (True, ['test']))
+    def broken_training():
+        raise RuntimeError('boom')
+    monkeypatch.setattr(retrain, 'train_models', broken_training)
+    assert retrainer.retrain() == 'failed'
+    assert retrain.EXIT_CODES['failed'] not in (0, SKIPPED_EXIT_CODE)
+
+    # Without a trained model or data there is nothing to retrain
+    result = subprocess.run(
+        [sys.executable, os.path.join(root, 'src', 'retrain.py')],
+        cwd=tmp_path, capture_output=True, text=True,
+    )
+    assert result.returncode == SKIPPED_EXIT_CODE, result.stderr
@@ -0,0 +1,77 @@
+import pytest
+import asyncio
+import os
+import sys
+import threading
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from src.auto_retrain_monitor import RetrainScheduler
+
+class CountingRetrainer:
+    def __init__(self, duration=0.0):
+        self.calls = 0
+        self.duration = duration
+
+    def check_and_retrain(self):
+        self.calls += 1
+        time.sleep(self.duration)
+
+async def run_for(scheduler, seconds, action, tmp_path):
+    task = asyncio.create_task(scheduler.run(watch_path=str(tmp_path)))
+    await asyncio.sleep(0.1)
+    action()
+    await asyncio.sleep(seconds)
+    scheduler.stop()
+    await task
+
+def test_burst_of_events_runs_one_check(tmp_path):
+    """Test a burst of file events is debounced into a single check"""
+    retrainer = CountingRetrainer()
+    scheduler = RetrainScheduler(retrainer, quiet_period=0.2)
+
+    def burst():
+        def write_events():
+            for _ in range(20):
+                scheduler.notify_data_changed('data/raw/iris.csv')
+                time.sleep(0.01)
+        threading.Thread(target=write_events).start()
+
+    asyncio.run(run_for(scheduler, 0.8, burst, tmp_path))
+    assert retrainer.calls == 1
+
+def test_requests_during_check_coalesce(tmp_path):
+    """Test requests made while a check runs produce one follow-up check"""
+    retrainer = CountingRetrainer(duration=0.3)
+    scheduler = RetrainScheduler(retrainer, quiet_period=0.05)
+
+    def many_requests():
+        for _ in range(5):
+            scheduler.request_check('test')
+
+    asyncio.run(run_for(scheduler, 1.0, many_requests, tmp_path))
+    assert retrainer.calls == 2
+
+def test_periodic_timer_fires_when_due(tmp_path):
+    """Test periodic checks fire on their interval"""
+    retrainer = CountingRetrainer()
+    scheduler = RetrainScheduler(retrainer, interval=0.3)
+
+    asyncio.run(run_for(scheduler, 0.65, lambda: None, tmp_path))
+    assert retrainer.calls == 2
+
+def test_successful_retrain_invalidates_trigger_memo(tmp_path, monkeypatch):
+    """Test memoized trigger results are dropped after retraining"""
+    import src.auto_retrain_monitor as monitor
+
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(monitor, 'train_models', lambda: None)
+    retrainer = monitor.AutoRetrainer()
+    monkeypatch.setattr(retrainer, 'should_retrain', lambda: (True, ['test']))
+    retrainer.engine._memo['data_hash'] = ((None,), (False, None))
+
+    retrainer.check_and_retrain()
+
+    assert retrainer.engine._memo == {}
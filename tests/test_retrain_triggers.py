@@ -0,0 +1,112 @@
+import pytest
+import json
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from src.retrain_triggers import (
+    DataHashTrigger, PerformanceTrigger, Trigger, TriggerEngine, read_last_lines
+)
+
+class FakeTrigger(Trigger):
+    def __init__(self, name, cost, fired, path=None):
+        self.name = name
+        self.cost = cost
+        self.fired = fired
+        self.path = path
+        self.calls = 0
+
+    def inputs(self):
+        return [self.path] if self.path else []
+
+    def check(self):
+        self.calls += 1
+        return self.fired, f"{self.name} fired" if self.fired else None
+
+def test_triggers_run_cheapest_first_and_short_circuit():
+    """Test expensive triggers are skipped once a cheap one fires"""
+    expensive = FakeTrigger('expensive', 10, True)
+    cheap = FakeTrigger('cheap', 1, True)
+    engine = TriggerEngine([expensive, cheap], short_circuit=True)
+
+    should_retrain, reasons = engine.evaluate()
+
+    assert should_retrain
+    assert reasons == ['cheap fired']
+    assert expensive.calls == 0
+
+def test_results_memoized_until_input_changes(tmp_path):
+    """Test a trigger is not re-run while its input file is unchanged"""
+    path = tmp_path / 'data.csv'
+    path.write_text('a\n1\n')
+    trigger = FakeTrigger('data', 1, False, str(path))
+    engine = TriggerEngine([trigger])
+
+    engine.evaluate()
+    engine.evaluate()
+    assert trigger.calls == 1
+    assert engine.timings[0]['cached']
+
+    path.write_text('a\n1\n2\n')
+    engine.evaluate()
+    assert trigger.calls == 2
+
+def test_data_hash_trigger(tmp_path):
+    """Test the hash trigger fires when data differs from the stored hash"""
+    data = tmp_path / 'iris.csv'
+    data.write_text('x,target\n1.0,0\n')
+    hash_file = tmp_path / 'data_hash.txt'
+    trigger = DataHashTrigger(str(data), str(hash_file))
+    hash_file.write_text(trigger.current_hash())
+
+    assert trigger.check() == (False, None)
+    data.write_text('x,target\n2.0,0\n')
+    assert trigger.check() == (True, 'Data hash changed')
+
+def test_performance_trigger_reads_tail(tmp_path):
+    """Test only the most recent predictions are considered"""
+    log = tmp_path / 'predictions.jsonl'
+    with open(log, 'w') as f:
+        for _ in range(500):
+            f.write(json.dumps({'confidence': 0.99}) + '\n')
+        for _ in range(100):
+            f.write(json.dumps({'confidence': 0.5}) + '\n')
+
+    assert len(read_last_lines(log, 100)) == 100
+    fired, reason = PerformanceTrigger(str(log)).check()
+    assert fired
+    assert 'Low average confidence' in reason
+
+def test_performance_trigger_weights_sampled_logs(tmp_path):
+    """Test sampled records count by their weight in the average"""
+    log = tmp_path / 'predictions.jsonl'
+    with open(log, 'w') as f:
+        for i in range(100):
+            # Every low-confidence prediction is logged, 1 in 10 of the rest
+            record = {'confidence': 0.99, 'w': 10.0} if i % 2 else {'confidence': 0.7, 'w': 1.0}
+            f.write(json.dumps(record) + '\n')
+
+    assert PerformanceTrigger(str(log)).check() == (False, None)
+
+def test_live_drift_trigger(tmp_path):
+    """Test live drift fires only for a recent result newer than the last training"""
+    import time
+    from datetime import datetime, timedelta
+    from src.retrain_triggers import LiveDriftTrigger
+
+    drift_file = tmp_path / 'live_drift.json'
+    last_training = tmp_path / 'last_training.txt'
+    trigger = LiveDriftTrigger(drift_file, last_training)
+    assert trigger.check() == (False, None)
+
+    result = {'checked_at': time.time(), 'drift': True, 'drifted_features': ['petal_length'], 'mmd': {'p_value': 0.005}}
+    drift_file.write_text(json.dumps(result))
+    last_training.write_text((datetime.now() - timedelta(hours=1)).isoformat())
+    fired, reason = trigger.check()
+    assert fired and 'petal_length' in reason
+
+    # A retrain since the check makes the result stale
+    last_training.write_text((datetime.now() + timedelta(seconds=1)).isoformat())
+    assert trigger.check() == (False, None)
@@ -0,0 +1,65 @@
+import pytest
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.testclient import TestClient
+
+import api.app as api_app
+from api.rollout import ModelRollout, ServedModel, model_agreement_counter
+
+client = TestClient(api_app.app)
+
+test_data = {
+    "sepal_length": 5.1,
+    "sepal_width": 3.5,
+    "petal_length": 1.4,
+    "petal_width": 0.2
+}
+
+@pytest.fixture
+def rollout(monkeypatch):
+    api_app.load_resources()
+    if api_app.primary is None:
+        pytest.skip("Model not loaded")
+    primary = api_app.primary
+    candidate = ServedModel(primary.model, primary.scaler, "candidate-v2")
+    rollout = ModelRollout()
+    rollout.candidate = candidate
+    monkeypatch.setattr(api_app, "rollout", rollout)
+    yield rollout
+    # Wait for mirrored requests so they are counted within this test
+    rollout._executor.shutdown(wait=True)
+
+def agreement(version):
+    return model_agreement_counter.labels(candidate_version=version, result="agree")._value.get()
+
+def test_canary_routes_traffic(rollout):
+    """Test canary mode serves the configured share from the candidate"""
+    rollout.mode = "canary"
+    rollout.traffic_percent = 100
+
+    response = client.post("/predict", json=test_data)
+    assert response.json()["model_version"] == "candidate-v2"
+
+    rollout.traffic_percent = 0
+    response = client.post("/predict", json=test_data)
+    assert response.json()["model_version"] == api_app.primary.version
+
+def test_shadow_records_agreement(rollout):
+    """Test shadow mode serves the primary and mirrors to the candidate"""
+    rollout.mode = "shadow"
+    before = agreement("candidate-v2")
+
+    response = client.post("/predict", json=test_data)
+    rollout._executor.shutdown(wait=True)
+
+    assert response.json()["model_version"] == api_app.primary.version
+    assert agreement("candidate-v2") == before + 1
+
+def test_models_endpoint():
+    """Test the model status endpoint"""
+    response = client.get("/models")
+    assert response.status_code == 200
+    assert "mode" in response.json()
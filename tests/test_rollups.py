@@ -0,0 +1,76 @@
+import pytest
+import os
+import sys
+import threading
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.testclient import TestClient
+
+from api.app import app
+from api.rollups import RollupWriter, read_rollups, summarize_rollups
+
+client = TestClient(app)
+
+def test_rollups_merge_across_flushes(tmp_path):
+    """Test that flushed deltas are merged into minute and hour buckets"""
+    writer = RollupWriter(str(tmp_path / 'rollups.db'), flush_interval=0)
+    hour = 1_700_000_000 // 3600 * 3600
+    writer.record(0, 0.95, 0.002, timestamp=hour + 10)
+    writer.record(1, 0.55, 0.020, timestamp=hour + 20)
+    writer.flush()
+    writer.record(2, 0.75, 0.001, timestamp=hour + 130)
+    writer.flush()
+
+    minutes = read_rollups(writer.path, 'minute', since=hour)
+    hours = read_rollups(writer.path, 'hour', since=hour + 1800)
+    writer.close()
+
+    assert list(minutes['count']) == [2, 1]
+    assert len(hours) == 1
+
+    summary = summarize_rollups(hours)
+    assert summary['count'] == 3
+    assert summary['by_class'] == {0: 1, 1: 1, 2: 1}
+    assert summary['confidence_min'] == 0.55
+    assert summary['confidence_max'] == 0.95
+    assert summary['confidence_mean'] == pytest.approx(0.75)
+    assert summary['duration_max'] == 0.020
+    assert sum(summary['confidence_histogram']) == 3
+    assert summary['confidence_histogram'][9] == 1
+    assert sum(summary['duration_histogram']) == 3
+
+def test_concurrent_flushes_do_not_lose_counts(tmp_path):
+    """Test flushes from several threads merge every recorded prediction"""
+    writer = RollupWriter(str(tmp_path / 'rollups.db'), flush_interval=0)
+
+    def work():
+        for _ in range(200):
+            writer.record(1, 0.9, 0.001, timestamp=1_700_000_000)
+            writer.flush()
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    writer.flush()
+
+    summary = summarize_rollups(read_rollups(writer.path, 'hour'))
+    writer.close()
+    assert summary['count'] == 800
+
+def test_rollup_endpoint():
+    """Test that predictions show up in the rollup report"""
+    response = client.post('/predict', json={
+        'sepal_length': 5.1, 'sepal_width': 3.5,
+        'petal_length': 1.4, 'petal_width': 0.2,
+    })
+    if response.status_code == 503:
+        pytest.skip('Model not loaded')
+
+    response = client.get('/rollups?hours=1&granularity=minute')
+    assert response.status_code == 200
+    assert response.json()['summary']['count'] >= 1
+
+    assert client.get('/rollups?granularity=day').status_code == 422
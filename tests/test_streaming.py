@@ -0,0 +1,137 @@
+import pytest
+import asyncio
+import json
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from fastapi.testclient import TestClient
+
+from api.app import app
+from api.streaming import OversizedLine, StreamScorer, iter_lines
+
+client = TestClient(app)
+
+CLASS_NAMES = {0: "setosa", 1: "versicolor", 2: "virginica"}
+FEATURES = {"sepal_length": 5.1, "sepal_width": 3.5, "petal_length": 1.4, "petal_width": 0.2}
+
+class FakeModel:
+    """Predicts class 1 with confidence 0.8 and records batch sizes"""
+
+    def __init__(self):
+        self.batches = []
+
+    def score_batch(self, feature_df):
+        self.batches.append(len(feature_df))
+        n = len(feature_df)
+        return np.ones(n, dtype=int), np.full(n, 0.8)
+
+async def _collect(scorer, messages):
+    async def source():
+        for message in messages:
+            yield message
+    return [results async for results in scorer.stream(source())]
+
+def test_stream_batches_queued_rows():
+    """Test that queued rows are scored together and keep their order"""
+    model = FakeModel()
+    scorer = StreamScorer(lambda: model, CLASS_NAMES, max_batch=4, max_wait=0.05)
+    messages = [json.dumps([FEATURES] * 5), json.dumps(FEATURES)]
+
+    batches = asyncio.run(_collect(scorer, messages))
+    results = [result for batch in batches for result in batch]
+
+    assert [result['seq'] for result in results] == list(range(6))
+    assert all(result['prediction_label'] == 'versicolor' for result in results)
+    assert max(model.batches) == 4
+    assert sum(model.batches) == 6
+
+def test_stream_reports_invalid_rows():
+    """Test that invalid rows get an error result without ending the stream"""
+    model = FakeModel()
+    scorer = StreamScorer(lambda: model, CLASS_NAMES)
+    bad = dict(FEATURES, sepal_length=-1)
+    messages = ['not json', json.dumps(bad), json.dumps(FEATURES)]
+
+    results = [r for batch in asyncio.run(_collect(scorer, messages)) for r in batch]
+
+    assert [('error' in r) for r in results] == [True, True, False]
+    assert results[2]['seq'] == 2
+
+def test_iter_lines_splits_chunks():
+    """Test that lines split across chunks are reassembled"""
+    async def chunks():
+        for chunk in [b'{"a":', b' 1}\n{"b"', b': 2}\n\n{"c": 3}']:
+            yield chunk
+
+    async def collect():
+        return [line async for line in iter_lines(chunks())]
+
+    assert asyncio.run(collect()) == ['{"a": 1}', '{"b": 2}', '{"c": 3}']
+
+def test_iter_lines_rejects_oversized_lines():
+    """Test a line over the limit is dropped before its newline arrives"""
+    async def chunks():
+        yield b'{"a": 1}\n' + b'x' * 40
+        yield b'x' * 40
+        yield b'x' * 40 + b'\n{"b": 2}\n'
+
+    async def collect():
+        return [line async for line in iter_lines(chunks(), max_line_bytes=32)]
+
+    lines = asyncio.run(collect())
+    assert lines[0] == '{"a": 1}'
+    assert isinstance(lines[1], OversizedLine)
+    assert lines[2:] == ['{"b": 2}']
+
+    # The oversized line becomes an error result, and the stream goes on
+    scorer = StreamScorer(lambda: FakeModel(), CLASS_NAMES)
+    results = [r for batch in asyncio.run(_collect(scorer, [lines[1], json.dumps(FEATURES)])) for r in batch]
+    assert 'exceeds 32 bytes' in results[0]['error']
+    assert 'error' not in results[1]
+
+def test_ndjson_endpoint():
+    """Test NDJSON streaming scoring"""
+    body = ''.join(json.dumps(FEATURES) + '\n' for _ in range(3))
+    response = client.post('/predict/stream', content=body)
+    if response.status_code == 503:
+        pytest.skip('Model not loaded')
+
+    assert response.status_code == 200
+    results = [json.loads(line) for line in response.text.splitlines()]
+    assert [r['seq'] for r in results] == [0, 1, 2]
+    assert all(r['prediction_label'] == 'setosa' for r in results)
+
+def test_websocket_endpoint():
+    """Test WebSocket streaming scoring"""
+    with client.websocket_connect('/predict/stream') as websocket:
+        websocket.send_text(json.dumps([FEATURES, FEATURES]))
+        try:
+            results = websocket.receive_json()
+        except Exception:
+            pytest.skip('Model not loaded')
+        while len(results) < 2:
+            results += websocket.receive_json()
+
+    assert [r['seq'] for r in results] == [0, 1]
+    assert results[0]['prediction'] == 0
+
+def test_stream_reader_stops_when_consumer_leaves():
+    """Test that closing a stream with a full queue does not leak the reader"""
+    model = FakeModel()
+    scorer = StreamScorer(lambda: model, CLASS_NAMES, max_batch=1, queue_size=1)
+
+    async def endless():
+        while True:
+            yield json.dumps(FEATURES)
+
+    async def consume_one():
+        stream = scorer.stream(endless())
+        await stream.__anext__()
+        await stream.aclose()
+        await asyncio.sleep(0)
+        return [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+
+    assert asyncio.run(consume_one()) == []